@@ -2,93 +2,213 @@
 """
 Load pre-configured knowledge graph entities for Claude Desktop Setup.
 This script populates the knowledge graph with essential system documentation.
+
+Entities are streamed from system-entities.json and starter-knowledge.json one
+at a time, so memory use stays flat however large the files grow. Two modes:
+
+    --mode prompt  (default) write a prompt file to paste into Claude Desktop
+    --mode mcp     start the `memory` server from the MCP config and send
+                   create_entities over JSON-RPC stdio in sized batches
+
+The memory server rewrites its JSON file on every call without locking, so
+batches are sent one at a time and each is confirmed before the next.
 """
 
-import json
 import sys
-import os
-
-def load_system_entities():
-    """Load system entities into the knowledge graph."""
-    
-    # Get the script directory to locate the JSON file
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    entities_file = os.path.join(script_dir, 'system-entities.json')
-    
-    if not os.path.exists(entities_file):
-        print(f"Error: Could not find entities file at {entities_file}")
-        return False
-    
+import json
+import time
+import argparse
+import importlib.util
+from pathlib import Path
+from typing import Iterator, Dict, Any, List, Optional, TextIO
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent.parent
+ENTITY_FILES = [
+    (SCRIPT_DIR / 'system-entities.json', None),
+    (SCRIPT_DIR / 'starter-knowledge.json', 'entities'),
+]
+
+# ijson parses incrementally in C when installed; otherwise fall back to raw_decode
+IJSON_AVAILABLE = importlib.util.find_spec('ijson') is not None
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_BATCH_BYTES = 512 * 1024
+
+def iter_json_array(path: Path, key: Optional[str] = None, chunk_size: int = 65536) -> Iterator[Dict[str, Any]]:
+    """Yield the items of a JSON array (top-level, or under ``key``) without loading the whole file"""
+    if IJSON_AVAILABLE:
+        import ijson
+        with open(path, 'rb') as f:
+            yield from ijson.items(f, f"{key}.item" if key else "item")
+        return
+
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer = ""
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buffer, eof
+            data = f.read(chunk_size)
+            if not data:
+                eof = True
+                return False
+            buffer += data
+            return True
+
+        # Find the opening bracket of the array
+        marker = f'"{key}"' if key else None
+        while True:
+            start = buffer.find(marker) if marker else 0
+            if start >= 0:
+                bracket = buffer.find('[', start)
+                if bracket >= 0:
+                    buffer = buffer[bracket + 1:]
+                    break
+            if not fill():
+                return
+
+        while True:
+            position = 0
+            while True:
+                while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                    position += 1
+                if position >= len(buffer):
+                    break
+                if buffer[position] == ']':
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    break
+                yield item
+                position = end
+            buffer = buffer[position:]
+            if not fill() and not buffer.strip():
+                return
+
+def iter_entities() -> Iterator[Dict[str, Any]]:
+    """All entities from the knowledge-base files, in file order"""
+    for path, key in ENTITY_FILES:
+        if not path.exists():
+            if key is None:
+                raise FileNotFoundError(f"Could not find entities file at {path}")
+            continue
+        for entity in iter_json_array(path, key):
+            yield {
+                "name": entity['name'],
+                "entityType": entity['entityType'],
+                "observations": [str(o) for o in entity.get('observations', [])],
+            }
+
+def write_prompt(entities: Iterator[Dict[str, Any]], out: TextIO) -> int:
+    """Stream the Claude Desktop prompt to ``out``; returns the number of entities written"""
+    out.write("Claude, please load the following pre-configured system entities into the knowledge graph:\n\n"
+              "Please create these entities using the memory:create_entities tool:\n\n")
+    count = 0
+    for entity in entities:
+        out.write(f"\nEntity: {entity['name']}\nType: {entity['entityType']}\nObservations:\n")
+        out.writelines(f"- {observation}\n" for observation in entity['observations'])
+        out.write("\n")
+        count += 1
+    out.write("\nAfter creating these entities, please confirm that the Claude Desktop Setup "
+              "system knowledge has been successfully loaded.\n")
+    return count
+
+def iter_batches(items: Iterator[Dict[str, Any]], batch_size: int, batch_bytes: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group items into batches capped by count and by serialized size"""
+    batch: List[Dict[str, Any]] = []
+    size = 0
+    for item in items:
+        item_size = len(json.dumps(item, separators=(",", ":")))
+        if batch and (len(batch) >= batch_size or size + item_size > batch_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(item)
+        size += item_size + 1
+    if batch:
+        yield batch
+
+def load_via_mcp(config_path: Optional[Path], server: str, batch_size: int, batch_bytes: int,
+                 timeout: float) -> Dict[str, int]:
+    """Send the entities to the memory server with create_entities, one confirmed batch at a time"""
     try:
-        with open(entities_file, 'r') as f:
-            entities_data = json.load(f)
-        
-        print(f"Loading {len(entities_data)} system entities into knowledge graph...")
-        
-        # Also load starter knowledge if it exists
-        starter_file = os.path.join(script_dir, 'starter-knowledge.json')
-        if os.path.exists(starter_file):
-            print(f"\nLoading starter knowledge...")
-            with open(starter_file, 'r') as f:
-                starter_data = json.load(f)
-                if 'entities' in starter_data:
-                    entities_data.extend(starter_data['entities'])
-                    print(f"Added {len(starter_data['entities'])} starter knowledge entities")
-        
-        # Create a prompt for Claude to execute the knowledge graph creation
-        claude_prompt = """Claude, please load the following pre-configured system entities into the knowledge graph:
-
-Please create these entities using the memory:create_entities tool:
+        from engine.integrations.mcp_stdio import MCPStdioClient, check_tool_result
+    except ImportError:
+        sys.path.append(str(PROJECT_ROOT))
+        from engine.integrations.mcp_stdio import MCPStdioClient, check_tool_result
 
-"""
-        
-        for entity in entities_data:
-            claude_prompt += f"""
-Entity: {entity['name']}
-Type: {entity['entityType']}
-Observations:
-"""
-            for observation in entity['observations']:
-                claude_prompt += f"- {observation}\n"
-            claude_prompt += "\n"
-        
-        claude_prompt += """
-After creating these entities, please confirm that the Claude Desktop Setup system knowledge has been successfully loaded.
-"""
-        
-        # Write the prompt to a file for the user to execute
-        prompt_file = os.path.join(script_dir, 'load_entities_prompt.txt')
-        with open(prompt_file, 'w') as f:
-            f.write(claude_prompt)
-        
-        print(f"Generated Claude prompt saved to: {prompt_file}")
-        print("\nTo load entities, copy and paste the content of the prompt file into Claude Desktop.")
-        print("\nAlternatively, run this command in Claude:")
-        print("Claude, load the pre-configured system entities from the knowledge-base directory.")
-        
-        return True
-        
-    except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON in entities file: {e}")
-        return False
-    except Exception as e:
-        print(f"Error: {e}")
-        return False
+    seen = set()
+    extra_observations: List[Dict[str, Any]] = []
+
+    def new_entities() -> Iterator[Dict[str, Any]]:
+        # A name seen twice (e.g. in both files) becomes add_observations on the first entity
+        for entity in iter_entities():
+            if entity['name'] in seen:
+                extra_observations.append({"entityName": entity['name'], "contents": entity['observations']})
+                continue
+            seen.add(entity['name'])
+            yield entity
+
+    stats = {"entities": 0, "batches": 0, "observation_updates": 0}
+    with MCPStdioClient.from_config(server, config_path, timeout=timeout) as client:
+
+        def send(tool: str, arguments: Dict[str, Any]):
+            # Never pipelined: concurrent calls to the memory server can overwrite each other's writes
+            check_tool_result(server, tool, client.request("tools/call", {"name": tool, "arguments": arguments}))
+            stats["batches"] += 1
+
+        for batch in iter_batches(new_entities(), batch_size, batch_bytes):
+            send("create_entities", {"entities": batch})
+            stats["entities"] += len(batch)
+        # Every entity exists by now, so observations for repeated names always find theirs
+        for batch in iter_batches(iter(extra_observations), batch_size, batch_bytes):
+            send("add_observations", {"observations": batch})
+            stats["observation_updates"] += len(batch)
+    return stats
 
 def main():
     """Main function."""
+    parser = argparse.ArgumentParser(description="Load knowledge-base entities into the memory MCP server")
+    parser.add_argument('--mode', choices=['prompt', 'mcp'], default='prompt',
+                        help="prompt: write a prompt file for Claude Desktop; mcp: load directly over JSON-RPC stdio")
+    parser.add_argument('--config', type=Path, default=PROJECT_ROOT / 'configs' / 'default-mcp-config.json',
+                        help="MCP config with the server definition")
+    parser.add_argument('--server', default='memory', help="Server name in the MCP config")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Entities per create_entities call")
+    parser.add_argument('--batch-bytes', type=int, default=DEFAULT_BATCH_BYTES, help="Max serialized size per call")
+    parser.add_argument('--timeout', type=float, default=120.0, help="Seconds to wait for each call")
+    parser.add_argument('--output', type=Path, default=SCRIPT_DIR / 'load_entities_prompt.txt',
+                        help="Prompt file (prompt mode)")
+    args = parser.parse_args()
+
     print("Claude Desktop Setup - Knowledge Graph Loader")
     print("=" * 50)
-    
-    success = load_system_entities()
-    
-    if success:
-        print("\nKnowledge graph preparation completed successfully!")
-        print("The system is ready for productive AI collaboration.")
-    else:
+
+    started = time.monotonic()
+    try:
+        if args.mode == 'prompt':
+            with open(args.output, 'w') as f:
+                count = write_prompt(iter_entities(), f)
+            print(f"Wrote {count} entities to prompt file: {args.output}")
+            print("\nTo load entities, copy and paste the content of the prompt file into Claude Desktop.")
+        else:
+            stats = load_via_mcp(args.config, args.server, args.batch_size, args.batch_bytes, args.timeout)
+            print(f"Loaded {stats['entities']} entities ({stats['observation_updates']} observation updates) "
+                  f"in {stats['batches']} batches via the '{args.server}' server "
+                  f"in {time.monotonic() - started:.1f}s")
+    except (OSError, ValueError, RuntimeError) as e:
+        # ValueError covers malformed JSON, RuntimeError covers MCP failures
+        print(f"Error: {e}")
         print("\nKnowledge graph preparation failed.")
         print("Please check the error messages above and try again.")
         sys.exit(1)
 
+    print("\nKnowledge graph preparation completed successfully!")
+    print("The system is ready for productive AI collaboration.")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,205 @@
+"""
+Actionability Pre-Filter
+
+Cheap local scoring of paragraphs so reflective writing never reaches the
+model. Each paragraph gets a score in [0, 1] from a small linear model over
+hand-picked features: an action-verb lexicon, imperative mood (any sentence
+or line starting with a verb), obligation phrases ("need to", "remember
+to"), dates and times, list/checkbox markup, and reflective phrasing, which
+counts against it. Paragraphs scoring below the threshold are dropped before
+the extraction prompt is built.
+
+The threshold comes from a recall target: it is the highest score that still
+keeps that fraction of the actionable paragraphs in the calibration set (the
+built-in samples, plus any labelled examples passed to ``calibrate``). The
+built-in set is small, so the target only holds for writing that resembles
+it; the filter is therefore off unless ``prefilter.enabled`` is set, ideally
+after calibrating on labelled paragraphs from your own notes.
+"""
+
+import re
+import math
+import threading
+from dataclasses import dataclass, field
+from typing import List, Tuple, Dict, Optional, Iterable
+
+PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+# Clause boundaries within a line ("...the garden. Fix the fence.", "...is overdue, chase it.")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?;:,])\s+")
+
+ACTION_VERBS = {
+    'add', 'ask', 'book', 'buy', 'call', 'cancel', 'change', 'check', 'clean', 'collect',
+    'confirm', 'contact', 'create', 'deliver', 'download', 'draft', 'drop', 'email', 'file',
+    'finish', 'fix', 'follow', 'get', 'install', 'invite', 'make', 'message', 'move', 'order',
+    'organize', 'pay', 'pick', 'plan', 'prepare', 'print', 'read', 'register', 'remind', 'renew',
+    'repair', 'reply', 'request', 'research', 'reschedule', 'return', 'review', 'schedule',
+    'send', 'set', 'share', 'sign', 'start', 'submit', 'text', 'update', 'upload', 'visit',
+    'write', 'arrange', 'apply', 'backup', 'bring', 'clear', 'complete', 'sort', 'test', 'try',
+    'chase', 'feed', 'mow', 'pack', 'post', 'take', 'walk', 'wash', 'water',
+}
+
+OBLIGATION = re.compile(
+    r"\b(need(s)?( to)?|have to|has to|must|should|gotta|got to|remember to|don'?t forget|"
+    r"going to|want to|plan to|todo|to-do|follow up|action item|next step)\b", re.IGNORECASE)
+TEMPORAL = re.compile(
+    r"\b(today|tonight|tomorrow|this (morning|afternoon|evening|week|weekend)|next (week|month)|"
+    r"(mon|tues|wednes|thurs|fri|satur|sun)day|by (eod|end of|the)|deadline|(over)?due|asap|"
+    r"\d{1,2}(:\d{2})?\s?(am|pm)|\d{4}-\d{2}-\d{2}|(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]* \d{1,2})\b",
+    re.IGNORECASE)
+LIST_MARKUP = re.compile(r"^\s*([-*+•]\s+\[[ xX]?\]|[-*+•]\s+|\d+[.)]\s+|TODO\b|TASK\b)", re.MULTILINE)
+# "Groceries: milk, eggs" - a short label followed by a comma-separated list
+LABELLED_LIST = re.compile(r"^\s*[A-Za-z][\w ]{0,30}:\s*[^,\n]+(,[^,\n]+)+", re.MULTILINE)
+REFLECTIVE = re.compile(
+    r"\b(i (feel|felt|think|thought|wonder|wish|noticed|realized|remember when|was)|grateful|"
+    r"feeling|dream(t|ed)?|mood|anxious|happy|sad|tired|lately|honestly|it seems|maybe)\b",
+    re.IGNORECASE)
+WORD = re.compile(r"[A-Za-z']+")
+
+# Feature weights and bias of the linear model (logit scale)
+WEIGHTS = {
+    'imperative': 2.2,
+    'verb_count': 0.6,
+    'obligation': 1.6,
+    'temporal': 0.9,
+    'list_markup': 1.4,
+    'reflective': -0.9,
+    'short': -1.0,
+}
+BIAS = -2.0
+
+# Labelled samples used to turn a recall target into a threshold
+CALIBRATION_SAMPLES: List[Tuple[str, bool]] = [
+    ("Call the dentist tomorrow to reschedule the cleaning.", True),
+    ("- [ ] renew passport before March", True),
+    ("I need to email Sarah about the budget numbers by Friday.", True),
+    ("Remember to pick up the dry cleaning.", True),
+    ("Book flights for the conference next week.", True),
+    ("TODO: fix the leaking kitchen tap", True),
+    ("Should probably review the insurance policy this weekend.", True),
+    ("Have to send the invoice to the client today.", True),
+    ("Buy milk, eggs and coffee.", True),
+    ("Follow up with the landlord about the heating.", True),
+    ("Going to start drafting the blog post tonight.", True),
+    ("1. Submit expense report\n2. Update the roadmap doc", True),
+    ("Maybe I should finally research standing desks.", True),
+    ("Mom's birthday is on the 14th, order flowers.", True),
+    ("I was thinking about the garden. Fix the fence.", True),
+    ("Walk the dog", True),
+    ("Need milk.", True),
+    ("Groceries: milk, eggs.", True),
+    ("Invoice for Acme is overdue, chase it.", True),
+    ("I felt anxious most of yesterday and I'm not sure why.", False),
+    ("Grateful for the quiet morning and the good coffee.", False),
+    ("I dreamt I was back at school, running late for an exam.", False),
+    ("Honestly the week has been a blur. Lots of meetings, not much thinking.", False),
+    ("The light through the window was beautiful today.", False),
+    ("I wonder whether I am spending my time on the right things.", False),
+    ("Feeling tired but happy after the long walk.", False),
+    ("It seems like everyone at work is stretched thin lately.", False),
+    ("Three pages again. The habit is sticking.", False),
+    ("I noticed I was calmer after meditating.", False),
+]
+
+def extract_features(paragraph: str) -> Dict[str, float]:
+    """Feature values for one paragraph"""
+    lines = [line.strip(" \t-*+•>#") for line in paragraph.splitlines() if line.strip()]
+    words = [w.lower() for w in WORD.findall(paragraph)]
+    first_words = set()
+    for line in lines:
+        for sentence in SENTENCE_SPLIT.split(line):
+            sentence_words = WORD.findall(sentence)
+            if sentence_words:
+                first_words.add(sentence_words[0].lower())
+    verbs = sum(1 for w in words if w in ACTION_VERBS)
+    imperative = bool(first_words & ACTION_VERBS)
+    obligation = bool(OBLIGATION.search(paragraph))
+    return {
+        'imperative': 1.0 if imperative else 0.0,
+        'verb_count': min(verbs, 3),
+        'obligation': 1.0 if obligation else 0.0,
+        'temporal': 1.0 if TEMPORAL.search(paragraph) else 0.0,
+        'list_markup': 1.0 if LIST_MARKUP.search(paragraph) or LABELLED_LIST.search(paragraph) else 0.0,
+        'reflective': min(len(REFLECTIVE.findall(paragraph)), 2),
+        # Fragments are only penalized when nothing else marks them as tasks ("Need milk." is one)
+        'short': 1.0 if len(words) < 3 and not (imperative or obligation) else 0.0,
+    }
+
+def score_paragraph(paragraph: str) -> float:
+    """Probability-like actionability score in [0, 1]"""
+    features = extract_features(paragraph)
+    logit = BIAS + sum(WEIGHTS[name] * value for name, value in features.items())
+    return 1.0 / (1.0 + math.exp(-logit))
+
+def threshold_for_recall(samples: Iterable[Tuple[str, bool]], recall_target: float) -> float:
+    """Highest threshold that keeps at least ``recall_target`` of the actionable samples"""
+    positives = sorted((score_paragraph(text) for text, actionable in samples if actionable), reverse=True)
+    if not positives:
+        return 0.0
+    keep = max(1, math.ceil(recall_target * len(positives)))
+    return positives[min(keep, len(positives)) - 1]
+
+@dataclass
+class FilterResult:
+    """Outcome of filtering one text"""
+    text: str
+    kept: int = 0
+    skipped: int = 0
+    skipped_chars: int = 0
+    scores: List[float] = field(default_factory=list)
+
+class ActionabilityFilter:
+    """Drops paragraphs unlikely to contain tasks and counts what it skipped"""
+
+    def __init__(self, threshold: Optional[float] = None, recall_target: float = 0.95):
+        self.recall_target = recall_target
+        self.threshold = threshold if threshold is not None else \
+            threshold_for_recall(CALIBRATION_SAMPLES, recall_target)
+        self._lock = threading.Lock()
+        self.stats = {"texts": 0, "texts_skipped": 0, "paragraphs": 0,
+                      "paragraphs_skipped": 0, "chars": 0, "chars_skipped": 0}
+
+    @classmethod
+    def from_settings(cls) -> Optional['ActionabilityFilter']:
+        """Filter configured by the ``prefilter`` section, or None unless enabled"""
+        from engine.config import settings
+        config = settings.get_section('prefilter')
+        if not config.get('enabled', False):
+            return None
+        return cls(threshold=config.get('threshold'), recall_target=float(config.get('recall_target', 0.95)))
+
+    def calibrate(self, samples: Iterable[Tuple[str, bool]], recall_target: Optional[float] = None) -> float:
+        """Re-derive the threshold from labelled (text, actionable) samples plus the built-in ones"""
+        if recall_target is not None:
+            self.recall_target = recall_target
+        self.threshold = threshold_for_recall(list(CALIBRATION_SAMPLES) + list(samples), self.recall_target)
+        return self.threshold
+
+    def keep(self, paragraph: str) -> bool:
+        return score_paragraph(paragraph) >= self.threshold
+
+    def filter(self, text: str) -> FilterResult:
+        """Return the text with non-actionable paragraphs removed"""
+        kept_paragraphs = []
+        result = FilterResult(text="")
+        for paragraph in PARAGRAPH_SPLIT.split(text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            score = score_paragraph(paragraph)
+            result.scores.append(score)
+            if score >= self.threshold:
+                kept_paragraphs.append(paragraph)
+                result.kept += 1
+            else:
+                result.skipped += 1
+                result.skipped_chars += len(paragraph)
+        result.text = "\n\n".join(kept_paragraphs)
+
+        with self._lock:
+            self.stats["texts"] += 1
+            self.stats["texts_skipped"] += int(result.kept == 0)
+            self.stats["paragraphs"] += result.kept + result.skipped
+            self.stats["paragraphs_skipped"] += result.skipped
+            self.stats["chars"] += len(text)
+            self.stats["chars_skipped"] += result.skipped_chars
+        return result
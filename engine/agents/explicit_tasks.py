@@ -0,0 +1,153 @@
+"""
+Explicit Task Parser
+
+Deterministic extraction of tasks the author already wrote down as tasks:
+unchecked Markdown checkboxes (``- [ ] call dentist tomorrow``) and
+``TODO:`` / ``TASK:`` / ``ACTION:`` lines (the colon is required). Priority
+markers (Obsidian Tasks emoji, ``p1``-``p4``, ``!!``/``!!!``) and due hints
+(``📅 2024-05-01``, ``due: friday``, ``[due:: ...]``, or words like
+"tomorrow") are mapped onto ExtractedTask fields. Completed or cancelled
+checkboxes are dropped.
+
+These lines never need the model. ``extract_offline`` adds a conservative
+imperative-line heuristic on top, used when no provider is reachable.
+"""
+
+import re
+from typing import List, Tuple, Optional, Dict
+
+from engine.agents.actionability import score_paragraph
+
+# Explicit tasks are as reliable as the author's own markup
+EXPLICIT_CONFIDENCE = 0.95
+# Offline guesses just clear validation and always ask for confirmation
+OFFLINE_CONFIDENCE = 0.6
+OFFLINE_MIN_SCORE = 0.7
+
+CHECKBOX = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+\[(?P<state>[^\]])\]\s+(?P<body>.+?)\s*$")
+# The colon is required: prose such as "TODO list for the week" is not a task
+TODO_LINE = re.compile(r"^\s*(?:[-*+]\s+)?(?i:todo|task|action(?: item)?)\s*:\s*(?P<body>.+?)\s*$")
+
+PRIORITY_MARKERS = [
+    (re.compile(r"\s*(?:🔺|⏫|!!!)(?=\s|$)"), "P1"),
+    (re.compile(r"\s*(?:!!)(?=\s|$)"), "P2"),
+    (re.compile(r"\s*🔼"), "P3"),
+    (re.compile(r"\s*(?:🔽|⏬)"), "P4"),
+    (re.compile(r"\s*#(?:urgent|important)\b", re.IGNORECASE), "P2"),
+]
+TODOIST_PRIORITY = re.compile(r"(?:^|\s)\(?([pP][1-4])\)?(?=\s|$)")
+
+DATE = r"\d{4}-\d{2}-\d{2}"
+DUE_MARKERS = [
+    re.compile(rf"\s*📅\s*(?P<due>{DATE})"),
+    re.compile(r"\s*\[due::\s*(?P<due>[^\]]+)\]", re.IGNORECASE),
+    re.compile(r"\s*@due\((?P<due>[^)]+)\)", re.IGNORECASE),
+    re.compile(rf"\s*\bdue:\s*(?P<due>{DATE}|[A-Za-z]+(?: [A-Za-z]+)?)", re.IGNORECASE),
+    re.compile(rf"\s*⏳\s*(?P<due>{DATE})"),
+]
+RECURRENCE = re.compile(r"\s*🔁\s*(?P<due>[^📅⏳🛫✅➕🔺⏫🔼🔽⏬]+)")
+METADATA = re.compile(rf"\s*(?:🛫|✅|➕)\s*{DATE}")
+NATURAL_DUE = re.compile(
+    r"\b(?:by\s+)?(?P<due>today|tonight|tomorrow|this (?:morning|afternoon|evening|week|weekend)|"
+    r"next (?:week|month|(?:mon|tues|wednes|thurs|fri|satur|sun)day)|end of (?:the )?(?:day|week|month)|"
+    r"(?:on )?(?:mon|tues|wednes|thurs|fri|satur|sun)day)\b",
+    re.IGNORECASE)
+WIKILINK = re.compile(r"\[\[(?:[^\]|]+\|)?([^\]]+)\]\]")
+
+def _parse_body(body: str) -> Optional[Dict[str, Optional[str]]]:
+    """Strip markers from a task line, returning content, priority and due hint"""
+    priority = None
+    due = None
+
+    for pattern, level in PRIORITY_MARKERS:
+        if pattern.search(body):
+            body = pattern.sub("", body)
+            priority = priority or level
+    match = TODOIST_PRIORITY.search(body)
+    if match:
+        priority = priority or match.group(1).upper()
+        body = body[:match.start()] + body[match.end():]
+
+    for pattern in DUE_MARKERS:
+        match = pattern.search(body)
+        if match:
+            due = due or match.group('due').strip()
+            body = body[:match.start()] + body[match.end():]
+    match = RECURRENCE.search(body)
+    if match:
+        due = due or match.group('due').strip()
+        body = body[:match.start()] + body[match.end():]
+    body = METADATA.sub("", body)
+
+    if due is None:
+        match = NATURAL_DUE.search(body)
+        if match:
+            due = match.group('due').lower()
+            if due.startswith('on '):
+                due = due[3:]
+
+    content = WIKILINK.sub(r"\1", " ".join(body.split())).strip(" -:")
+    if len(content) < 3:
+        return None
+    return {"content": content, "priority": priority or "P3", "due_date": due}
+
+def split_explicit_tasks(text: str) -> Tuple[List['ExtractedTask'], str]:
+    """
+    Pull explicit tasks out of a text
+
+    Returns the tasks and the remaining text with task lines (including
+    completed checkboxes) removed, ready for the model.
+    """
+    from engine.agents.task_extractor import ExtractedTask
+
+    tasks = []
+    remaining_lines = []
+    for line in text.splitlines():
+        match = CHECKBOX.match(line)
+        if match:
+            if match.group('state') == ' ':
+                parsed = _parse_body(match.group('body'))
+                if parsed:
+                    tasks.append(ExtractedTask(confidence=EXPLICIT_CONFIDENCE, context="Checkbox in note", **parsed))
+            continue
+        match = TODO_LINE.match(line)
+        if match:
+            parsed = _parse_body(match.group('body'))
+            if parsed:
+                tasks.append(ExtractedTask(confidence=EXPLICIT_CONFIDENCE, context="TODO line in note", **parsed))
+                continue
+        remaining_lines.append(line)
+    return tasks, "\n".join(remaining_lines).strip()
+
+def parse_explicit_tasks(text: str) -> List['ExtractedTask']:
+    return split_explicit_tasks(text)[0]
+
+def extract_offline(text: str) -> List['ExtractedTask']:
+    """
+    Best-effort extraction without a model
+
+    Explicit tasks, plus lines that read strongly as instructions to oneself
+    (imperative or "need to ..."), which are flagged for confirmation.
+    """
+    from engine.agents.task_extractor import ExtractedTask
+
+    tasks, remainder = split_explicit_tasks(text)
+    seen = {task.content.lower() for task in tasks}
+    for line in remainder.splitlines():
+        line = line.strip(" \t-*+•>")
+        if not line or line.startswith('#') or len(line) > 200:
+            continue
+        if score_paragraph(line) < OFFLINE_MIN_SCORE:
+            continue
+        parsed = _parse_body(line)
+        if not parsed or parsed["content"].lower() in seen:
+            continue
+        seen.add(parsed["content"].lower())
+        tasks.append(ExtractedTask(
+            confidence=OFFLINE_CONFIDENCE,
+            context="Extracted offline",
+            requires_confirmation=True,
+            confirmation_reason="Extracted offline while the AI model was unavailable",
+            **parsed
+        ))
+    return tasks
@@ -0,0 +1,156 @@
+"""
+Prompt Compression
+
+Shrinks note text before it goes into the extraction prompt, removing
+markup that costs input tokens but says nothing about what needs doing:
+
+- YAML frontmatter, Obsidian ``%% comments %%`` and HTML comments
+- embeds and images (``![[...]]``, ``![alt](...)``)
+- link syntax: ``[text](url)`` -> text, ``[[Note|alias]]`` -> alias (bare URLs
+  are kept whole: they are often what a task is about)
+- optionally, quoted lines (``drop_quotes``, off by default), except callouts,
+  checkboxes and lines with an action verb or obligation phrase
+- query blocks (dataview/tasks code fences), horizontal rules
+- boilerplate sections by heading (e.g. "Gratitude", "Weather") and a heading
+  repeated right after itself
+- whitespace runs and blank-line stacks
+
+Each step can be switched off in the ``compression`` settings section.
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List
+
+from engine.agents.actionability import ACTION_VERBS, OBLIGATION
+from engine.integrations.ai_models import estimate_tokens
+
+DEFAULT_BOILERPLATE = ["Gratitude", "Affirmations", "Quote of the Day", "Weather", "Habit Tracker"]
+
+FRONTMATTER = re.compile(r"\A﻿?---\s*\n.*?\n(?:---|\.\.\.)\s*(?:\n|\Z)", re.DOTALL)
+OBSIDIAN_COMMENT = re.compile(r"%%.*?%%", re.DOTALL)
+HTML_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+QUERY_BLOCK = re.compile(r"^```(?:dataview|dataviewjs|tasks|query)\b.*?^```\s*$", re.DOTALL | re.MULTILINE)
+EMBED = re.compile(r"!\[\[[^\]]*\]\]|!\[[^\]]*\]\([^)]*\)")
+MD_LINK = re.compile(r"\[([^\]]+)\]\((?:[^()]|\([^)]*\))*\)")
+WIKILINK = re.compile(r"\[\[(?:[^\]|#]*#)?(?:[^\]|]+\|)?([^\]]+)\]\]")
+QUOTE_CALLOUT = re.compile(r"^\s*(?:>\s*)+\[![^\]]+\]")
+CHECKBOX = re.compile(r"[-*+]\s+\[[ xX/-]?\]")
+WORD = re.compile(r"[A-Za-z']+")
+HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+RULE = re.compile(r"^\s*(?:[-*_]\s*){3,}$")
+INLINE_SPACE = re.compile(r"[ \t ]+")
+
+@dataclass
+class CompressionResult:
+    """Compressed text and its estimated token counts"""
+    text: str
+    original_tokens: int
+    compressed_tokens: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.compressed_tokens
+
+class PromptCompressor:
+    """Configurable, intent-preserving compression of note text"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config = dict(config or {})
+        self.strip_frontmatter = config.get('strip_frontmatter', True)
+        self.drop_comments = config.get('drop_comments', True)
+        self.drop_embeds = config.get('drop_embeds', True)
+        self.collapse_links = config.get('collapse_links', True)
+        self.drop_quotes = config.get('drop_quotes', False)
+        self.dedupe_headings = config.get('dedupe_headings', True)
+        self.boilerplate_sections = {name.strip().lower()
+                                     for name in config.get('boilerplate_sections', DEFAULT_BOILERPLATE)}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "original_tokens": 0, "compressed_tokens": 0}
+
+    @classmethod
+    def from_settings(cls) -> Optional['PromptCompressor']:
+        """Compressor configured by the ``compression`` section, or None when disabled"""
+        from engine.config import settings
+        config = settings.get_section('compression')
+        if not config.get('enabled', True):
+            return None
+        return cls(config)
+
+    def compress_text(self, text: str) -> str:
+        if self.strip_frontmatter:
+            text = FRONTMATTER.sub("", text)
+        if self.drop_comments:
+            text = OBSIDIAN_COMMENT.sub("", HTML_COMMENT.sub("", text))
+        text = QUERY_BLOCK.sub("", text)
+        if self.drop_embeds:
+            text = EMBED.sub("", text)
+        if self.collapse_links:
+            text = MD_LINK.sub(r"\1", text)
+            text = WIKILINK.sub(r"\1", text)
+        return self._filter_lines(text)
+
+    def _filter_lines(self, text: str) -> str:
+        """Line pass: quotes, rules, boilerplate sections, repeated headings, whitespace"""
+        lines: List[str] = []
+        last_heading = None
+        skip_level = 0  # inside a boilerplate section at this heading level
+        blank = True
+        for raw_line in text.splitlines():
+            line = INLINE_SPACE.sub(" ", raw_line).rstrip()
+            heading = HEADING.match(line.strip())
+            if heading:
+                level = len(heading.group(1))
+                if skip_level and level > skip_level:
+                    continue
+                skip_level = 0
+                title = heading.group(2).strip().strip(":").lower()
+                # Only a heading repeating the one just before it goes: dropping a later
+                # repeat would move its lines under whatever heading came in between
+                repeated = title == last_heading
+                last_heading = title
+                if title in self.boilerplate_sections:
+                    skip_level = level
+                    continue
+                if self.dedupe_headings and repeated:
+                    continue
+            elif skip_level:
+                continue
+            if self.drop_quotes and line.lstrip().startswith(">") and not self._quote_has_intent(line):
+                continue
+            if RULE.match(line):
+                continue
+            if not line.strip():
+                if not blank:
+                    lines.append("")
+                blank = True
+                continue
+            lines.append(line)
+            blank = False
+        return "\n".join(lines).strip()
+
+    @staticmethod
+    def _quote_has_intent(line: str) -> bool:
+        """Whether a quoted line may hold a task: a callout, a checkbox, an action verb or obligation"""
+        if QUOTE_CALLOUT.match(line) or CHECKBOX.search(line) or OBLIGATION.search(line):
+            return True
+        return any(word.lower() in ACTION_VERBS for word in WORD.findall(line))
+
+    def compress(self, text: str) -> CompressionResult:
+        """Compress text and record the token savings"""
+        compressed = self.compress_text(text)
+        result = CompressionResult(compressed, estimate_tokens(text), estimate_tokens(compressed))
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["original_tokens"] += result.original_tokens
+            self.stats["compressed_tokens"] += result.compressed_tokens
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        original = stats["original_tokens"]
+        stats["saved_tokens"] = original - stats["compressed_tokens"]
+        stats["saved_ratio"] = round(stats["saved_tokens"] / original, 4) if original else 0.0
+        return stats
@@ -8,11 +8,13 @@ following the agent definition constraints and guardrails.
 import os
 import re
 import json
+import asyncio
 import logging
 import sys
+import importlib.util
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from dataclasses import dataclass, asdict
 from datetime import datetime
 
 # Add project root to path dynamically
@@ -21,7 +23,13 @@ try:
     from engine.config import settings
     from engine.utils.self_contained_agent import SelfContainedAgent
     from engine.integrations.ai_models import AIModelClient, ModelResponse
-    from engine.integrations.todoist_client import TodoistClient, TodoistTask, TodoistSection
+    from engine.integrations.todoist_client import (
+        TodoistClient, AsyncTodoistClient, TodoistTask, TodoistSection, resolve_project_id
+    )
+    from engine.agents.actionability import ActionabilityFilter
+    from engine.agents.explicit_tasks import split_explicit_tasks, extract_offline
+    from engine.agents.prompt_compression import PromptCompressor
+    from engine.utils.extraction_ledger import content_hash
 except ImportError:
     # Fallback for direct execution
     project_root = Path(__file__).parent.parent.parent
@@ -30,13 +38,23 @@ except ImportError:
     from engine.config import settings
     from engine.utils.self_contained_agent import SelfContainedAgent
     from engine.integrations.ai_models import AIModelClient, ModelResponse
-    from engine.integrations.todoist_client import TodoistClient, TodoistTask, TodoistSection
+    from engine.integrations.todoist_client import (
+        TodoistClient, AsyncTodoistClient, TodoistTask, TodoistSection, resolve_project_id
+    )
+    from engine.agents.actionability import ActionabilityFilter
+    from engine.agents.explicit_tasks import split_explicit_tasks, extract_offline
+    from engine.agents.prompt_compression import PromptCompressor
+    from engine.utils.extraction_ledger import content_hash
 
-try:
-    from engine.integrations.enhanced_memory_v2 import EnhancedMemorySystem
-    MEMORY_AVAILABLE = True
-except ImportError:
-    MEMORY_AVAILABLE = False
+# Memory backends pull in numpy/chromadb, so only check availability here and
+# import them when the memory system is first used
+MEMORY_AVAILABLE = importlib.util.find_spec('engine.integrations.enhanced_memory_v2') is not None
+LOCAL_MEMORY_AVAILABLE = importlib.util.find_spec('numpy') is not None
+
+_UNSET = object()
+
+class ExtractionError(RuntimeError):
+    """Raised when the model call fails and the caller asked for no offline fallback"""
 
 @dataclass
 class ExtractedTask:
@@ -49,31 +67,128 @@ class ExtractedTask:
     confidence: float = 0.0
     requires_confirmation: bool = False
     confirmation_reason: Optional[str] = None
+    source_hash: Optional[str] = None  # Ledger hash of the text block it came from
+
+def build_extraction_prompt(text: str, source: str) -> str:
+    """Build the user prompt with the text to analyze (no agent state needed)"""
+    
+    prompt = f"""Please extract actionable tasks from the following text:
+
+SOURCE: {source}
+TEXT:
+{text}
+
+Extract only clear, actionable items that can be completed. Ignore general thoughts, reflections, or vague ideas. Focus on specific actions with verbs like: call, email, write, research, book, schedule, buy, fix, etc.
+
+Return the tasks as a JSON array following the specified format."""
+    
+    return prompt
 
 class TaskExtractorAgent(SelfContainedAgent):
     """Agent that extracts tasks from morning pages and other text"""
     
-    def __init__(self, agent_definition: Optional[Dict[str, Any]] = None):
+    def __init__(self, agent_definition: Optional[Dict[str, Any]] = None,
+                 ai_client: Optional[AIModelClient] = None,
+                 todoist_client: Optional[TodoistClient] = None):
         # Initialize self-contained agent base
         super().__init__("task_extractor", agent_definition)
         
         # Store agent definition for compatibility
         self.agent_def = agent_definition or {}
-        self.ai_client = AIModelClient()
-        self.todoist_client = TodoistClient()
+        # Clients may be shared across agents (see engine.utils.registry)
+        self._owned_clients = []
+        if ai_client is None:
+            ai_client = AIModelClient()
+            self._owned_clients.append(ai_client)
+        if todoist_client is None:
+            todoist_client = TodoistClient()
+            self._owned_clients.append(todoist_client)
+        self.ai_client = ai_client
+        self.todoist_client = todoist_client
         
-        # Initialize memory system for context enrichment
-        self.memory_system = None
-        if MEMORY_AVAILABLE:
-            try:
-                self.memory_system = EnhancedMemorySystem()
-                self.logger.info("Enhanced Memory System initialized for task enrichment")
-            except Exception as e:
-                self.logger.warning(f"Failed to initialize memory system: {e}")
+        # Memory system for context enrichment is initialized on first use
+        self._memory_system = _UNSET
+        
+        # Durable queue for Todoist writes, opened on first use
+        self._outbox = _UNSET
+        
+        # Ledger of already-processed text for idempotent re-runs
+        self.ledger = self._init_ledger()
+        
+        # Local scoring that keeps reflective paragraphs out of the prompt
+        self.prefilter = ActionabilityFilter.from_settings()
+        
+        # Strips markup and boilerplate that cost tokens without carrying intent
+        self.compressor = PromptCompressor.from_settings()
         
         # Load context files for better task extraction
         self.context = self._load_context_files()
     
+    @property
+    def memory_system(self):
+        """Memory backend used for context enrichment, created on first access"""
+        if self._memory_system is _UNSET:
+            self._memory_system = self._init_memory_system()
+        return self._memory_system
+    
+    @memory_system.setter
+    def memory_system(self, value):
+        self._memory_system = value
+    
+    def _init_memory_system(self):
+        """Initialize the configured memory backend, falling back to the local store"""
+        memory_config = settings.get_memory_config()
+        backend = memory_config.get('backend', 'local')
+        
+        if backend == 'chromadb':
+            if MEMORY_AVAILABLE:
+                try:
+                    from engine.integrations.enhanced_memory_v2 import EnhancedMemorySystem
+                    memory_system = EnhancedMemorySystem()
+                    self.logger.info("Enhanced Memory System initialized for task enrichment")
+                    return memory_system
+                except Exception as e:
+                    self.logger.warning(f"Failed to initialize memory system: {e}")
+            else:
+                self.logger.info("Enhanced Memory System not available, using local memory backend")
+        
+        if LOCAL_MEMORY_AVAILABLE:
+            try:
+                from engine.integrations.local_memory import LocalMemorySystem
+                memory_system = LocalMemorySystem(
+                    path=settings.memory_path,
+                    ivf_threshold=memory_config.get('ivf_threshold', 50000)
+                )
+                self.logger.info(f"Local memory backend initialized ({memory_system.count} memories)")
+                return memory_system
+            except Exception as e:
+                self.logger.warning(f"Failed to initialize local memory backend: {e}")
+        
+        return None
+    
+    @property
+    def outbox(self):
+        """Shared durable Todoist outbox, or None when todoist.outbox is disabled"""
+        if self._outbox is _UNSET:
+            try:
+                from engine.integrations.todoist_outbox import get_todoist_outbox
+                self._outbox = get_todoist_outbox()
+            except Exception as e:
+                self.logger.warning(f"Todoist outbox unavailable, writing directly: {e}")
+                self._outbox = None
+        return self._outbox
+    
+    def _init_ledger(self):
+        """Open the extraction ledger unless disabled in settings"""
+        if not settings.get_section('ledger').get('enabled', True):
+            return None
+        try:
+            from engine.utils.extraction_ledger import ExtractionLedger
+            return ExtractionLedger()
+        except Exception as e:
+            self.logger.warning(f"Extraction ledger unavailable: {e}")
+            return None
+    
     def _load_context_files(self) -> Dict[str, str]:
         """Load context files specified in agent definition"""
         context = {}
@@ -87,11 +202,11 @@ class TaskExtractorAgent(SelfContainedAgent):
                 try:
                     with open(file_path, 'r') as f:
                         context[context_file] = f.read()
-                    self.logger.debug(f"Loaded context: {context_file}")
+                    self.logger.debug("Loaded context: %s", context_file)
                 except Exception as e:
                     self.logger.warning(f"Failed to load context {context_file}: {e}")
             else:
-                self.logger.debug(f"Context file not found (skipped): {file_path}")
+                self.logger.debug("Context file not found (skipped): %s", file_path)
         
         return context
 
@@ -156,41 +271,245 @@ class TaskExtractorAgent(SelfContainedAgent):
                 "status": "failed"
             }
 
-    def extract_tasks_from_text_original(self, text: str, source: str = "unknown") -> List[ExtractedTask]:
-        """Extract tasks from the given text using AI"""
-        
-        # Build context-aware prompt
-        system_prompt = self._build_system_prompt()
-        user_prompt = self._build_extraction_prompt(text, source)
-        
-        # Get model preference from agent definition
-        model_pref = self.agent_def.get('model_preference', {})
-        primary_model = model_pref.get('primary', 'gpt-4o-mini')
+    def extract_tasks_from_text_original(self, text: str, source: str = "unknown",
+                                         priority: str = "normal", offline_fallback: bool = True) -> List[ExtractedTask]:
+        """
+        Extract tasks from the given text using AI (priority: low, normal or high, for the budget governor)
+
+        When the model call fails the offline heuristics are used instead, or,
+        with ``offline_fallback=False``, ExtractionError is raised so callers
+        that keep their own progress can retry the text later. Work the spend
+        governor refuses raises BudgetExceededError either way.
+        """
+        return self.extract_block(text, source, priority, offline_fallback=offline_fallback)
+    
+    def extract_block(self, text: str, source: str = "unknown", priority: str = "normal",
+                      prompt: Optional[str] = None, offline_fallback: bool = True,
+                      before_call: Optional[Callable[[], None]] = None) -> List[ExtractedTask]:
+        """
+        Extract tasks from one block of text at the given priority
+
+        ``prompt`` is an extraction prompt already built for the block (with
+        build_extraction_prompt, e.g. in a worker process); without one it is
+        built here, and an empty one means the block holds only explicit
+        tasks. ``before_call`` runs just before the model is called, so
+        callers can throttle real calls without counting ledger hits.
+        """
+        # Serve repeat inputs from the ledger instead of paying for them again
+        cached_tasks = self._lookup_ledger(text, source)
+        if cached_tasks is not None:
+            return cached_tasks
+        
+        # Checkbox and TODO lines are parsed locally and never sent to the model
+        explicit_tasks, remainder = split_explicit_tasks(text)
+        
+        if prompt is None:
+            # Compress, then drop paragraphs with nothing actionable before paying for them
+            prompt_text = self._prepare_prompt_text(remainder, source)
+            prompt = self._build_extraction_prompt(prompt_text, source) if prompt_text else ""
+        if not prompt:
+            if not explicit_tasks:
+                self.logger.debug("Pre-filter skipped %s: nothing actionable", source)
+                return []
+            return self._finalize_tasks(text, source, explicit_tasks, model="explicit")
         
         # Call AI model for task extraction
-        response = self.ai_client.call_model(
-            model=primary_model,
-            prompt=user_prompt,
-            system_prompt=system_prompt,
-            max_tokens=1500
-        )
+        if before_call is not None:
+            before_call()
+        response = self._request_extraction(prompt, priority)
         
         if not response.success:
             self.logger.error(f"AI model call failed: {response.error}")
-            return []
-        
-        # Parse the AI response into ExtractedTask objects
-        tasks = self._parse_ai_response(response.content)
+            if not offline_fallback:
+                raise ExtractionError(response.error or "AI model call failed")
+            return self._extract_offline(text, source)
         
+        return self._finish_extraction(text, source, response, explicit_tasks)
+    
+    def _extract_offline(self, text: str, source: str) -> List[ExtractedTask]:
+        """Deterministic fallback when the model is unavailable (not recorded in the ledger)"""
+        tasks = self._finalize_tasks(text, source, extract_offline(text), model="offline", record=False)
+        if tasks:
+            self.logger.warning("Model unavailable, extracted %d tasks offline from %s", len(tasks), source)
+        return tasks
+    
+    def _lookup_ledger(self, text: str, source: str) -> Optional[List[ExtractedTask]]:
+        """Return previously extracted tasks for this text, or None if it is new"""
+        if not self.ledger:
+            return None
+        entry = self.ledger.lookup(text)
+        if entry is None:
+            return None
+        self.logger.info("Ledger hit for %s: %d tasks (model %s)", source, len(entry.tasks), entry.model)
+        return [ExtractedTask(**dict(task, source_hash=entry.content_hash)) for task in entry.tasks]
+    
+    def _prepare_prompt_text(self, text: str, source: str) -> str:
+        """Compressed and pre-filtered text for the extraction prompt (empty when nothing is left)"""
+        if not text:
+            return ""
+        return self._prefilter_text(self._compress_text(text, source))
+    
+    def _compress_text(self, text: str, source: str) -> str:
+        """Text with frontmatter, link syntax and boilerplate removed (unchanged when compression is off)"""
+        if self.compressor is None:
+            return text
+        result = self.compressor.compress(text)
+        self.logger.debug("Compressed %s: %d -> %d tokens (%d saved)", source,
+                          result.original_tokens, result.compressed_tokens, result.saved_tokens)
+        return result.text
+    
+    def _prefilter_text(self, text: str) -> str:
+        """Text with non-actionable paragraphs removed (unchanged when the pre-filter is off)"""
+        if self.prefilter is None:
+            return text
+        return self.prefilter.filter(text).text
+    
+    def primary_model(self) -> str:
+        """Get model preference from agent definition"""
+        model_pref = self.agent_def.get('model_preference', {})
+        return model_pref.get('primary', 'gpt-4o-mini')
+    
+    def budget_decision(self, priority: str = "normal", enforce: bool = False):
+        """
+        Spend governor's model/mode choice, or None when budgeting is disabled
+
+        With ``enforce`` set, refused work raises BudgetExceededError instead
+        of returning a decision that is not allowed.
+        """
+        from engine.utils.budget_governor import get_budget_governor
+        governor = get_budget_governor()
+        if governor is None:
+            return None
+        if enforce:
+            return governor.check(self.primary_model(), priority)
+        return governor.decide(self.primary_model(), priority)
+    
+    def _request_extraction(self, user_prompt: str, priority: str = "normal") -> ModelResponse:
+        """
+        Send a prepared extraction prompt to the preferred model, downshifting under spend pressure
+
+        Raises BudgetExceededError when the governor refuses work of this priority.
+        """
+        model = self.primary_model()
+        decision = self.budget_decision(priority, enforce=True)
+        if decision is not None:
+            model = decision.model
+        return self.ai_client.call_model(
+            model=model,
+            prompt=user_prompt,
+            system_prompt=self._build_system_prompt(),
+            max_tokens=1500
+        )
+    
+    def _finish_extraction(self, text: str, source: str, response: ModelResponse,
+                           explicit_tasks: Optional[List[ExtractedTask]] = None) -> List[ExtractedTask]:
+        """Parse, enrich and validate a successful model response, then record it"""
+        # Parse the AI response into ExtractedTask objects, after any explicit tasks
+        tasks = list(explicit_tasks or [])
+        seen = {task.content.lower() for task in tasks}
+        for task in self._parse_ai_response(response.content):
+            if task.content.lower() not in seen:
+                seen.add(task.content.lower())
+                tasks.append(task)
+        
+        return self._finalize_tasks(text, source, tasks, response.model)
+    
+    def _finalize_tasks(self, text: str, source: str, tasks: List[ExtractedTask], model: str,
+                        record: bool = True) -> List[ExtractedTask]:
+        """Enrich and validate extracted tasks, then record them in the ledger"""
         # Enrich tasks with context from memory (Pre-Flight Brief)
         tasks = self._enrich_tasks_with_context(tasks)
         
         # Apply agent constraints and validation
         validated_tasks = self._validate_and_constrain_tasks(tasks)
         
-        self.logger.info(f"Extracted {len(validated_tasks)} tasks from {source}")
+        # Every task carries the hash of its source text, recorded or not, so
+        # "already created" checks never fall back to matching content alone
+        digest = content_hash(text)
+        if self.ledger and record:
+            task_dicts = [asdict(task) for task in validated_tasks]
+            for task_dict in task_dicts:
+                task_dict.pop('source_hash', None)
+            digest = self.ledger.record_extraction(text, model, task_dicts)
+        for task in validated_tasks:
+            task.source_hash = digest
+        
+        self.logger.info("Extracted %d tasks from %s", len(validated_tasks), source)
         return validated_tasks
 
+    def extract_tasks_batch(self, items: List[Dict[str, str]], backend=None, poll_interval: float = 30.0,
+                            priority: str = "normal",
+                            offline_fallback: bool = True) -> List[Optional[List[ExtractedTask]]]:
+        """
+        Extract tasks from many texts through the provider's offline batch API
+        
+        Args:
+            items: Dicts with 'text' and optional 'source'
+            backend: Batch backend (defaults to the real API for the primary
+                model's provider; pass LocalBatchBackend to run offline)
+            poll_interval: Initial seconds between job status checks
+            priority: low, normal or high, for the budget governor
+            offline_fallback: Extract failed or missing items with the offline
+                heuristics; when False they are returned as None instead
+            
+        Returns:
+            Extracted tasks per input item, in input order
+            
+        Raises:
+            BudgetExceededError: The spend budget is exhausted for this priority
+        """
+        from engine.integrations.batch_api import (
+            BatchRequest, BatchJobRunner, create_batch_backend, provider_for_model
+        )
+        
+        model = self.primary_model()
+        decision = self.budget_decision(priority, enforce=True)
+        if decision is not None:
+            model = decision.model
+        results: List[List[ExtractedTask]] = [[] for _ in items]
+        explicit: Dict[int, List[ExtractedTask]] = {}
+        requests = []
+        for index, item in enumerate(items):
+            source = item.get('source', 'unknown')
+            cached_tasks = self._lookup_ledger(item['text'], source)
+            if cached_tasks is not None:
+                results[index] = cached_tasks
+                continue
+            explicit[index], remainder = split_explicit_tasks(item['text'])
+            prompt_text = self._prepare_prompt_text(remainder, source)
+            if not prompt_text:
+                if explicit[index]:
+                    results[index] = self._finalize_tasks(item['text'], source, explicit[index], model="explicit")
+                continue
+            requests.append(BatchRequest(
+                custom_id=f"item-{index}",
+                model=model,
+                prompt=self._build_extraction_prompt(prompt_text, source),
+                system_prompt=self._build_system_prompt(),
+                max_tokens=1500
+            ))
+        
+        if not requests:
+            return results
+        
+        if backend is None:
+            backend = create_batch_backend(provider_for_model(model), self.ai_client)
+        responses = BatchJobRunner(backend, poll_interval=poll_interval).run(requests)
+        
+        for request in requests:
+            index = int(request.custom_id.split('-', 1)[1])
+            item = items[index]
+            response = responses.get(request.custom_id)
+            if response is None or not response.success:
+                self.logger.error(f"Batch item {request.custom_id} failed: {response.error if response else 'missing result'}")
+                results[index] = self._extract_offline(item['text'], item.get('source', 'unknown')) \
+                    if offline_fallback else None
+                continue
+            results[index] = self._finish_extraction(item['text'], item.get('source', 'unknown'), response,
+                                                     explicit[index])
+        
+        return results
+
     def extract_tasks_from_text(self, input_data: Any = None) -> Dict[str, Any]:
         """Extract tasks from text (wrapper method for testing compatibility)"""
         def _inner():
@@ -287,18 +606,7 @@ Be conservative - it's better to miss a vague item than create unclear tasks."""
     
     def _build_extraction_prompt(self, text: str, source: str) -> str:
         """Build the user prompt with the text to analyze"""
-        
-        prompt = f"""Please extract actionable tasks from the following text:
-
-SOURCE: {source}
-TEXT:
-{text}
-
-Extract only clear, actionable items that can be completed. Ignore general thoughts, reflections, or vague ideas. Focus on specific actions with verbs like: call, email, write, research, book, schedule, buy, fix, etc.
-
-Return the tasks as a JSON array following the specified format."""
-        
-        return prompt
+        return build_extraction_prompt(text, source)
     
     def _parse_ai_response(self, response_content: str) -> List[ExtractedTask]:
         """Parse AI response into ExtractedTask objects"""
@@ -421,7 +729,7 @@ Return the tasks as a JSON array following the specified format."""
             if task.confidence >= 0.6:
                 validated_tasks.append(task)
             else:
-                self.logger.debug(f"Skipping low-confidence task: {task.content}")
+                self.logger.debug("Skipping low-confidence task: %s", task.content)
         
         return validated_tasks
     
@@ -452,72 +760,158 @@ Return the tasks as a JSON array following the specified format."""
         content_lower = content.lower()
         return any(keyword in content_lower for keyword in family_keywords)
     
-    def create_todoist_tasks(self, extracted_tasks: List[ExtractedTask], dry_run: bool = False) -> List[Dict[str, Any]]:
-        """Create tasks in Todoist from extracted tasks"""
-        if not extracted_tasks:
-            return []
+    def create_todoist_tasks(self, extracted_tasks: List[ExtractedTask], dry_run: bool = False,
+                             wait: bool = False) -> List[Dict[str, Any]]:
+        """
+        Create tasks in Todoist from extracted tasks
+        
+        Unless ``wait`` is set (or the outbox is disabled), tasks are queued in
+        the durable Todoist outbox and created by its background flusher; the
+        results then carry ``queued`` and ``request_id`` instead of ``task_id``.
+        Queuing makes no Todoist calls: the flusher resolves each task's
+        project and backlog section when it sends it.
+        """
+        pending, already_created = self._pending_for_todoist(extracted_tasks, dry_run)
+        if not pending:
+            return already_created
+        
+        outbox = self.outbox if not (dry_run or wait) else None
+        if outbox is not None:
+            return already_created + [outbox.enqueue(self._build_todoist_task(task, None, None), task.content,
+                                                     task.source_hash, project=task.project)
+                                      for task in pending]
         
         # Find projects in Todoist
         projects = self.todoist_client.get_projects()
         project_map = {p.name: p.id for p in projects}
         
-        # Convert to Todoist tasks
-        todoist_tasks = []
+        # Resolve each target project's "backlog" section once
+        project_ids = [self._resolve_project_id(task, project_map) for task in pending]
+        backlog_sections = {}
+        for project_id in set(filter(None, project_ids)):
+            backlog_sections[project_id] = self.todoist_client.find_section_by_name("backlog", project_id)
+        
+        todoist_tasks = [self._build_todoist_task(task, project_id, backlog_sections.get(project_id))
+                         for task, project_id in zip(pending, project_ids)]
+        
+        # Create tasks in Todoist
+        results = self.todoist_client.create_multiple_tasks(todoist_tasks, dry_run)
+        self._record_created(pending, results, dry_run)
+        return already_created + results
+    
+    async def acreate_todoist_tasks(self, extracted_tasks: List[ExtractedTask], dry_run: bool = False,
+                                    client: Optional[AsyncTodoistClient] = None) -> List[Dict[str, Any]]:
+        """
+        Async create_todoist_tasks: lookups and writes run concurrently
+        
+        Pass a long-lived AsyncTodoistClient to reuse its connection pool;
+        otherwise one is opened for this call with the same credentials as the
+        agent's Todoist client (a tenant's own token, not the host's).
+        Results are in input order.
+        """
+        pending, already_created = self._pending_for_todoist(extracted_tasks, dry_run)
+        if not pending:
+            return already_created
+        
+        owned = client is None
+        if owned:
+            # The sync client already resolved its token; '' keeps a tenant without one off the host's
+            client = AsyncTodoistClient(api_token=self.todoist_client.api_token or '')
+        try:
+            projects = await client.get_projects()
+            project_map = {p.name: p.id for p in projects}
+            
+            project_ids = [self._resolve_project_id(task, project_map) for task in pending]
+            unique_ids = sorted(set(filter(None, project_ids)))
+            sections = await asyncio.gather(*(client.find_section_by_name("backlog", project_id)
+                                              for project_id in unique_ids))
+            backlog_sections = dict(zip(unique_ids, sections))
+            
+            todoist_tasks = [self._build_todoist_task(task, project_id, backlog_sections.get(project_id))
+                             for task, project_id in zip(pending, project_ids)]
+            results = await client.create_multiple_tasks(todoist_tasks, dry_run)
+        finally:
+            if owned:
+                await client.aclose()
+        
+        self._record_created(pending, results, dry_run)
+        return already_created + results
+    
+    def _pending_for_todoist(self, extracted_tasks: List[ExtractedTask],
+                             dry_run: bool) -> Tuple[List[ExtractedTask], List[Dict[str, Any]]]:
+        """Split tasks into those to create and results for ones already created"""
+        pending = []
+        already_created = []
         for task in extracted_tasks:
             # Skip tasks requiring confirmation unless explicitly approved
             if task.requires_confirmation and not dry_run:
                 self.logger.warning(f"Skipping task requiring confirmation: {task.content} ({task.confirmation_reason})")
                 continue
             
-            # Map to Todoist project with exact matching for our standard projects
-            project_id = None
-            section_id = None
-            
-            if task.project:
-                # Direct mapping for standard projects
-                # Generalized for public repo: check standard categories
-                if task.project in project_map:
-                    project_id = project_map[task.project]
-                
-                # Fallback to fuzzy matching if direct mapping failed
-                if not project_id:
-                    for proj_name, proj_id in project_map.items():
-                        if task.project.lower() in proj_name.lower() or proj_name.lower() in task.project.lower():
-                            project_id = proj_id
-                            break
-                
-                # Find the "backlog" section within the target project
-                if project_id:
-                    backlog_section = self.todoist_client.find_section_by_name("backlog", project_id)
-                    if backlog_section:
-                        section_id = backlog_section.id
-                        self.logger.debug(f"Assigning task to backlog section: {backlog_section.name}")
-                    else:
-                        self.logger.warning(f"No 'backlog' section found in project {task.project}")
-            
-            # Build task description with context and source info
-            description_parts = []
-            if task.context:
-                description_parts.append(f"Context: {task.context}")
-            description_parts.append(f"Extracted from: task_extractor agent")
-            if task.requires_confirmation:
-                description_parts.append(f"⚠️ Flagged: {task.confirmation_reason}")
-            
-            todoist_task = TodoistTask(
-                content=task.content,
-                project_id=project_id,
-                section_id=section_id,
-                priority=self.todoist_client.map_priority_to_todoist(task.priority),
-                due_string=task.due_date,
-                description="\n".join(description_parts) if description_parts else None
-            )
+            # Skip tasks the ledger says were already created from the same text
+            if self.ledger:
+                existing_id = self.ledger.lookup_created(task.content, task.source_hash)
+                if existing_id:
+                    self.logger.info("Skipping already-created task: %s (ID: %s)", task.content, existing_id)
+                    already_created.append({
+                        "success": True,
+                        "task_id": existing_id,
+                        "content": task.content,
+                        "skipped": "already created"
+                    })
+                    continue
             
-            todoist_tasks.append(todoist_task)
-        
-        # Create tasks in Todoist
-        results = self.todoist_client.create_multiple_tasks(todoist_tasks, dry_run)
-        
-        return results
+            pending.append(task)
+        return pending, already_created
+    
+    def _resolve_project_id(self, task: ExtractedTask, project_map: Dict[str, str]) -> Optional[str]:
+        """Map to Todoist project with exact matching for our standard projects"""
+        return resolve_project_id(task.project, project_map)
+    
+    def _build_todoist_task(self, task: ExtractedTask, project_id: Optional[str],
+                            backlog_section: Optional[TodoistSection]) -> TodoistTask:
+        """Convert an extracted task to a Todoist task in its project's backlog section"""
+        section_id = None
+        if project_id:
+            if backlog_section:
+                section_id = backlog_section.id
+                self.logger.debug("Assigning task to backlog section: %s", backlog_section.name)
+            else:
+                self.logger.warning(f"No 'backlog' section found in project {task.project}")
+        
+        # Build task description with context and source info
+        description_parts = []
+        if task.context:
+            description_parts.append(f"Context: {task.context}")
+        description_parts.append(f"Extracted from: task_extractor agent")
+        if task.requires_confirmation:
+            description_parts.append(f"⚠️ Flagged: {task.confirmation_reason}")
+        
+        return TodoistTask(
+            content=task.content,
+            project_id=project_id,
+            section_id=section_id,
+            priority=self.todoist_client.map_priority_to_todoist(task.priority),
+            due_string=task.due_date,
+            description="\n".join(description_parts) if description_parts else None
+        )
+    
+    def _record_created(self, tasks: List[ExtractedTask], results: List[Dict[str, Any]], dry_run: bool):
+        """Remember created Todoist IDs so re-runs do not duplicate them"""
+        if self.ledger and not dry_run:
+            for task, result in zip(tasks, results):
+                if result.get('success') and result.get('task_id'):
+                    self.ledger.record_created(task.content, result['task_id'], task.source_hash)
+    
+    def close(self) -> None:
+        """Close clients this agent created itself; shared clients are left open"""
+        for client in self._owned_clients:
+            client.close()
+        self._owned_clients = []
+        if self.ledger:
+            self.ledger.close()
+            self.ledger = None
+        super().close()
     
     # Required methods from SelfContainedAgent
     def get_core_dependencies(self) -> List[str]:
@@ -528,7 +922,8 @@ Return the tasks as a JSON array following the specified format."""
         """Return dict of optional dependencies and their descriptions"""
         return {
             'openai': 'AI-powered task analysis and categorization',
-            'anthropic': 'Alternative AI provider for task processing'
+            'anthropic': 'Alternative AI provider for task processing',
+            'httpx': 'Concurrent Todoist writes (acreate_todoist_tasks)'
         }
     
     def get_required_api_keys(self) -> Dict[str, str]:
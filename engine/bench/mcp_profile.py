@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+MCP Server Profiler
+
+Measures, for each server in the MCP config, over several iterations:
+
+- cold start: the first launch in the run (includes any uvx/npx package
+  resolution that is not already cached)
+- warm start: the later launches
+- spawn and ``initialize`` time within each start (a stdio server only
+  answers initialize once it has booted, so initialize includes boot time)
+- ``ping`` round trip, the protocol floor on a resident session
+- round trips for ``tools/list`` and a read-only call of each known tool
+- resident memory (RSS) of the server's process tree once warm
+
+Latencies are reported as p50/p90/p99/max. Servers whose warm start costs
+more than ``--resident-ms`` are flagged as worth keeping resident in the
+MCP session pool.
+
+Usage:
+    python -m engine.bench.mcp_profile
+    python -m engine.bench.mcp_profile --iterations 10 --calls 50 memory time
+    python -m engine.bench.mcp_profile --call memory:search_nodes:'{"query": "setup"}' --json
+"""
+
+import sys
+import json
+import math
+import time
+import argparse
+import subprocess
+import importlib.util
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from engine.integrations.mcp_stdio import MCPStdioClient, MCPError, load_mcp_config, check_tool_result
+
+PSUTIL_AVAILABLE = importlib.util.find_spec('psutil') is not None
+
+# Read-only calls timed for each server (skipped if the server does not offer the tool)
+DEFAULT_TOOL_CALLS: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {
+    "memory": [("read_graph", {}), ("search_nodes", {"query": "setup"})],
+    "time": [("get_current_time", {"timezone": "UTC"})],
+    "filesystem": [("list_allowed_directories", {})],
+    "mcp-ical": [("list_calendars", {})],
+    "cli-mcp-server": [("show_security_rules", {})],
+}
+
+# Warm start above which a server is better kept resident, in milliseconds
+RESIDENT_MS = 1000.0
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p90/p99/max (nearest-rank) of a list of milliseconds"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {"n": len(ordered), "p50": round(rank(50), 2), "p90": round(rank(90), 2),
+            "p99": round(rank(99), 2), "max": round(ordered[-1], 2)}
+
+def tree_rss_kb(pid: int) -> Optional[int]:
+    """Resident memory of a process and all its descendants, in KiB"""
+    if PSUTIL_AVAILABLE:
+        import psutil
+        try:
+            process = psutil.Process(pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes if p.is_running()) // 1024
+        except psutil.Error:
+            return None
+    try:
+        output = subprocess.run(["ps", "-A", "-o", "pid=,ppid=,rss="], capture_output=True, text=True,
+                                timeout=5).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    children: Dict[int, List[int]] = {}
+    rss: Dict[int, int] = {}
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) != 3 or not all(part.isdigit() for part in parts):
+            continue
+        child, parent, kb = map(int, parts)
+        children.setdefault(parent, []).append(child)
+        rss[child] = kb
+    if pid not in rss:
+        return None
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += rss.get(current, 0)
+        stack.extend(children.get(current, []))
+    return total
+
+def time_call(func, *args, **kwargs) -> float:
+    started = time.perf_counter()
+    func(*args, **kwargs)
+    return (time.perf_counter() - started) * 1000
+
+def profile_server(name: str, entry: Dict[str, Any], iterations: int, calls: int, timeout: float,
+                   tool_calls: List[Tuple[str, Dict[str, Any]]], resident_ms: float = RESIDENT_MS) -> Dict[str, Any]:
+    """Start a server ``iterations`` times and time its handshake and round trips"""
+    starts, spawns, initializes, pings, list_tools = [], [], [], [], []
+    tools: Dict[str, List[float]] = {}
+    tool_errors: Dict[str, str] = {}
+    rss_kb: List[int] = []
+    server_info: Dict[str, Any] = {}
+
+    for iteration in range(iterations):
+        client = MCPStdioClient(entry["command"], entry["args"], entry["env"], timeout=timeout, name=name,
+                                client_name="engine-mcp-profile")
+        try:
+            starts.append(time_call(client.start))
+            spawns.append(client.start_timings["spawn_ms"])
+            initializes.append(client.start_timings["initialize_ms"])
+            server_info = client.server_info
+            advertised = {tool["name"] for tool in client.list_tools()}
+            for _ in range(calls):
+                try:
+                    pings.append(time_call(client.ping))
+                except MCPError:
+                    break  # ping is optional for servers
+            for _ in range(calls):
+                list_tools.append(time_call(client.list_tools))
+            for tool, arguments in tool_calls:
+                if tool in tool_errors:
+                    continue
+                if tool not in advertised:
+                    tool_errors[tool] = "not offered by this server"
+                    continue
+                for _ in range(calls):
+                    try:
+                        started = time.perf_counter()
+                        check_tool_result(name, tool, client.request(
+                            "tools/call", {"name": tool, "arguments": arguments}))
+                        tools.setdefault(tool, []).append((time.perf_counter() - started) * 1000)
+                    except MCPError as e:
+                        tool_errors[tool] = str(e)
+                        break
+            rss = tree_rss_kb(client.pid) if client.pid else None
+            if rss is not None:
+                rss_kb.append(rss)
+        except MCPError as e:
+            return {"server": name, "ok": False, "error": str(e), "iterations_completed": iteration}
+        finally:
+            client.close(timeout=2.0)
+
+    warm = starts[1:]
+    report = {
+        "server": name,
+        "ok": True,
+        "server_info": server_info,
+        "iterations": iterations,
+        "cold_start_ms": round(starts[0], 2),
+        "warm_start_ms": percentiles(warm),
+        "spawn_ms": percentiles(spawns),
+        "initialize_ms": percentiles(initializes),
+        "ping_ms": percentiles(pings),
+        "tools_list_ms": percentiles(list_tools),
+        "tool_calls_ms": {tool: percentiles(samples) for tool, samples in tools.items()},
+        "tool_errors": tool_errors,
+        "rss_kb": max(rss_kb) if rss_kb else None,
+    }
+    warm_p50 = report["warm_start_ms"].get("p50", report["cold_start_ms"])
+    report["keep_resident"] = warm_p50 >= resident_ms
+    return report
+
+def format_latency(stats: Dict[str, float]) -> str:
+    if not stats:
+        return "n/a"
+    return f"p50 {stats['p50']:.1f}  p90 {stats['p90']:.1f}  p99 {stats['p99']:.1f}  max {stats['max']:.1f} ms"
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n{report['server']}")
+    if not report["ok"]:
+        print(f"  FAILED after {report['iterations_completed']} iterations: {report['error']}")
+        return
+    info = report["server_info"]
+    rss = f"{report['rss_kb'] / 1024:.1f} MiB" if report["rss_kb"] is not None else "n/a"
+    print(f"  {info.get('name', 'unknown')} {info.get('version', '')}, RSS {rss}, "
+          f"{'keep resident' if report['keep_resident'] else 'start on demand'}")
+    print(f"  {'cold start':<16} {report['cold_start_ms']:.1f} ms")
+    print(f"  {'warm start':<16} {format_latency(report['warm_start_ms'])}")
+    print(f"  {'  spawn':<16} {format_latency(report['spawn_ms'])}")
+    print(f"  {'  initialize':<16} {format_latency(report['initialize_ms'])}")
+    print(f"  {'ping':<16} {format_latency(report['ping_ms'])}")
+    print(f"  {'tools/list':<16} {format_latency(report['tools_list_ms'])}")
+    for tool, stats in report["tool_calls_ms"].items():
+        print(f"  {tool:<16} {format_latency(stats)}")
+    for tool, error in report["tool_errors"].items():
+        print(f"  {tool:<16} error: {error}")
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def parse_call(spec: str) -> Tuple[str, str, Dict[str, Any]]:
+    """server:tool[:json-arguments]"""
+    parts = spec.split(":", 2)
+    if len(parts) < 2:
+        raise argparse.ArgumentTypeError(f"Expected server:tool[:json], got {spec!r}")
+    arguments = json.loads(parts[2]) if len(parts) == 3 else {}
+    return parts[0], parts[1], arguments
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Profile MCP server startup and round-trip latency")
+    parser.add_argument("servers", nargs="*", help="Servers to profile (default: all in the config)")
+    parser.add_argument("--config", type=Path, help="MCP config file (default: configs/default-mcp-config.json)")
+    parser.add_argument("--iterations", type=positive_int, default=5, help="Server launches per server")
+    parser.add_argument("--calls", type=positive_int, default=20, help="Round trips per request type per launch")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for any one request")
+    parser.add_argument("--call", type=parse_call, action="append", default=[],
+                        help="Extra tool call to time, as server:tool[:json-arguments]")
+    parser.add_argument("--resident-ms", type=float, default=RESIDENT_MS,
+                        help="Warm start above which a server should stay resident")
+    parser.add_argument("--json", action="store_true", help="Emit the full report as JSON")
+    args = parser.parse_args(argv)
+
+    configured = load_mcp_config(args.config)
+    names = args.servers or list(configured)
+    unknown = [name for name in names if name not in configured]
+    if unknown:
+        parser.error(f"not in the MCP config: {', '.join(unknown)}")
+
+    reports = []
+    for name in names:
+        tool_calls = list(DEFAULT_TOOL_CALLS.get(name, []))
+        tool_calls += [(tool, arguments) for server, tool, arguments in args.call if server == name]
+        if not args.json:
+            print(f"Profiling {name} ({args.iterations} launches)...", file=sys.stderr)
+        reports.append(profile_server(name, configured[name], args.iterations, args.calls, args.timeout,
+                                      tool_calls, args.resident_ms))
+
+    if args.json:
+        print(json.dumps({"iterations": args.iterations, "calls": args.calls,
+                          "resident_ms": args.resident_ms, "servers": reports}, indent=2))
+    else:
+        print(f"MCP server profile ({args.iterations} launches, {args.calls} round trips per request type)")
+        for report in reports:
+            print_report(report)
+
+    return 0 if all(report["ok"] for report in reports) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
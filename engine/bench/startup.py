@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+
+Measures cold-start import time of the engine's main entry points. Each
+entry point is imported in a fresh interpreter with ``-X importtime`` and the
+per-module breakdown is aggregated over several runs.
+
+Usage:
+    python -m engine.bench.startup
+    python -m engine.bench.startup --runs 10 --top 15 engine.agents.task_extractor
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+from typing import List, Dict, Any
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+DEFAULT_ENTRY_POINTS = [
+    "engine.config",
+    "engine.integrations.ai_models",
+    "engine.integrations.todoist_client",
+    "engine.agents.task_extractor",
+]
+
+# Cold start target for any single entry point, in milliseconds
+TARGET_MS = 200.0
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\| (\s*)(\S+)")
+
+def measure_import(module: str) -> Dict[str, Any]:
+    """Import a module in a fresh interpreter and parse the -X importtime output"""
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT), PYTHONDONTWRITEBYTECODE="")
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=str(PROJECT_ROOT), env=env
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    # -X importtime prints modules in post-order, so everything the entry point
+    # pulled in is the indented run of lines directly above its own line
+    lines = [IMPORTTIME_LINE.match(line) for line in result.stderr.splitlines()]
+    lines = [match.groups() for match in lines if match]
+    entry_index = max(i for i, groups in enumerate(lines) if groups[3] == module and not groups[2])
+    start_index = entry_index
+    while start_index > 0 and lines[start_index - 1][2]:
+        start_index -= 1
+
+    modules = {}
+    for self_us, cumulative_us, indent, name in lines[start_index:entry_index + 1]:
+        modules[name] = {
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": len(indent) // 2
+        }
+
+    return {
+        "wall_ms": wall_ms,
+        "import_ms": modules.get(module, {}).get("cumulative_ms", 0.0),
+        "modules": modules
+    }
+
+def benchmark_entry_point(module: str, runs: int) -> Dict[str, Any]:
+    """Run measure_import several times and aggregate with medians"""
+    samples = [measure_import(module) for _ in range(runs)]
+
+    breakdown = {}
+    for name in samples[-1]["modules"]:
+        breakdown[name] = {
+            "self_ms": statistics.median(s["modules"].get(name, {}).get("self_ms", 0.0) for s in samples),
+            "cumulative_ms": statistics.median(s["modules"].get(name, {}).get("cumulative_ms", 0.0) for s in samples),
+            "depth": samples[-1]["modules"][name]["depth"]
+        }
+
+    return {
+        "module": module,
+        "runs": runs,
+        "wall_ms_median": statistics.median(s["wall_ms"] for s in samples),
+        "import_ms_median": statistics.median(s["import_ms"] for s in samples),
+        "import_ms_max": max(s["import_ms"] for s in samples),
+        "breakdown": breakdown
+    }
+
+def print_report(report: Dict[str, Any], top: int, target_ms: float):
+    """Print an importtime-style breakdown for one entry point"""
+    status = "OK" if report["import_ms_median"] <= target_ms else "OVER TARGET"
+    print(f"\n{report['module']}")
+    print(f"  import: {report['import_ms_median']:.1f} ms median, {report['import_ms_max']:.1f} ms max "
+          f"(process wall {report['wall_ms_median']:.1f} ms, {report['runs']} runs) [{status}]")
+    print(f"  {'self [ms]':>10} | {'cumulative':>10} | module")
+
+    heaviest = sorted(report["breakdown"].items(), key=lambda item: item[1]["cumulative_ms"], reverse=True)
+    for name, timing in heaviest[:top]:
+        print(f"  {timing['self_ms']:>10.1f} | {timing['cumulative_ms']:>10.1f} | {'  ' * timing['depth']}{name}")
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of engine entry points")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_ENTRY_POINTS, help="Modules to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=10, help="Heaviest modules to list per entry point")
+    parser.add_argument("--target-ms", type=float, default=TARGET_MS, help="Cold start budget per entry point")
+    parser.add_argument("--json", action="store_true", help="Emit the full report as JSON")
+    args = parser.parse_args(argv)
+
+    reports = [benchmark_entry_point(module, args.runs) for module in args.modules]
+
+    if args.json:
+        print(json.dumps({"target_ms": args.target_ms, "entry_points": reports}, indent=2))
+    else:
+        print(f"Engine startup benchmark (target: {args.target_ms:.0f} ms per entry point)")
+        for report in reports:
+            print_report(report, args.top, args.target_ms)
+
+    over_target = [r["module"] for r in reports if r["import_ms_median"] > args.target_ms]
+    return 1 if over_target else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
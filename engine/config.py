@@ -1,22 +1,133 @@
 import os
-import yaml
+import time
+import logging
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Callable, List, Set, Tuple
 
 # Root of the repository
 REPO_ROOT = Path(__file__).resolve().parent.parent
 
+# Environment overrides: ENGINE_DATA_ROOT=/srv/ai-data, ENGINE_RATE_LIMITS__OPENAI__RPM=1000
+ENV_PREFIX = "ENGINE_"
+ENV_SEPARATOR = "__"
+
+ChangeCallback = Callable[[Set[str]], None]
+
+class SettingsFileError(ValueError):
+    """Raised when the settings file exists but cannot be read or parsed"""
+
+def _coerce_env_value(raw: str, current: Any) -> Any:
+    """Convert an environment string to the type of the value it overrides"""
+    if isinstance(current, bool):
+        lowered = raw.strip().lower()
+        if lowered in ("1", "true", "yes", "on"):
+            return True
+        if lowered in ("0", "false", "no", "off", ""):
+            return False
+        raise ValueError(f"expected a boolean, got {raw!r}")
+    if isinstance(current, int):
+        return int(raw)
+    if isinstance(current, float):
+        return float(raw)
+    if isinstance(current, str):
+        return raw
+    # New keys and lists/dicts: let YAML infer the type ("42", "true", "[a, b]")
+    import yaml
+    try:
+        value = yaml.safe_load(raw)
+    except yaml.YAMLError:
+        return raw
+    return raw if value is None and raw.strip() not in ("null", "~") else value
+
+def _deep_merge(base: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge ``overrides`` into ``base`` in place, recursing into nested sections"""
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _deep_merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
 class Config:
-    def __init__(self):
-        self._settings = self._load_settings()
-        
-    def _load_settings(self) -> Dict[str, Any]:
-        """Load settings from config/settings.yaml or fall back to defaults"""
-        settings_path = REPO_ROOT / "config" / "settings.yaml"
-        
+    """
+    Engine settings from config/settings.yaml
+
+    The YAML is parsed on first access, not at import. Afterwards the file's
+    mtime is checked at most every ``reload_interval`` seconds and the
+    settings are reloaded when it changes; callbacks registered with
+    ``on_change`` receive the names of the top-level sections that changed.
+    ``ENGINE_*`` environment variables override file values (nested keys
+    separated by a double underscore) and are converted to the type of the
+    value they replace. ``overrides`` (e.g. a tenant's data_root and agent
+    sections) are merged over both.
+    """
+
+    def __init__(self, settings_path: Optional[Path] = None, reload_interval: float = 2.0,
+                 env_prefix: str = ENV_PREFIX, overrides: Optional[Dict[str, Any]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.settings_path = Path(settings_path) if settings_path else REPO_ROOT / "config" / "settings.yaml"
+        self.example_path = REPO_ROOT / "config" / "settings.example.yaml"
+        self.reload_interval = reload_interval
+        self.env_prefix = env_prefix
+        self.overrides = overrides or {}
+
+        self._lock = threading.RLock()
+        self._loaded_settings: Optional[Dict[str, Any]] = None
+        self._source: Optional[Tuple[str, int]] = None
+        # Last file version that failed to parse, so a broken save is reported once
+        self._failed_source: Optional[Tuple[str, int]] = None
+        self._last_check = 0.0
+        self._memo: Dict[str, Any] = {}
+        self._callbacks: List[ChangeCallback] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+
+    @property
+    def _settings(self) -> Dict[str, Any]:
+        """Settings dict, parsed on first access and refreshed when the file changes"""
+        if self._loaded_settings is None:
+            with self._lock:
+                if self._loaded_settings is None:
+                    self._source = self._stat_source()
+                    try:
+                        loaded = self._load_settings()
+                    except SettingsFileError as e:
+                        self.logger.warning(f"{e}; using defaults until it is fixed")
+                        self._failed_source = self._source
+                        loaded = self._load_settings({})
+                    self._loaded_settings = loaded
+                    self._last_check = time.monotonic()
+        elif self.reload_interval > 0 and time.monotonic() - self._last_check >= self.reload_interval:
+            self.reload()
+        return self._loaded_settings
+
+    def _stat_source(self) -> Optional[Tuple[str, int]]:
+        """Identity of the file settings are read from: (path, mtime_ns)"""
+        for path in (self.settings_path, self.example_path):
+            try:
+                return str(path), path.stat().st_mtime_ns
+            except OSError:
+                continue
+        return None
+
+    def _load_settings(self, file_settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Settings from config/settings.yaml (or ``file_settings``) with env and overrides applied"""
+        import copy
+        loaded = self._read_file() if file_settings is None else copy.deepcopy(file_settings)
+        return _deep_merge(self._apply_env_overrides(loaded), copy.deepcopy(self.overrides))
+
+    def _read_file(self) -> Dict[str, Any]:
+        """Parse settings.yaml (or the example); raises SettingsFileError when it is unreadable"""
+        import yaml
+
+        settings_path = self.settings_path
+
         if not settings_path.exists():
             # Fallback to example if available, or empty dict
-            example_path = REPO_ROOT / "config" / "settings.example.yaml"
+            example_path = self.example_path
             if example_path.exists():
                 try:
                     with open(example_path, "r") as f:
@@ -24,37 +135,202 @@ class Config:
                 except Exception:
                     pass
             return {}
-            
+
         try:
             with open(settings_path, "r") as f:
-                return yaml.safe_load(f) or {}
+                loaded = yaml.safe_load(f) or {}
         except Exception as e:
-            print(f"Warning: Failed to load settings.yaml: {e}")
-            return {}
+            raise SettingsFileError(f"Failed to load {settings_path}: {e}") from e
+        if not isinstance(loaded, dict):
+            raise SettingsFileError(f"Failed to load {settings_path}: expected a mapping at the top level")
+        return loaded
+
+    def _apply_env_overrides(self, loaded: Dict[str, Any]) -> Dict[str, Any]:
+        for name, raw in os.environ.items():
+            if not name.startswith(self.env_prefix) or len(name) == len(self.env_prefix):
+                continue
+            keys = [key.lower() for key in name[len(self.env_prefix):].split(ENV_SEPARATOR)]
+            node = loaded
+            for key in keys[:-1]:
+                if not isinstance(node.get(key), dict):
+                    node[key] = {}
+                node = node[key]
+            try:
+                node[keys[-1]] = _coerce_env_value(raw, node.get(keys[-1]))
+            except ValueError as e:
+                self.logger.warning(f"Ignoring {name}: {e}")
+        return loaded
+
+    # ------------------------------------------------------------------
+    # Reloading
+    # ------------------------------------------------------------------
+    def reload(self, force: bool = False) -> Set[str]:
+        """
+        Re-read settings if the file changed (or unconditionally with ``force``)
+
+        Returns the top-level sections that changed; callbacks are only
+        notified when that set is non-empty. A file that fails to parse (e.g.
+        saved half-way through an edit) is reported and the last good
+        settings stay in effect.
+        """
+        with self._lock:
+            self._last_check = time.monotonic()
+            source = self._stat_source()
+            if not force and self._loaded_settings is not None and source in (self._source, self._failed_source):
+                return set()
+            old = self._loaded_settings or {}
+            try:
+                new = self._load_settings()
+            except SettingsFileError as e:
+                self.logger.error(f"{e}; keeping the previous settings")
+                self._failed_source = source
+                if self._loaded_settings is None:
+                    self._loaded_settings = self._load_settings({})
+                return set()
+            self._failed_source = None
+            self._source = source
+            self._loaded_settings = new
+            self._memo.clear()
+            callbacks = list(self._callbacks)
+
+        changed = {key for key in set(old) | set(new) if old.get(key) != new.get(key)}
+        if changed and old:
+            self.logger.info(f"Settings reloaded, changed: {', '.join(sorted(changed))}")
+            for callback in callbacks:
+                try:
+                    callback(changed)
+                except Exception as e:
+                    self.logger.error(f"Settings change callback failed: {e}")
+        return changed
 
+    def on_change(self, callback: ChangeCallback) -> ChangeCallback:
+        """Register ``callback(changed_sections)`` to run after a reload"""
+        with self._lock:
+            self._callbacks.append(callback)
+        return callback
+
+    def remove_listener(self, callback: ChangeCallback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def start_watching(self, interval: Optional[float] = None):
+        """Check for changes on a background thread so callbacks fire without settings access"""
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            interval = interval or self.reload_interval or 2.0
+            self._stop_watching.clear()
+
+            def watch():
+                while not self._stop_watching.wait(interval):
+                    try:
+                        self.reload()
+                    except Exception as e:
+                        self.logger.error(f"Settings reload failed: {e}")
+
+            self._watcher = threading.Thread(target=watch, name="settings-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self):
+        self._stop_watching.set()
+
+    def _memoized(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Cache derived values (resolved paths) until the next reload"""
+        self._settings  # triggers the reload check, which clears the memo
+        try:
+            return self._memo[key]
+        except KeyError:
+            value = self._memo[key] = compute()
+            return value
+
+    # ------------------------------------------------------------------
+    # Accessors
+    # ------------------------------------------------------------------
     @property
     def data_root(self) -> Path:
         """Return path to data root (Fuel), expanded and resolved"""
-        raw_path = self._settings.get("data_root", "~/ai-data")
-        return Path(raw_path).expanduser().resolve()
+        return self._memoized("data_root", lambda: Path(
+            self._settings.get("data_root", "~/ai-data")
+        ).expanduser().resolve())
 
     @property
     def obsidian_vault(self) -> Optional[Path]:
         """Return path to Obsidian vault if configured"""
-        raw_path = self._settings.get("obsidian_vault")
-        if raw_path:
-            return Path(raw_path).expanduser().resolve()
-        return None
+        def resolve() -> Optional[Path]:
+            raw_path = self._settings.get("obsidian_vault")
+            if raw_path:
+                return Path(raw_path).expanduser().resolve()
+            return None
+        return self._memoized("obsidian_vault", resolve)
 
     @property
     def project_root(self) -> Path:
         """Return the root of the engine code"""
         return REPO_ROOT
 
+    def get_section(self, name: str) -> Dict[str, Any]:
+        """Get a top-level settings section (e.g. 'memory', 'logging') as a dict"""
+        return self._settings.get(name, {}) or {}
+
+    def get_memory_config(self) -> Dict[str, Any]:
+        """Get memory backend configuration"""
+        return self.get_section("memory")
+
+    @property
+    def memory_path(self) -> Path:
+        """Return path to the memory store, relative to data root unless absolute"""
+        def resolve() -> Path:
+            raw_path = self.get_memory_config().get("path", "memory/local")
+            path = Path(raw_path).expanduser()
+            if not path.is_absolute():
+                path = self.data_root / path
+            return path.resolve()
+        return self._memoized("memory_path", resolve)
+
     def get_agent_config(self, agent_name: str) -> Dict[str, Any]:
         """Get configuration specific to an agent"""
         agents_config = self._settings.get("agents", {})
         return agents_config.get(agent_name, {})
 
+# Process config (cheap: nothing is read until first access)
+_process_settings = Config()
+_active_settings: ContextVar[Optional[Config]] = ContextVar("engine_settings", default=None)
+
+def current_settings() -> Config:
+    """The settings in effect here: those set by use_settings, otherwise the process settings"""
+    return _active_settings.get() or _process_settings
+
+@contextmanager
+def use_settings(config: Config):
+    """
+    Make ``config`` the settings seen through ``engine.config.settings`` in this context
+
+    Scoped with a context variable, so it covers this thread or task and
+    code it calls, but not threads it starts (run those through
+    ``contextvars.copy_context().run``).
+    """
+    token = _active_settings.set(config)
+    try:
+        yield config
+    finally:
+        _active_settings.reset(token)
+
+class SettingsProxy:
+    """
+    Forwards to current_settings()
+
+    Modules import ``settings`` once and keep it; going through the proxy
+    lets the same code read a tenant's settings inside ``use_settings``.
+    """
+
+    __slots__ = ()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(current_settings(), name)
+
+    def __repr__(self) -> str:
+        return f"<settings -> {current_settings().settings_path}>"
+
 # Global config instance
-settings = Config()
+settings = SettingsProxy()
@@ -4,22 +4,29 @@ AI Model integrations for OpenAI and Anthropic
 
 import os
 import json
+import hashlib
 import logging
+import threading
+import importlib
+import importlib.util
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass
 
-# Try to import the libraries (they'll need to be installed)
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+from engine.utils.single_flight import SingleFlight
 
-try:
-    import anthropic
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    ANTHROPIC_AVAILABLE = False
+# Provider SDKs are heavy to import, so only check that they are installed here
+# and import them when a client for that provider is first needed
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
+ANTHROPIC_AVAILABLE = importlib.util.find_spec("anthropic") is not None
+
+def request_key(model: str, prompt: str, system_prompt: Optional[str] = None, max_tokens: int = 2000) -> str:
+    """Identity of a model request: identical keys would get the same completion"""
+    payload = json.dumps([model, system_prompt or "", prompt, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def estimate_tokens(prompt: str, system_prompt: Optional[str] = None) -> int:
+    """Rough prompt token count (about 4 characters per token) for quota planning"""
+    return (len(prompt) + len(system_prompt or "")) // 4 + 1
 
 @dataclass
 class ModelResponse:
@@ -34,39 +41,149 @@ class ModelResponse:
 class AIModelClient:
     """Unified client for AI model interactions"""
     
-    def __init__(self):
+    # Retries after a 429 before giving up; the limiter decides how long to wait
+    RATE_LIMIT_RETRIES = 3
+    
+    def __init__(self, rate_limiter=None, spend_ledger=None, api_keys: Optional[Dict[str, str]] = None,
+                 http_client=None):
         self.logger = logging.getLogger(__name__)
-        self._initialize_clients()
-    
-    def _initialize_clients(self):
-        """Initialize AI model clients with API keys"""
-        # OpenAI client
-        if OPENAI_AVAILABLE and os.getenv('OPENAI_API_KEY'):
-            self.openai_client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-            self.logger.info("OpenAI client initialized")
-        else:
-            self.openai_client = None
+        # {"openai": ..., "anthropic": ...}; when given, the *_API_KEY environment variables are ignored
+        self.api_keys = api_keys
+        # httpx.Client shared with other AIModelClients: passed to the SDKs, left open by close()
+        self._http_client = http_client
+        self._clients: Dict[str, Any] = {}
+        self._client_lock = threading.Lock()
+        self._rate_limiter = rate_limiter
+        self._spend_ledger = spend_ledger
+        # Identical requests made while one is already running share its response
+        self._single_flight = SingleFlight()
+    
+    @property
+    def rate_limiter(self):
+        """Shared RPM/TPM limiter, unless disabled with rate_limits.enabled: false"""
+        if self._rate_limiter is None:
+            from engine.config import settings
+            if settings.get_section('rate_limits').get('enabled', True):
+                from engine.utils.rate_limiter import get_rate_limiter
+                self._rate_limiter = get_rate_limiter()
+            else:
+                self._rate_limiter = False
+        return self._rate_limiter or None
+    
+    @property
+    def spend_ledger(self):
+        """Shared spend ledger, unless disabled with budget.enabled: false"""
+        if self._spend_ledger is None:
+            from engine.config import settings
+            if settings.get_section('budget').get('enabled', True):
+                from engine.utils.spend_ledger import get_spend_ledger
+                self._spend_ledger = get_spend_ledger()
+            else:
+                self._spend_ledger = False
+        return self._spend_ledger or None
+    
+    def record_spend(self, response: ModelResponse, mode: str = 'sync'):
+        """Add a successful call's cost to the spend ledger"""
+        ledger = self.spend_ledger
+        if ledger is None or not response.success:
+            return
+        try:
+            provider = 'anthropic' if response.model.startswith('claude-') else 'openai'
+            ledger.record(provider, response.model, response.tokens_used, response.cost, mode)
+        except Exception as e:
+            self.logger.warning(f"Failed to record spend: {e}")
+    
+    @property
+    def openai_client(self):
+        """OpenAI client, created on first use"""
+        return self._get_client('openai')
+    
+    @property
+    def anthropic_client(self):
+        """Anthropic client, created on first use"""
+        return self._get_client('anthropic')
+    
+    def _get_client(self, provider: str):
+        """Return the client for a provider, initializing it once"""
+        if provider not in self._clients:
+            with self._client_lock:
+                if provider not in self._clients:
+                    self._clients[provider] = self._create_client(provider)
+        return self._clients[provider]
+    
+    def _api_key(self, provider: str) -> Optional[str]:
+        if self.api_keys is not None:
+            return self.api_keys.get(provider)
+        return os.getenv(f'{provider.upper()}_API_KEY')
+    
+    def _create_client(self, provider: str):
+        """Import a provider SDK and build its client with API keys"""
+        options = {'http_client': self._http_client} if self._http_client is not None else {}
+        if provider == 'openai':
+            api_key = self._api_key('openai')
+            if OPENAI_AVAILABLE and api_key:
+                openai = importlib.import_module('openai')
+                self.logger.info("OpenAI client initialized")
+                return openai.OpenAI(api_key=api_key, **options)
             if not OPENAI_AVAILABLE:
                 self.logger.warning("OpenAI library not available (pip install openai)")
+            return None
         
-        # Anthropic client  
-        if ANTHROPIC_AVAILABLE and os.getenv('ANTHROPIC_API_KEY'):
-            self.anthropic_client = anthropic.Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
-            self.logger.info("Anthropic client initialized")
-        else:
-            self.anthropic_client = None
+        if provider == 'anthropic':
+            api_key = self._api_key('anthropic')
+            if ANTHROPIC_AVAILABLE and api_key:
+                anthropic = importlib.import_module('anthropic')
+                self.logger.info("Anthropic client initialized")
+                return anthropic.Anthropic(api_key=api_key, **options)
             if not ANTHROPIC_AVAILABLE:
                 self.logger.warning("Anthropic library not available (pip install anthropic)")
+            return None
+        
+        raise ValueError(f"Unknown provider: {provider}")
+    
+    def close(self):
+        """Close any provider clients that have been created"""
+        with self._client_lock:
+            if self._http_client is not None:
+                # Closing an SDK client would close the shared HTTP pool
+                self._clients.clear()
+                return
+            for provider, client in self._clients.items():
+                if client is not None and hasattr(client, 'close'):
+                    try:
+                        client.close()
+                    except Exception as e:
+                        self.logger.warning(f"Failed to close {provider} client: {e}")
+            self._clients.clear()
     
     def call_model(self, model: str, prompt: str, system_prompt: Optional[str] = None, 
                    max_tokens: int = 2000) -> ModelResponse:
-        """Call the appropriate AI model"""
+        """
+        Call the appropriate AI model
         
+        Concurrent identical requests (same model, prompts and max_tokens)
+        share one upstream call and receive the same ModelResponse.
+        """
+        key = request_key(model, prompt, system_prompt, max_tokens)
+        return self._single_flight.do(key, lambda: self._call_model(model, prompt, system_prompt, max_tokens))
+    
+    async def acall_model(self, model: str, prompt: str, system_prompt: Optional[str] = None,
+                          max_tokens: int = 2000) -> ModelResponse:
+        """Async call_model, coalesced with identical sync and async requests in flight"""
+        key = request_key(model, prompt, system_prompt, max_tokens)
+        return await self._single_flight.ado(key, lambda: self._call_model(model, prompt, system_prompt, max_tokens))
+    
+    @property
+    def coalescing_stats(self) -> Dict[str, int]:
+        return dict(self._single_flight.stats, in_flight=self._single_flight.in_flight())
+    
+    def _call_model(self, model: str, prompt: str, system_prompt: Optional[str] = None,
+                    max_tokens: int = 2000) -> ModelResponse:
         # Route to correct provider based on model name
         if model.startswith('gpt-') or model.startswith('o1-'):
-            return self._call_openai(model, prompt, system_prompt, max_tokens)
+            response = self._call_openai(model, prompt, system_prompt, max_tokens)
         elif model.startswith('claude-'):
-            return self._call_anthropic(model, prompt, system_prompt, max_tokens)
+            response = self._call_anthropic(model, prompt, system_prompt, max_tokens)
         else:
             return ModelResponse(
                 content="",
@@ -76,6 +193,9 @@ class AIModelClient:
                 success=False,
                 error=f"Unknown model: {model}"
             )
+        
+        self.record_spend(response)
+        return response
     
     def _call_openai(self, model: str, prompt: str, system_prompt: Optional[str] = None,
                      max_tokens: int = 2000) -> ModelResponse:
@@ -107,7 +227,10 @@ class AIModelClient:
             messages.append({"role": "user", "content": prompt})
             
             # Make API call
-            response = self.openai_client.chat.completions.create(
+            response = self._rate_limited_call(
+                'openai', model, estimate_tokens(prompt, system_prompt) + max_tokens,
+                self.openai_client.chat.completions,
+                lambda response: response.usage.total_tokens,
                 model=model,
                 messages=messages,
                 max_tokens=max_tokens,
@@ -163,7 +286,10 @@ class AIModelClient:
                 model = model_mapping.get(model, model)
             
             # Make API call
-            response = self.anthropic_client.messages.create(
+            response = self._rate_limited_call(
+                'anthropic', model, estimate_tokens(prompt, system_prompt) + max_tokens,
+                self.anthropic_client.messages,
+                lambda response: response.usage.input_tokens + response.usage.output_tokens,
                 model=model,
                 max_tokens=max_tokens,
                 temperature=0.1,
@@ -197,6 +323,39 @@ class AIModelClient:
                 error=str(e)
             )
     
+    def _rate_limited_call(self, provider: str, model: str, estimated_tokens: int, resource,
+                           count_tokens, **request):
+        """
+        Call ``resource.create(**request)`` within the provider's RPM/TPM quota
+        
+        Waits for capacity before each attempt, learns limits from the
+        rate-limit response headers, and on a 429 pauses the bucket for the
+        server's retry-after and tries again.
+        """
+        limiter = self.rate_limiter
+        if limiter is None:
+            return resource.create(**request)
+        from engine.utils.rate_limiter import parse_reset
+        
+        for attempt in range(self.RATE_LIMIT_RETRIES + 1):
+            limiter.acquire(provider, model, estimated_tokens)
+            try:
+                raw = resource.with_raw_response.create(**request)
+            except Exception as e:
+                http_response = getattr(e, 'response', None)
+                if getattr(e, 'status_code', None) != 429 or attempt == self.RATE_LIMIT_RETRIES:
+                    raise
+                headers = getattr(http_response, 'headers', {}) or {}
+                limiter.update_from_headers(provider, model, headers)
+                limiter.penalize(provider, model, parse_reset(headers.get('retry-after', '')))
+                self.logger.warning(f"{provider} rate limited {model}, retrying (attempt {attempt + 1})")
+                continue
+            
+            limiter.update_from_headers(provider, model, raw.headers)
+            response = raw.parse()
+            limiter.record_usage(provider, model, estimated_tokens, count_tokens(response))
+            return response
+    
     def _estimate_openai_cost(self, model: str, usage) -> float:
         """Estimate cost for OpenAI API calls"""
         # Approximate pricing (November 2024)
@@ -0,0 +1,354 @@
+"""
+Offline batch mode for OpenAI Batch and Anthropic Message Batches
+
+Trades latency for the providers' batch discount and higher limits:
+extraction requests are serialized to JSONL, submitted as a batch job,
+polled until finished, and the results are returned as ModelResponse
+objects so callers can feed them through the normal parsing and validation
+pipeline. LocalBatchBackend stands in for both endpoints so the whole flow
+can run offline.
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+from pathlib import Path
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Callable, Iterable, Tuple
+
+from engine.integrations.ai_models import AIModelClient, ModelResponse
+
+# Both providers bill batch jobs at half the synchronous price
+BATCH_DISCOUNT = 0.5
+
+@dataclass
+class BatchRequest:
+    """One model call inside a batch job"""
+    custom_id: str
+    model: str
+    prompt: str
+    system_prompt: Optional[str] = None
+    max_tokens: int = 2000
+
+def provider_for_model(model: str) -> str:
+    """Route a model name to its provider, mirroring AIModelClient.call_model"""
+    if model.startswith('gpt-') or model.startswith('o1-'):
+        return 'openai'
+    if model.startswith('claude-'):
+        return 'anthropic'
+    raise ValueError(f"Unknown model: {model}")
+
+# ----------------------------------------------------------------------
+# JSONL serialization
+# ----------------------------------------------------------------------
+def openai_batch_line(request: BatchRequest) -> Dict[str, Any]:
+    messages = []
+    if request.system_prompt:
+        messages.append({"role": "system", "content": request.system_prompt})
+    messages.append({"role": "user", "content": request.prompt})
+    return {
+        "custom_id": request.custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {"model": request.model, "messages": messages,
+                 "max_tokens": request.max_tokens, "temperature": 0.1}
+    }
+
+def anthropic_batch_line(request: BatchRequest) -> Dict[str, Any]:
+    return {
+        "custom_id": request.custom_id,
+        "params": {"model": request.model, "max_tokens": request.max_tokens, "temperature": 0.1,
+                   "system": request.system_prompt or "",
+                   "messages": [{"role": "user", "content": request.prompt}]}
+    }
+
+def write_batch_file(requests: List[BatchRequest], provider: str, path: Path) -> Path:
+    """Serialize requests to the provider's batch JSONL format"""
+    to_line = openai_batch_line if provider == 'openai' else anthropic_batch_line
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        for request in requests:
+            f.write(json.dumps(to_line(request)) + "\n")
+    return path
+
+# ----------------------------------------------------------------------
+# Result parsing (provider result line -> ModelResponse)
+# ----------------------------------------------------------------------
+class _Usage:
+    """Attribute view of a usage dict for the AIModelClient cost estimators"""
+
+    def __init__(self, usage: Dict[str, Any]):
+        self.__dict__.update(usage)
+
+def parse_openai_result(line: Dict[str, Any], cost_client: AIModelClient) -> Tuple[str, ModelResponse]:
+    custom_id = line["custom_id"]
+    response = line.get("response") or {}
+    body = response.get("body") or {}
+    model = body.get("model", "")
+    if line.get("error") or response.get("status_code") != 200:
+        error = line.get("error") or body.get("error") or f"status {response.get('status_code')}"
+        return custom_id, ModelResponse("", 0, 0.0, model, success=False, error=str(error))
+    usage = body.get("usage", {})
+    cost = cost_client._estimate_openai_cost(model, _Usage(usage)) * BATCH_DISCOUNT
+    return custom_id, ModelResponse(content=body["choices"][0]["message"]["content"],
+                                    tokens_used=usage.get("total_tokens", 0), cost=cost, model=model)
+
+def parse_anthropic_result(line: Dict[str, Any], cost_client: AIModelClient) -> Tuple[str, ModelResponse]:
+    custom_id = line["custom_id"]
+    result = line.get("result") or {}
+    message = result.get("message") or {}
+    model = message.get("model", "")
+    if result.get("type") != "succeeded":
+        error = result.get("error") or result.get("type", "unknown")
+        return custom_id, ModelResponse("", 0, 0.0, model, success=False, error=str(error))
+    usage = message.get("usage", {})
+    cost = cost_client._estimate_anthropic_cost(model, _Usage(usage)) * BATCH_DISCOUNT
+    text = "".join(block.get("text", "") for block in message.get("content", []))
+    return custom_id, ModelResponse(content=text, cost=cost, model=model,
+                                    tokens_used=usage.get("input_tokens", 0) + usage.get("output_tokens", 0))
+
+# ----------------------------------------------------------------------
+# Backends
+# ----------------------------------------------------------------------
+class OpenAIBatchBackend:
+    """OpenAI Batch API (files + batches endpoints)"""
+
+    provider = 'openai'
+    RUNNING = {'validating', 'in_progress', 'finalizing', 'cancelling'}
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, batch_file: Path) -> str:
+        with open(batch_file, 'rb') as f:
+            uploaded = self.client.files.create(file=f, purpose='batch')
+        batch = self.client.batches.create(input_file_id=uploaded.id, endpoint='/v1/chat/completions',
+                                           completion_window='24h')
+        return batch.id
+
+    def status(self, job_id: str) -> str:
+        status = self.client.batches.retrieve(job_id).status
+        return 'running' if status in self.RUNNING else status
+
+    def results(self, job_id: str) -> Iterable[Dict[str, Any]]:
+        batch = self.client.batches.retrieve(job_id)
+        for file_id in (batch.output_file_id, getattr(batch, 'error_file_id', None)):
+            if file_id:
+                for line in self.client.files.content(file_id).text.splitlines():
+                    if line.strip():
+                        yield json.loads(line)
+
+class AnthropicBatchBackend:
+    """Anthropic Message Batches API"""
+
+    provider = 'anthropic'
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, batch_file: Path) -> str:
+        with open(batch_file, 'r') as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        return self.client.messages.batches.create(requests=requests).id
+
+    def status(self, job_id: str) -> str:
+        status = self.client.messages.batches.retrieve(job_id).processing_status
+        return 'running' if status in ('in_progress', 'canceling') else 'completed'
+
+    def results(self, job_id: str) -> Iterable[Dict[str, Any]]:
+        for item in self.client.messages.batches.results(job_id):
+            yield item.model_dump() if hasattr(item, 'model_dump') else dict(item)
+
+class LocalBatchBackend:
+    """
+    Offline stand-in for the batch endpoints
+
+    Stores submitted JSONL under ``workdir``, "completes" a job once
+    ``delay`` seconds have passed, and answers every request with
+    ``responder(request) -> str``, writing results in the provider's format.
+    """
+
+    def __init__(self, provider: str = 'openai', workdir: Optional[Path] = None,
+                 responder: Optional[Callable[[BatchRequest], str]] = None, delay: float = 0.0):
+        self.provider = provider
+        if workdir is None:
+            from engine.config import settings
+            workdir = settings.data_root / 'cache' / 'batches' / 'local'
+        self.workdir = Path(workdir)
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        self.responder = responder or (lambda request: "[]")
+        self.delay = delay
+
+    def submit(self, batch_file: Path) -> str:
+        job_id = f"local_batch_{uuid.uuid4().hex[:12]}"
+        (self.workdir / f"{job_id}.input.jsonl").write_bytes(Path(batch_file).read_bytes())
+        (self.workdir / f"{job_id}.submitted").write_text(str(time.time()))
+        return job_id
+
+    def status(self, job_id: str) -> str:
+        submitted_at = float((self.workdir / f"{job_id}.submitted").read_text())
+        return 'completed' if time.time() - submitted_at >= self.delay else 'running'
+
+    def _to_request(self, line: Dict[str, Any]) -> BatchRequest:
+        if self.provider == 'openai':
+            body = line["body"]
+            system = next((m["content"] for m in body["messages"] if m["role"] == "system"), None)
+            prompt = next(m["content"] for m in body["messages"] if m["role"] == "user")
+            return BatchRequest(line["custom_id"], body["model"], prompt, system, body["max_tokens"])
+        params = line["params"]
+        return BatchRequest(line["custom_id"], params["model"], params["messages"][0]["content"],
+                            params.get("system"), params["max_tokens"])
+
+    def _to_result(self, request: BatchRequest, content: str) -> Dict[str, Any]:
+        input_tokens = (len(request.prompt) + len(request.system_prompt or "")) // 4
+        output_tokens = len(content) // 4
+        if self.provider == 'openai':
+            return {"custom_id": request.custom_id, "error": None, "response": {"status_code": 200, "body": {
+                "model": request.model,
+                "choices": [{"message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                          "total_tokens": input_tokens + output_tokens}}}}
+        return {"custom_id": request.custom_id, "result": {"type": "succeeded", "message": {
+            "model": request.model, "content": [{"type": "text", "text": content}],
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens}}}}
+
+    def results(self, job_id: str) -> Iterable[Dict[str, Any]]:
+        with open(self.workdir / f"{job_id}.input.jsonl", 'r') as f:
+            for line in f:
+                if line.strip():
+                    request = self._to_request(json.loads(line))
+                    yield self._to_result(request, self.responder(request))
+
+def create_batch_backend(provider: str, ai_client: AIModelClient):
+    """Build the real batch backend for a provider from an AIModelClient's SDK client"""
+    client = ai_client._get_client(provider)
+    if client is None:
+        raise RuntimeError(f"{provider} client not available for batch submission")
+    if provider == 'openai':
+        return OpenAIBatchBackend(client)
+    return AnthropicBatchBackend(client)
+
+# ----------------------------------------------------------------------
+# Job runner
+# ----------------------------------------------------------------------
+class BatchJobRunner:
+    """
+    Serializes, submits and polls a batch job, keeping a manifest so jobs can be resumed
+
+    Manifests are keyed by provider and a hash of the serialized requests. A
+    run whose input matches a job that was submitted before and has not
+    failed polls that job instead of submitting (and paying for) it again,
+    so a killed backfill picks its jobs back up on restart.
+    """
+
+    def __init__(self, backend, workdir: Optional[Path] = None, poll_interval: float = 30.0,
+                 max_poll_interval: float = 600.0, timeout: float = 26 * 3600):
+        self.logger = logging.getLogger(__name__)
+        self.backend = backend
+        if workdir is None:
+            from engine.config import settings
+            workdir = settings.data_root / 'cache' / 'batches'
+        self.workdir = Path(workdir)
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.timeout = timeout
+        self.cost_client = AIModelClient(rate_limiter=False)
+        self._manifests: Dict[str, Path] = {}
+
+    def _read_manifest(self, manifest_file: Path) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(manifest_file.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, manifest_file: Path, manifest: Dict[str, Any]):
+        tmp_file = manifest_file.with_suffix('.tmp')
+        tmp_file.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp_file, manifest_file)
+
+    def _job_manifest(self, job_id: str) -> Optional[Dict[str, Any]]:
+        manifest_file = self._manifests.get(job_id)
+        return self._read_manifest(manifest_file) if manifest_file else None
+
+    def _update_manifest(self, job_id: str, **fields):
+        manifest = self._job_manifest(job_id)
+        if manifest is not None:
+            manifest.update(fields, updated_at=time.time())
+            self._write_manifest(self._manifests[job_id], manifest)
+
+    def _set_status(self, job_id: str, status: str):
+        self._update_manifest(job_id, status=status)
+
+    def submit(self, requests: List[BatchRequest]) -> str:
+        """Submit the requests, or resume the job already submitted for them; returns the job id"""
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        batch_file = write_batch_file(requests, self.backend.provider,
+                                      self.workdir / f"{stamp}-{uuid.uuid4().hex[:8]}.jsonl")
+        digest = hashlib.sha256()
+        with open(batch_file, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        manifest_file = self.workdir / f"{self.backend.provider}-{digest.hexdigest()[:32]}.manifest.json"
+
+        manifest = self._read_manifest(manifest_file) if manifest_file.exists() else None
+        if manifest is not None and manifest.get("status") != "failed":
+            batch_file.unlink()
+            job_id = manifest["job_id"]
+            self._manifests[job_id] = manifest_file
+            self.logger.info(f"Resuming {self.backend.provider} batch {job_id} ({manifest.get('status')}) "
+                             f"with {len(requests)} requests")
+            return job_id
+
+        job_id = self.backend.submit(batch_file)
+        self._write_manifest(manifest_file, {
+            "job_id": job_id, "provider": self.backend.provider, "batch_file": str(batch_file),
+            "submitted_at": time.time(), "requests": len(requests), "status": "submitted"
+        })
+        self._manifests[job_id] = manifest_file
+        self.logger.info(f"Submitted {self.backend.provider} batch {job_id} with {len(requests)} requests")
+        return job_id
+
+    def wait(self, job_id: str) -> Dict[str, ModelResponse]:
+        """Poll until the job finishes and return responses keyed by custom_id"""
+        deadline = time.monotonic() + self.timeout
+        interval = self.poll_interval
+        while True:
+            status = self.backend.status(job_id)
+            if status != 'running':
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Batch {job_id} did not finish within {self.timeout}s")
+            time.sleep(interval)
+            interval = min(interval * 1.5, self.max_poll_interval)
+
+        if status not in ('completed', 'ended'):
+            raise RuntimeError(f"Batch {job_id} finished with status {status}")
+
+        parse = parse_openai_result if self.backend.provider == 'openai' else parse_anthropic_result
+        responses = dict(parse(line, self.cost_client) for line in self.backend.results(job_id))
+        # A resumed job that already returned once was paid for then
+        manifest = self._job_manifest(job_id) or {}
+        if manifest.get("spend_recorded") or manifest.get("status") == "completed":
+            self.logger.info("Spend for batch %s was already recorded", job_id)
+        else:
+            for response in responses.values():
+                self.cost_client.record_spend(response, mode='batch')
+            self._update_manifest(job_id, spend_recorded=True)
+        self.logger.info(f"Batch {job_id} returned {len(responses)} results")
+        return responses
+
+    def run(self, requests: List[BatchRequest]) -> Dict[str, ModelResponse]:
+        job_id = self.submit(requests)
+        try:
+            responses = self.wait(job_id)
+        except TimeoutError:
+            raise  # still running at the provider: the next run resumes it
+        except Exception:
+            # Failed, expired or unknown to the provider: the next run submits afresh
+            self._set_status(job_id, "failed")
+            raise
+        self._set_status(job_id, "completed")
+        return responses
@@ -0,0 +1,381 @@
+"""
+Local vector memory backend
+
+Fully offline memory store used for task enrichment. Embeddings are kept in a
+memory-mapped float32 matrix with a sidecar JSON-lines metadata table, and
+search is a brute-force cosine scan in NumPy. Large stores can build an
+IVF-style (inverted file) index so queries only scan a few clusters.
+
+On-disk layout (all files live in the store directory):
+    embeddings.f32   raw float32 rows, one per entry
+    entries.jsonl    one JSON object per entry (content, metadata, timestamp)
+    offsets.i64      byte offset of each row in entries.jsonl
+    ivf_centroids.npy / ivf_assign.i32   optional IVF index
+    meta.json        dimension, committed row count and embedder name
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+@dataclass
+class MemoryEntry:
+    """A single stored memory"""
+    id: int
+    content: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    timestamp: datetime = field(default_factory=datetime.now)
+
+@dataclass
+class MemorySearchResult:
+    """A memory returned by a similarity search"""
+    entry: MemoryEntry
+    score: float
+
+class HashingEmbedder:
+    """
+    Offline embedder based on signed feature hashing of words and word bigrams.
+
+    Any object exposing ``dimension``, ``name`` and ``embed(texts)`` returning an
+    (n, dimension) float32 array can be passed to LocalMemorySystem instead,
+    e.g. a wrapper around a local sentence-transformers model.
+    """
+
+    TOKEN_PATTERN = re.compile(r"[a-z0-9$]+")
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+        self.name = f"hashing-{dimension}"
+
+    def _features(self, text: str) -> Iterable[str]:
+        tokens = self.TOKEN_PATTERN.findall(text.lower())
+        yield from tokens
+        for first, second in zip(tokens, tokens[1:]):
+            yield f"{first} {second}"
+
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        """Embed a batch of texts into L2-normalized float32 vectors"""
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dimension
+                sign = 1.0 if digest[4] & 1 else -1.0
+                vectors[row, bucket] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+class LocalMemorySystem:
+    """Memory-mapped vector store with cosine search and an optional IVF index"""
+
+    SEARCH_CHUNK_ROWS = 65536
+
+    def __init__(self, path: Optional[Path] = None, embedder: Optional[Any] = None,
+                 ivf_threshold: int = 50000, nprobe: int = 8):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy is required for the local memory backend (pip install numpy)")
+
+        self.logger = logging.getLogger(__name__)
+        if path is None:
+            from engine.config import settings
+            path = settings.memory_path
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.embedder = embedder or HashingEmbedder()
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+
+        self._lock = threading.RLock()
+        self._matrix_cache = None
+        self._offsets_cache = None
+        self._centroids = None
+        self._assign_cache = None
+
+        self._embeddings_file = self.path / "embeddings.f32"
+        self._entries_file = self.path / "entries.jsonl"
+        self._offsets_file = self.path / "offsets.i64"
+        self._centroids_file = self.path / "ivf_centroids.npy"
+        self._assign_file = self.path / "ivf_assign.i32"
+        self._meta_file = self.path / "meta.json"
+
+        self._meta = self._load_meta()
+        self._recover_partial_append()
+
+    # ------------------------------------------------------------------
+    # Metadata and crash recovery
+    # ------------------------------------------------------------------
+    def _load_meta(self) -> Dict[str, Any]:
+        if self._meta_file.exists():
+            with open(self._meta_file, "r") as f:
+                meta = json.load(f)
+            if meta.get("dimension") != self.embedder.dimension or meta.get("embedder") != self.embedder.name:
+                raise ValueError(
+                    f"Memory store at {self.path} was built with {meta.get('embedder')} "
+                    f"(dim {meta.get('dimension')}), not {self.embedder.name}"
+                )
+            return meta
+        meta = {"dimension": self.embedder.dimension, "embedder": self.embedder.name,
+                "count": 0, "indexed_count": 0}
+        self._write_meta(meta)
+        return meta
+
+    def _write_meta(self, meta: Dict[str, Any]):
+        """Atomically replace meta.json; the row count in it is the commit marker"""
+        tmp_file = self._meta_file.with_suffix(".tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_file, self._meta_file)
+
+    def _recover_partial_append(self):
+        """Truncate data written by an append that crashed before committing"""
+        count = self._meta["count"]
+        row_bytes = self.embedder.dimension * 4
+        truncations = [(self._embeddings_file, count * row_bytes), (self._offsets_file, count * 8)]
+        if self._assign_file.exists():
+            truncations.append((self._assign_file, self._meta.get("indexed_count", 0) * 4))
+
+        entries_end = 0
+        if count and self._offsets_file.exists():
+            last_offset = int(np.fromfile(self._offsets_file, dtype=np.int64, count=count)[-1])
+            with open(self._entries_file, "rb") as f:
+                f.seek(last_offset)
+                entries_end = last_offset + len(f.readline())
+        truncations.append((self._entries_file, entries_end))
+
+        for file_path, size in truncations:
+            if file_path.exists() and file_path.stat().st_size > size:
+                self.logger.warning("Discarding uncommitted data in %s", file_path.name)
+                with open(file_path, "r+b") as f:
+                    f.truncate(size)
+
+    @property
+    def count(self) -> int:
+        return self._meta["count"]
+
+    def __len__(self) -> int:
+        return self.count
+
+    # ------------------------------------------------------------------
+    # Appends
+    # ------------------------------------------------------------------
+    def add_memory(self, content: str, metadata: Optional[Dict[str, Any]] = None,
+                   timestamp: Optional[datetime] = None) -> MemoryEntry:
+        """Store a single memory and return its entry"""
+        return self.add_memories([(content, metadata, timestamp)])[0]
+
+    def add_memories(self, items: List[Tuple[str, Optional[Dict[str, Any]], Optional[datetime]]]) -> List[MemoryEntry]:
+        """
+        Append a batch of memories
+
+        Only the new rows are embedded and written; existing data is never
+        rewritten. The batch becomes visible once meta.json is updated.
+        """
+        if not items:
+            return []
+
+        vectors = self.embedder.embed([content for content, _, _ in items]).astype(np.float32, copy=False)
+
+        with self._lock:
+            start = self.count
+            entries = []
+            offsets = []
+            with open(self._entries_file, "ab") as f:
+                position = f.tell()
+                for row, (content, metadata, timestamp) in enumerate(items):
+                    entry = MemoryEntry(id=start + row, content=content, metadata=metadata or {},
+                                        timestamp=timestamp or datetime.now())
+                    line = json.dumps({
+                        "id": entry.id,
+                        "content": entry.content,
+                        "metadata": entry.metadata,
+                        "timestamp": entry.timestamp.isoformat()
+                    }).encode("utf-8") + b"\n"
+                    offsets.append(position)
+                    f.write(line)
+                    position += len(line)
+                    entries.append(entry)
+
+            with open(self._embeddings_file, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._offsets_file, "ab") as f:
+                f.write(np.asarray(offsets, dtype=np.int64).tobytes())
+
+            meta = dict(self._meta, count=start + len(items))
+            if self._load_centroids() is not None:
+                assignments = self._nearest_centroids(vectors, 1)[:, 0].astype(np.int32)
+                with open(self._assign_file, "ab") as f:
+                    f.write(assignments.tobytes())
+                meta["indexed_count"] = meta["count"]
+
+            self._write_meta(meta)
+            self._meta = meta
+            self._matrix_cache = None
+            self._offsets_cache = None
+            self._assign_cache = None
+
+        if self.ivf_threshold and self._centroids is None and self.count >= self.ivf_threshold:
+            self.build_index()
+
+        return entries
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def _matrix(self) -> "np.ndarray":
+        if self._matrix_cache is None:
+            self._matrix_cache = np.memmap(self._embeddings_file, dtype=np.float32, mode="r",
+                                           shape=(self.count, self.embedder.dimension))
+        return self._matrix_cache
+
+    def _offsets(self) -> "np.ndarray":
+        if self._offsets_cache is None:
+            self._offsets_cache = np.memmap(self._offsets_file, dtype=np.int64, mode="r",
+                                            shape=(self.count,))
+        return self._offsets_cache
+
+    def get_entry(self, row: int) -> MemoryEntry:
+        """Read a single entry from the sidecar metadata table"""
+        with open(self._entries_file, "rb") as f:
+            f.seek(int(self._offsets()[row]))
+            data = json.loads(f.readline())
+        return MemoryEntry(
+            id=data["id"],
+            content=data["content"],
+            metadata=data.get("metadata", {}),
+            timestamp=datetime.fromisoformat(data["timestamp"])
+        )
+
+    def search_memories(self, query: str, limit: int = 5, threshold: float = 0.0) -> List[MemorySearchResult]:
+        """Return up to ``limit`` memories with cosine similarity >= ``threshold``"""
+        with self._lock:
+            if self.count == 0 or limit <= 0:
+                return []
+            query_vector = self.embedder.embed([query])[0].astype(np.float32, copy=False)
+            candidates = self._ivf_candidates(query_vector)
+            if candidates is None:
+                rows, scores = self._brute_force(query_vector, limit)
+            else:
+                rows, scores = self._scan_rows(query_vector, candidates, limit)
+
+            results = []
+            for row, score in zip(rows, scores):
+                if score < threshold:
+                    break
+                results.append(MemorySearchResult(entry=self.get_entry(int(row)), score=float(score)))
+            return results
+
+    def _brute_force(self, query_vector: "np.ndarray", limit: int) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Scan the whole matrix in chunks so huge stores never load fully into RAM"""
+        matrix = self._matrix()
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, self.count, self.SEARCH_CHUNK_ROWS):
+            scores = matrix[start:start + self.SEARCH_CHUNK_ROWS] @ query_vector
+            rows = np.arange(start, start + len(scores))
+            best_rows, best_scores = self._top_k(np.concatenate([best_rows, rows]),
+                                                 np.concatenate([best_scores, scores]), limit)
+        return best_rows, best_scores
+
+    def _scan_rows(self, query_vector: "np.ndarray", rows: "np.ndarray", limit: int) -> Tuple["np.ndarray", "np.ndarray"]:
+        scores = self._matrix()[rows] @ query_vector
+        return self._top_k(rows, scores, limit)
+
+    @staticmethod
+    def _top_k(rows: "np.ndarray", scores: "np.ndarray", limit: int) -> Tuple["np.ndarray", "np.ndarray"]:
+        if len(scores) > limit:
+            keep = np.argpartition(-scores, limit - 1)[:limit]
+            rows, scores = rows[keep], scores[keep]
+        order = np.argsort(-scores)
+        return rows[order], scores[order]
+
+    # ------------------------------------------------------------------
+    # IVF index
+    # ------------------------------------------------------------------
+    def _load_centroids(self) -> Optional["np.ndarray"]:
+        if self._centroids is None and self._centroids_file.exists():
+            self._centroids = np.load(self._centroids_file)
+        return self._centroids
+
+    def _assignments(self) -> "np.ndarray":
+        if self._assign_cache is None:
+            self._assign_cache = np.fromfile(self._assign_file, dtype=np.int32,
+                                             count=self._meta.get("indexed_count", 0))
+        return self._assign_cache
+
+    def _nearest_centroids(self, vectors: "np.ndarray", n: int) -> "np.ndarray":
+        similarities = vectors @ self._centroids.T
+        if n >= similarities.shape[1]:
+            return np.argsort(-similarities, axis=1)
+        return np.argpartition(-similarities, n - 1, axis=1)[:, :n]
+
+    def _ivf_candidates(self, query_vector: "np.ndarray") -> Optional["np.ndarray"]:
+        """Rows in the nprobe closest clusters plus any rows added since indexing"""
+        if self._load_centroids() is None:
+            return None
+        probe = self._nearest_centroids(query_vector[None, :], self.nprobe)[0]
+        assignments = self._assignments()
+        rows = np.flatnonzero(np.isin(assignments, probe))
+        unindexed = np.arange(len(assignments), self.count)
+        return np.concatenate([rows, unindexed])
+
+    def build_index(self, nlist: Optional[int] = None, iterations: int = 10, sample_size: int = 100000):
+        """Cluster the stored vectors with spherical k-means and write the IVF index"""
+        with self._lock:
+            if self.count == 0:
+                return
+            matrix = self._matrix()
+            nlist = nlist or max(1, int(np.sqrt(self.count)))
+            rng = np.random.default_rng(0)
+
+            sample_rows = np.sort(rng.choice(self.count, size=min(sample_size, self.count), replace=False))
+            sample = np.asarray(matrix[sample_rows])
+            centroids = sample[rng.choice(len(sample), size=min(nlist, len(sample)), replace=False)].copy()
+
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                for cluster in range(len(centroids)):
+                    members = sample[labels == cluster]
+                    if len(members):
+                        centroid = members.sum(axis=0)
+                        centroids[cluster] = centroid / (np.linalg.norm(centroid) or 1.0)
+
+            self._centroids = centroids
+            assignments = np.empty(self.count, dtype=np.int32)
+            for start in range(0, self.count, self.SEARCH_CHUNK_ROWS):
+                chunk = np.asarray(matrix[start:start + self.SEARCH_CHUNK_ROWS])
+                assignments[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+
+            np.save(self._centroids_file, centroids)
+            assignments.tofile(self._assign_file)
+            meta = dict(self._meta, indexed_count=self.count)
+            self._write_meta(meta)
+            self._meta = meta
+            self._assign_cache = None
+            self.logger.info("Built IVF index with %d clusters over %d memories", len(centroids), self.count)
+
+    def drop_index(self):
+        """Remove the IVF index and fall back to brute-force search"""
+        with self._lock:
+            for file_path in (self._centroids_file, self._assign_file):
+                if file_path.exists():
+                    file_path.unlink()
+            self._centroids = None
+            self._assign_cache = None
+            meta = dict(self._meta, indexed_count=0)
+            self._write_meta(meta)
+            self._meta = meta
@@ -0,0 +1,218 @@
+"""
+Warm MCP session pool
+
+Launches each server from the MCP config (default configs/default-mcp-config.json)
+once, on first use or at ``start()``, and keeps its JSON-RPC session open, so
+a tool call costs one round trip instead of a uvx/npx cold start. Concurrent
+callers share a server's session; responses are matched by request id.
+
+A server that has exited is restarted before the next call. Calls that were
+in flight when it died fail with MCPError rather than being replayed, since
+tool calls are not guaranteed to be idempotent. A server restarting more than
+``max_restarts`` times within ``restart_window`` seconds is left down until
+the window passes.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from engine.integrations.mcp_stdio import MCPStdioClient, MCPError, load_mcp_config, check_tool_result
+
+class _ServerSlot:
+    """One configured server: its live session plus restart and call counters"""
+
+    def __init__(self, name: str, entry: Dict[str, Any]):
+        self.name = name
+        self.entry = entry
+        self.client: Optional[MCPStdioClient] = None
+        self.lock = threading.Lock()
+        self.tools: Optional[List[Dict[str, Any]]] = None
+        self.restarts: List[float] = []
+        self.attempts = 0
+        self.starts = 0
+        self.calls = 0
+        self.errors = 0
+        self.last_start_ms = 0.0
+
+class MCPSessionPool:
+    """Long-lived sessions to the configured MCP servers behind a call_tool API"""
+
+    def __init__(self, config_path: Optional[Path] = None, servers: Optional[List[str]] = None,
+                 timeout: float = 30.0, start_timeout: float = 120.0, max_restarts: int = 3,
+                 restart_window: float = 300.0):
+        self.logger = logging.getLogger(__name__)
+        configured = load_mcp_config(config_path)
+        unknown = [name for name in servers or [] if name not in configured]
+        if unknown:
+            raise MCPError(f"MCP servers not in config: {', '.join(unknown)}")
+        self.timeout = timeout
+        self.start_timeout = start_timeout
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self._slots = {name: _ServerSlot(name, entry) for name, entry in configured.items()
+                       if servers is None or name in servers}
+        self._closed = False
+
+    @classmethod
+    def from_settings(cls) -> 'MCPSessionPool':
+        """Pool configured by the ``mcp`` settings section"""
+        from engine.config import settings
+        config = settings.get_section('mcp')
+        return cls(config_path=config.get('config_path'), servers=config.get('servers'),
+                   timeout=float(config.get('timeout', 30.0)),
+                   start_timeout=float(config.get('start_timeout', 120.0)),
+                   max_restarts=int(config.get('max_restarts', 3)),
+                   restart_window=float(config.get('restart_window', 300.0)))
+
+    @property
+    def servers(self) -> List[str]:
+        return list(self._slots)
+
+    # ------------------------------------------------------------------
+    # Sessions
+    # ------------------------------------------------------------------
+    def _slot(self, server: str) -> _ServerSlot:
+        if self._closed:
+            raise MCPError("MCP session pool is closed")
+        slot = self._slots.get(server)
+        if slot is None:
+            raise MCPError(f"Unknown MCP server '{server}'")
+        return slot
+
+    def session(self, server: str) -> MCPStdioClient:
+        """Live session for a server, starting or restarting it if needed"""
+        slot = self._slot(server)
+        client = slot.client
+        if client is not None and client.running:
+            return client
+        with slot.lock:
+            if slot.client is not None and slot.client.running:
+                return slot.client
+            if slot.attempts:
+                # It exited or failed to start before: retry within the restart budget
+                now = time.monotonic()
+                slot.restarts = [t for t in slot.restarts if now - t < self.restart_window]
+                if len(slot.restarts) >= self.max_restarts:
+                    raise MCPError(f"MCP server '{server}' restarted {len(slot.restarts)} times in "
+                                   f"{self.restart_window:.0f}s; not restarting yet")
+                slot.restarts.append(now)
+                if slot.client is not None:
+                    slot.client.close(timeout=0.5)
+                    slot.client = None
+                self.logger.warning(f"MCP server '{server}' is down; restarting")
+            slot.attempts += 1
+            entry = slot.entry
+            client = MCPStdioClient(entry["command"], entry["args"], entry["env"], timeout=self.start_timeout,
+                                    name=server)
+            started = time.monotonic()
+            try:
+                client.start()
+            except MCPError:
+                client.close(timeout=0.5)
+                raise
+            client.timeout = self.timeout
+            slot.last_start_ms = (time.monotonic() - started) * 1000
+            slot.starts += 1
+            slot.tools = None
+            slot.client = client
+            self.logger.info("MCP server %s started in %.0f ms", server, slot.last_start_ms)
+            return client
+
+    def start(self, servers: Optional[List[str]] = None) -> Dict[str, Optional[str]]:
+        """Warm up servers concurrently; returns each server's startup error (None when it started)"""
+        names = servers or self.servers
+        errors: Dict[str, Optional[str]] = {}
+
+        def warm(name: str):
+            try:
+                self.session(name)
+                errors[name] = None
+            except MCPError as e:
+                errors[name] = str(e)
+                self.logger.warning(f"Could not start MCP server '{name}': {e}")
+
+        with ThreadPoolExecutor(max_workers=max(len(names), 1), thread_name_prefix="mcp-warm") as pool:
+            list(pool.map(warm, names))
+        return errors
+
+    # ------------------------------------------------------------------
+    # Calls
+    # ------------------------------------------------------------------
+    def list_tools(self, server: str) -> List[Dict[str, Any]]:
+        """Tools a server offers (cached for the life of its session)"""
+        slot = self._slot(server)
+        client = self.session(server)
+        if slot.tools is None or slot.client is not client:
+            slot.tools = client.list_tools()
+        return slot.tools
+
+    def call_tool(self, server: str, tool: str, arguments: Optional[Dict[str, Any]] = None,
+                  timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Call a tool on a pooled server and return the tools/call result"""
+        slot = self._slot(server)
+        client = self.session(server)
+        slot.calls += 1
+        try:
+            return client.call_tool(tool, arguments, timeout=timeout)
+        except MCPError:
+            slot.errors += 1
+            raise
+
+    async def acall_tool(self, server: str, tool: str, arguments: Optional[Dict[str, Any]] = None,
+                         timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Async call_tool; waits on the response without blocking the event loop"""
+        slot = self._slot(server)
+        client = slot.client
+        if client is None or not client.running:
+            client = await asyncio.to_thread(self.session, server)
+        slot.calls += 1
+        future = None
+        try:
+            future = client.send_request("tools/call", {"name": tool, "arguments": arguments or {}})
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+            return check_tool_result(server, tool, result)
+        except asyncio.TimeoutError as e:
+            slot.errors += 1
+            raise MCPError(f"MCP server '{server}' did not answer {tool} in time") from e
+        except MCPError:
+            slot.errors += 1
+            raise
+        finally:
+            # Timed out or cancelled: stop tracking it so a late reply is dropped
+            if future is not None:
+                client.abandon(future)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: {"running": slot.client is not None and slot.client.running,
+                       "pid": slot.client.pid if slot.client is not None else None,
+                       "starts": slot.starts, "last_start_ms": round(slot.last_start_ms, 1),
+                       "calls": slot.calls, "errors": slot.errors}
+                for name, slot in self._slots.items()}
+
+    def close(self):
+        """Stop every server process"""
+        self._closed = True
+        for slot in self._slots.values():
+            with slot.lock:
+                if slot.client is not None:
+                    slot.client.close()
+                    slot.client = None
+
+    def __enter__(self) -> 'MCPSessionPool':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+def get_mcp_pool() -> MCPSessionPool:
+    """Shared session pool from the engine registry (servers start on first use)"""
+    from engine.utils.registry import get_registry
+    return get_registry().get_client('mcp_pool', MCPSessionPool.from_settings)
@@ -0,0 +1,279 @@
+"""
+MCP client over stdio
+
+Starts an MCP server from its ``mcpServers`` entry (command, args, env) and
+speaks newline-delimited JSON-RPC 2.0 to it over stdin/stdout. A reader
+thread matches responses to requests by id, so several threads can have
+calls in flight on one connection. The server's stderr is drained in the
+background and its last lines are attached to errors.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+PROTOCOL_VERSION = "2024-11-05"
+
+class MCPError(RuntimeError):
+    """Raised when an MCP server fails, exits, or returns a JSON-RPC or tool error"""
+
+def check_tool_result(server: str, tool: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a tools/call result, raising MCPError when the server flagged it as an error"""
+    if result.get("isError"):
+        text = " ".join(part.get("text", "") for part in result.get("content", []) if part.get("type") == "text")
+        raise MCPError(f"{server}: tool {tool} failed: {text or 'unknown error'}")
+    return result
+
+def default_mcp_config_path() -> Path:
+    from engine.config import REPO_ROOT
+    return REPO_ROOT / 'configs' / 'default-mcp-config.json'
+
+def load_mcp_config(config_path: Optional[Path] = None) -> Dict[str, Dict[str, Any]]:
+    """Server entries from an MCP config file (the ``mcpServers`` object), with $VARS expanded"""
+    path = Path(config_path) if config_path else default_mcp_config_path()
+    with open(path, 'r') as f:
+        servers = json.load(f).get('mcpServers', {})
+    expanded = {}
+    for name, entry in servers.items():
+        expanded[name] = {
+            "command": os.path.expandvars(entry["command"]),
+            "args": [os.path.expandvars(str(arg)) for arg in entry.get("args", [])],
+            "env": {key: os.path.expandvars(str(value)) for key, value in (entry.get("env") or {}).items()},
+        }
+    return expanded
+
+class MCPStdioClient:
+    """JSON-RPC connection to one MCP server process"""
+
+    def __init__(self, command: str, args: Optional[List[str]] = None, env: Optional[Dict[str, str]] = None,
+                 timeout: float = 30.0, name: Optional[str] = None, client_name: str = "engine"):
+        self.logger = logging.getLogger(__name__)
+        self.command = command
+        self.args = list(args or [])
+        self.env = dict(env or {})
+        self.timeout = timeout
+        self.name = name or command
+        self.client_name = client_name
+        self.server_info: Dict[str, Any] = {}
+        self.capabilities: Dict[str, Any] = {}
+        # Milliseconds spent in the last start(): process spawn and initialize round trip
+        self.start_timings: Dict[str, float] = {}
+
+        self._process: Optional[subprocess.Popen] = None
+        self._write_lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._next_id = 0
+        self._stderr_tail: deque = deque(maxlen=20)
+        self._reader: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, server_name: str, config_path: Optional[Path] = None, **kwargs) -> 'MCPStdioClient':
+        """Client for a named server in an MCP config file (default: configs/default-mcp-config.json)"""
+        servers = load_mcp_config(config_path)
+        if server_name not in servers:
+            raise MCPError(f"MCP server '{server_name}' not found in config")
+        entry = servers[server_name]
+        return cls(entry["command"], entry["args"], entry["env"], name=server_name, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    @property
+    def running(self) -> bool:
+        """The process is alive and its responses are still being read"""
+        if self._process is None or self._process.poll() is not None:
+            return False
+        return self._reader is None or self._reader.is_alive()
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process is not None else None
+
+    def start(self) -> 'MCPStdioClient':
+        """Launch the server and complete the initialize handshake"""
+        if self.running:
+            return self
+        started = time.perf_counter()
+        try:
+            self._process = subprocess.Popen(
+                [self.command] + self.args, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE, env={**os.environ, **self.env}
+            )
+        except OSError as e:
+            raise MCPError(f"Could not start MCP server '{self.name}': {e}") from e
+        self._reader = threading.Thread(target=self._read_loop, name=f"mcp-{self.name}-reader", daemon=True)
+        self._reader.start()
+        threading.Thread(target=self._drain_stderr, name=f"mcp-{self.name}-stderr", daemon=True).start()
+        spawned = time.perf_counter()
+
+        try:
+            result = self.request("initialize", {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": {"name": self.client_name, "version": "1.0"},
+            })
+            self.server_info = result.get("serverInfo", {})
+            self.capabilities = result.get("capabilities", {})
+            self.notify("notifications/initialized")
+        except BaseException:
+            # Callers using ``with`` never reach __exit__ when start() fails
+            self.close(timeout=1.0)
+            raise
+        self.start_timings = {"spawn_ms": (spawned - started) * 1000,
+                              "initialize_ms": (time.perf_counter() - spawned) * 1000}
+        self.logger.debug("MCP server %s ready (%s)", self.name, self.server_info.get("name", "unknown"))
+        return self
+
+    def close(self, timeout: float = 5.0):
+        """Close stdin and wait for the server to exit, terminating it if it does not"""
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            process.terminate()
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self._fail_pending(MCPError(f"MCP server '{self.name}' closed"))
+
+    def __enter__(self) -> 'MCPStdioClient':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Transport
+    # ------------------------------------------------------------------
+    def _write(self, message: Dict[str, Any]):
+        process = self._process
+        if process is None or process.poll() is not None:
+            raise MCPError(f"MCP server '{self.name}' is not running{self._stderr_hint()}")
+        data = (json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8")
+        try:
+            with self._write_lock:
+                process.stdin.write(data)
+                process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise MCPError(f"MCP server '{self.name}' closed its input: {e}{self._stderr_hint()}") from e
+
+    def _read_loop(self):
+        process = self._process
+        try:
+            for line in process.stdout:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    self.logger.debug("Ignoring non-JSON output from %s: %r", self.name, line[:200])
+                    continue
+                if not isinstance(message, dict) or "id" not in message or "method" in message:
+                    continue  # batches, server notifications and requests are not used
+                try:
+                    with self._pending_lock:
+                        future = self._pending.pop(message["id"], None)
+                except TypeError:
+                    continue  # unhashable id
+                # None: unknown id; done: the caller cancelled or abandoned it
+                if future is None or future.done():
+                    continue
+                try:
+                    if "error" in message:
+                        error = message["error"]
+                        detail = error.get("message", error) if isinstance(error, dict) else error
+                        future.set_exception(MCPError(f"{self.name}: {detail}"))
+                    else:
+                        future.set_result(message.get("result", {}))
+                except InvalidStateError:
+                    pass  # cancelled between the check and the set
+        finally:
+            self._fail_pending(MCPError(f"MCP server '{self.name}' exited{self._stderr_hint()}"))
+
+    def _drain_stderr(self):
+        process = self._process
+        if process is None:
+            return
+        for line in process.stderr:
+            self._stderr_tail.append(line.decode("utf-8", errors="replace").rstrip())
+
+    def _stderr_hint(self) -> str:
+        return f" (stderr: {self._stderr_tail[-1]})" if self._stderr_tail else ""
+
+    def _fail_pending(self, error: Exception):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            try:
+                future.set_exception(error)
+            except InvalidStateError:
+                pass  # already cancelled
+
+    # ------------------------------------------------------------------
+    # JSON-RPC
+    # ------------------------------------------------------------------
+    def send_request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Future:
+        """Send a request and return a future for its result"""
+        future: Future = Future()
+        with self._pending_lock:
+            self._next_id += 1
+            request_id = self._next_id
+            self._pending[request_id] = future
+        future.request_id = request_id
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        try:
+            self._write(message)
+        except MCPError:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            raise
+        return future
+
+    def request(self, method: str, params: Optional[Dict[str, Any]] = None,
+                timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send a request and wait for its result"""
+        future = self.send_request(method, params)
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeoutError as e:
+            self.abandon(future)
+            raise MCPError(f"MCP server '{self.name}' did not answer {method} in time") from e
+
+    def abandon(self, future: Future):
+        """Stop waiting for a request's response (e.g. after a timeout); a late answer is ignored"""
+        with self._pending_lock:
+            if self._pending.get(getattr(future, "request_id", None)) is future:
+                del self._pending[future.request_id]
+
+    def notify(self, method: str, params: Optional[Dict[str, Any]] = None):
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        self._write(message)
+
+    def ping(self) -> Dict[str, Any]:
+        return self.request("ping")
+
+    def list_tools(self) -> List[Dict[str, Any]]:
+        return self.request("tools/list").get("tools", [])
+
+    def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None,
+                  timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Call a tool, raising MCPError when the server reports it failed"""
+        result = self.request("tools/call", {"name": name, "arguments": arguments or {}}, timeout=timeout)
+        return check_tool_result(self.name, name, result)
@@ -5,10 +5,14 @@ Todoist API integration for task management
 import os
 import json
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import importlib.util
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-import requests
+
+# httpx backs the async client; it is only imported when that client is used
+HTTPX_AVAILABLE = importlib.util.find_spec("httpx") is not None
 
 @dataclass
 class TodoistTask:
@@ -43,41 +47,119 @@ class TodoistSection:
     project_id: str
     order: int
 
+def resolve_project_id(project_name: Optional[str], project_map: Dict[str, str]) -> Optional[str]:
+    """Project ID for a name: exact match first, then a case-insensitive substring match either way"""
+    if not project_name:
+        return None
+    if project_name in project_map:
+        return project_map[project_name]
+    for name, project_id in project_map.items():
+        if project_name.lower() in name.lower() or name.lower() in project_name.lower():
+            return project_id
+    return None
+
+def build_task_payload(task: TodoistTask) -> Dict[str, Any]:
+    """REST API body for creating a task"""
+    task_data = {
+        "content": task.content,
+        "priority": task.priority
+    }
+    
+    # Add optional fields
+    if task.project_id:
+        task_data["project_id"] = task.project_id
+    if task.section_id:
+        task_data["section_id"] = task.section_id
+    if task.parent_id:
+        task_data["parent_id"] = task.parent_id
+    if task.order:
+        task_data["order"] = task.order
+    if task.labels:
+        task_data["labels"] = task.labels
+    if task.due_string:
+        task_data["due_string"] = task.due_string
+    elif task.due_date:
+        task_data["due_date"] = task.due_date
+    elif task.due_datetime:
+        task_data["due_datetime"] = task.due_datetime
+    if task.description:
+        task_data["description"] = task.description
+    return task_data
+
 class TodoistClient:
     """Client for Todoist API interactions"""
     
-    def __init__(self):
+    def __init__(self, pool_size: int = 10, api_token: Optional[str] = None, adapter=None,
+                 timeout: Tuple[float, float] = (5.0, 30.0)):
         self.logger = logging.getLogger(__name__)
-        self.api_token = os.getenv('TODOIST_API_TOKEN')
+        self.api_token = api_token if api_token is not None else os.getenv('TODOIST_API_TOKEN')
         self.base_url = "https://api.todoist.com/rest/v2"
+        self.pool_size = pool_size
+        # (connect, read) seconds per request, so a stalled connection cannot hang a caller forever
+        self.timeout = timeout
+        # HTTPAdapter whose connection pool is shared with other clients: each client
+        # still has its own Session (and cookies), and close() leaves the adapter open
+        self._adapter = adapter
+        self._session = None
+        self._session_lock = threading.Lock()
         
         if not self.api_token:
-            self.logger.error("TODOIST_API_TOKEN not found in environment")
+            self.logger.error("TODOIST_API_TOKEN not found in environment" if api_token is None
+                              else "No Todoist API token configured")
             self.api_token = None
         else:
             self.logger.info("Todoist client initialized")
     
-    def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Dict[str, Any]:
-        """Make authenticated request to Todoist API"""
+    @property
+    def session(self):
+        """Pooled HTTP session shared by all requests made through this client"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    session = requests.Session()
+                    adapter = self._adapter or requests.adapters.HTTPAdapter(pool_connections=self.pool_size,
+                                                                             pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+    
+    def close(self):
+        """Close pooled connections"""
+        with self._session_lock:
+            if self._session is not None:
+                if self._adapter is not None:
+                    self._session.adapters.pop("https://", None)
+                self._session.close()
+                self._session = None
+    
+    def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None,
+                      extra_headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Make authenticated request to Todoist API (extra_headers e.g. X-Request-Id)"""
         if not self.api_token:
             raise ValueError("Todoist API token not available")
         
+        # Imported here so that importing the client stays cheap
+        import requests
+        
         headers = {
             "Authorization": f"Bearer {self.api_token}",
             "Content-Type": "application/json"
         }
+        if extra_headers:
+            headers.update(extra_headers)
         
         url = f"{self.base_url}/{endpoint}"
         
         try:
             if method.upper() == 'GET':
-                response = requests.get(url, headers=headers)
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
             elif method.upper() == 'POST':
-                response = requests.post(url, headers=headers, json=data)
+                response = self.session.post(url, headers=headers, json=data, timeout=self.timeout)
             elif method.upper() == 'PUT':
-                response = requests.put(url, headers=headers, json=data)
+                response = self.session.put(url, headers=headers, json=data, timeout=self.timeout)
             elif method.upper() == 'DELETE':
-                response = requests.delete(url, headers=headers)
+                response = self.session.delete(url, headers=headers, timeout=self.timeout)
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
             
@@ -159,7 +241,7 @@ class TodoistClient:
     def create_task(self, task: TodoistTask, dry_run: bool = False) -> Dict[str, Any]:
         """Create a new task in Todoist"""
         if dry_run:
-            self.logger.info(f"[DRY RUN] Would create task: {task.content}")
+            self.logger.info("[DRY RUN] Would create task: %s", task.content)
             return {
                 "success": True,
                 "task_id": "dry-run-id",
@@ -167,35 +249,11 @@ class TodoistClient:
                 "dry_run": True
             }
         
-        # Prepare task data
-        task_data = {
-            "content": task.content,
-            "priority": task.priority
-        }
-        
-        # Add optional fields
-        if task.project_id:
-            task_data["project_id"] = task.project_id
-        if task.section_id:
-            task_data["section_id"] = task.section_id
-        if task.parent_id:
-            task_data["parent_id"] = task.parent_id
-        if task.order:
-            task_data["order"] = task.order
-        if task.labels:
-            task_data["labels"] = task.labels
-        if task.due_string:
-            task_data["due_string"] = task.due_string
-        elif task.due_date:
-            task_data["due_date"] = task.due_date
-        elif task.due_datetime:
-            task_data["due_datetime"] = task.due_datetime
-        if task.description:
-            task_data["description"] = task.description
+        task_data = build_task_payload(task)
         
         try:
             result = self._make_request('POST', 'tasks', task_data)
-            self.logger.info(f"Created task: {task.content} (ID: {result['id']})")
+            self.logger.info("Created task: %s (ID: %s)", task.content, result['id'])
             return {
                 "success": True,
                 "task_id": result['id'],
@@ -233,4 +291,143 @@ class TodoistClient:
             'P3': 2,  # High  
             'P4': 1   # Normal
         }
-        return mapping.get(priority_level, 1)
\ No newline at end of file
+        return mapping.get(priority_level, 1)
+
+class AsyncTodoistClient:
+    """
+    Async counterpart of TodoistClient for many independent writes
+    
+    Requests share one pooled httpx.AsyncClient and at most
+    ``max_concurrency`` are in flight at once, so creating N tasks takes
+    about N / max_concurrency round trips. Results come back in input order.
+    The client is bound to the event loop it is first used in; use it as an
+    async context manager or call ``aclose()``.
+    """
+    
+    # Attempts per request when Todoist answers 429
+    RATE_LIMIT_RETRIES = 3
+    
+    def __init__(self, max_concurrency: Optional[int] = None, api_token: Optional[str] = None,
+                 timeout: float = 30.0):
+        self.logger = logging.getLogger(__name__)
+        if max_concurrency is None:
+            from engine.config import settings
+            max_concurrency = int(settings.get_section('todoist').get('max_concurrency', 8))
+        self.api_token = api_token if api_token is not None else os.getenv('TODOIST_API_TOKEN')
+        self.base_url = "https://api.todoist.com/rest/v2"
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self._client = None
+        self._semaphore: Optional['asyncio.Semaphore'] = None
+    
+    @property
+    def client(self):
+        """Pooled async HTTP client, created on first use"""
+        if self._client is None:
+            if not HTTPX_AVAILABLE:
+                raise RuntimeError("httpx is required for AsyncTodoistClient (pip install httpx)")
+            import httpx
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency)
+            )
+        return self._client
+    
+    @property
+    def semaphore(self) -> 'asyncio.Semaphore':
+        if self._semaphore is None:
+            import asyncio
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+    
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+    
+    async def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None,
+                            extra_headers: Optional[Dict[str, str]] = None) -> Any:
+        """Make an authenticated request within the concurrency limit"""
+        if not self.api_token:
+            raise ValueError("Todoist API token not available")
+        
+        headers = {"Authorization": f"Bearer {self.api_token}", **(extra_headers or {})}
+        async with self.semaphore:
+            for attempt in range(self.RATE_LIMIT_RETRIES + 1):
+                response = await self.client.request(method.upper(), f"/{endpoint}", headers=headers, json=data)
+                if response.status_code == 429 and attempt < self.RATE_LIMIT_RETRIES:
+                    from engine.utils.rate_limiter import parse_reset
+                    delay = parse_reset(response.headers.get('retry-after', '')) or 2.0 ** attempt
+                    self.logger.warning(f"Todoist rate limited, retrying in {delay:.1f}s")
+                    import asyncio
+                    await asyncio.sleep(delay)
+                    continue
+                response.raise_for_status()
+                return response.json() if response.content else {"success": True}
+    
+    async def get_projects(self) -> List[TodoistProject]:
+        """Get all projects from Todoist"""
+        try:
+            projects_data = await self._make_request('GET', 'projects')
+        except Exception as e:
+            self.logger.error(f"Failed to get projects: {str(e)}")
+            return []
+        return [TodoistProject(id=project['id'], name=project['name'], color=project['color'],
+                               is_shared=project.get('is_shared', False), order=project.get('order', 0))
+                for project in projects_data]
+    
+    async def get_sections(self, project_id: Optional[str] = None) -> List[TodoistSection]:
+        """Get all sections from Todoist, optionally filtered by project"""
+        endpoint = f'sections?project_id={project_id}' if project_id else 'sections'
+        try:
+            sections_data = await self._make_request('GET', endpoint)
+        except Exception as e:
+            self.logger.error(f"Failed to get sections: {str(e)}")
+            return []
+        return [TodoistSection(id=section['id'], name=section['name'], project_id=section['project_id'],
+                               order=section.get('order', 0))
+                for section in sections_data]
+    
+    async def find_section_by_name(self, section_name: str, project_id: str) -> Optional[TodoistSection]:
+        """Find a section by name within a specific project"""
+        for section in await self.get_sections(project_id):
+            if section.name.lower() == section_name.lower():
+                return section
+        return None
+    
+    async def create_task(self, task: TodoistTask, dry_run: bool = False) -> Dict[str, Any]:
+        """Create a new task in Todoist"""
+        if dry_run:
+            self.logger.info("[DRY RUN] Would create task: %s", task.content)
+            return {"success": True, "task_id": "dry-run-id", "content": task.content, "dry_run": True}
+        
+        try:
+            result = await self._make_request('POST', 'tasks', build_task_payload(task))
+            self.logger.info("Created task: %s (ID: %s)", task.content, result['id'])
+            return {"success": True, "task_id": result['id'], "content": result['content'], "url": result['url']}
+        except Exception as e:
+            self.logger.error(f"Failed to create task: {str(e)}")
+            return {"success": False, "error": str(e), "content": task.content}
+    
+    async def update_task(self, task_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Update fields of an existing task"""
+        try:
+            result = await self._make_request('POST', f'tasks/{task_id}', fields)
+            return {"success": True, "task_id": task_id, "content": result.get('content')}
+        except Exception as e:
+            self.logger.error(f"Failed to update task {task_id}: {str(e)}")
+            return {"success": False, "error": str(e), "task_id": task_id}
+    
+    async def create_multiple_tasks(self, tasks: List[TodoistTask], dry_run: bool = False) -> List[Dict[str, Any]]:
+        """Create tasks concurrently (bounded by max_concurrency), returning results in input order"""
+        import asyncio
+        return list(await asyncio.gather(*(self.create_task(task, dry_run) for task in tasks)))
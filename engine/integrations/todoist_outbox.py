@@ -0,0 +1,367 @@
+"""
+Durable outbox for Todoist writes
+
+Tasks to create are first written to a local SQLite outbox (WAL mode, under
+data_root/ledger) with a deterministic idempotency key, and the caller returns
+immediately. A background flusher drains due entries in batches, sending the
+key as ``X-Request-Id`` so Todoist discards replays, and retries transient
+failures with exponential backoff. The key is derived from the task's content
+within its source block, so re-enqueueing the same task after a crash maps
+onto the same row and the same key; a row interrupted mid-send is simply sent
+again under that key. A task without a source block gets a fresh key, since
+its wording alone does not identify it. Enqueueing makes no network calls: a
+task's target project is stored by name and resolved (with its "backlog"
+section) by the flusher just before sending. Successful writes are recorded
+in the extraction ledger, and the flusher purges old delivered rows.
+"""
+
+import json
+import time
+import uuid
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from engine.integrations.todoist_client import TodoistClient, TodoistTask, build_task_payload, resolve_project_id
+from engine.utils.extraction_ledger import task_hash
+
+# Namespace for idempotency keys (uuid5 of the task hash)
+OUTBOX_NAMESPACE = uuid.UUID("8f4d2c8e-6b1a-4f7e-9c3d-2a5b7e9f1c04")
+
+def idempotency_key(content: str, source_hash: Optional[str] = None) -> str:
+    """X-Request-Id for a task: stable for the same task in the same source block, else unique"""
+    if not source_hash:
+        return str(uuid.uuid4())
+    return str(uuid.uuid5(OUTBOX_NAMESPACE, task_hash(content, source_hash)))
+
+class TodoistOutbox:
+    """Write-ahead queue of Todoist task creations with a background flusher"""
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS outbox (
+            request_id TEXT PRIMARY KEY,
+            content TEXT NOT NULL,
+            source_hash TEXT,
+            project TEXT,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt REAL NOT NULL,
+            lease_until REAL NOT NULL DEFAULT 0,
+            todoist_id TEXT,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt)",
+    ]
+
+    def __init__(self, client: Optional[TodoistClient] = None, db_path: Optional[Path] = None,
+                 ledger=None, batch_size: int = 20, workers: int = 4, max_attempts: int = 8,
+                 base_delay: float = 2.0, max_delay: float = 3600.0, lease_seconds: float = 120.0,
+                 poll_interval: float = 5.0, done_retention_days: float = 30.0,
+                 purge_interval: float = 3600.0, project_cache_ttl: float = 300.0):
+        self.logger = logging.getLogger(__name__)
+        if db_path is None:
+            from engine.config import settings
+            db_path = settings.data_root / 'ledger' / 'todoist_outbox.db'
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.client = client or TodoistClient()
+        self.ledger = ledger
+        self.batch_size = batch_size
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.done_retention_days = done_retention_days
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+        self.project_cache_ttl = project_cache_ttl
+        # Project name -> ID map and backlog section per project ID, shared by the send threads
+        self._lookup_lock = threading.Lock()
+        self._projects: Optional[Dict[str, str]] = None
+        self._projects_at = 0.0
+        self._sections: Dict[str, Optional[str]] = {}
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        for statement in self.SCHEMA:
+            self._conn.execute(statement)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        if "project" not in columns:
+            self._conn.execute("ALTER TABLE outbox ADD COLUMN project TEXT")
+
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    # ------------------------------------------------------------------
+    # Enqueue
+    # ------------------------------------------------------------------
+    def enqueue(self, task: TodoistTask, content: Optional[str] = None,
+                source_hash: Optional[str] = None, project: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Persist a task for creation and return immediately
+
+        ``content``/``source_hash`` identify the originating extracted task
+        (defaulting to the Todoist content); enqueueing the same task from the
+        same source twice returns the existing entry. Without a source hash
+        every call queues a new entry. ``project`` is a project name resolved
+        at send time, filing the task in that project's "backlog" section.
+        """
+        content = content or task.content
+        request_id = idempotency_key(content, source_hash)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (request_id, content, source_hash, project, payload, status, "
+                "next_attempt, created_at, updated_at) VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?)",
+                (request_id, content, source_hash, project, json.dumps(build_task_payload(task)), now, now, now)
+            )
+            row = self._conn.execute("SELECT status, todoist_id FROM outbox WHERE request_id = ?",
+                                     (request_id,)).fetchone()
+        self._wake.set()
+        result = {"success": row[0] != 'failed', "queued": row[0] == 'pending', "request_id": request_id,
+                  "content": task.content, "status": row[0]}
+        if row[1]:
+            result["task_id"] = row[1]
+        return result
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+    def _claim_batch(self) -> List[Dict[str, Any]]:
+        """Lease a batch of due entries so concurrent flushers do not send the same row at once"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT request_id, content, source_hash, project, payload, attempts FROM outbox "
+                    "WHERE status = 'pending' AND next_attempt <= ? AND lease_until <= ? "
+                    "ORDER BY next_attempt LIMIT ?",
+                    (now, now, self.batch_size)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE outbox SET lease_until = ? WHERE request_id = ?",
+                    [(now + self.lease_seconds, row[0]) for row in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [{"request_id": r[0], "content": r[1], "source_hash": r[2], "project": r[3],
+                 "payload": json.loads(r[4]), "attempts": r[5]} for r in rows]
+
+    def _project_map(self) -> Dict[str, str]:
+        """Project name -> ID, fetched at most once per project_cache_ttl; raises when Todoist fails"""
+        with self._lookup_lock:
+            if self._projects is None or time.monotonic() - self._projects_at >= self.project_cache_ttl:
+                projects = self.client._make_request('GET', 'projects')
+                self._projects = {project['name']: str(project['id']) for project in projects}
+                self._projects_at = time.monotonic()
+                self._sections.clear()
+            return self._projects
+
+    def _backlog_section(self, project_id: str) -> Optional[str]:
+        with self._lookup_lock:
+            if project_id in self._sections:
+                return self._sections[project_id]
+        sections = self.client._make_request('GET', f'sections?project_id={project_id}')
+        section_id = next((str(section['id']) for section in sections
+                           if section.get('name', '').lower() == 'backlog'), None)
+        if section_id is None:
+            self.logger.warning(f"No 'backlog' section found in project {project_id}")
+        with self._lookup_lock:
+            self._sections[project_id] = section_id
+        return section_id
+
+    def _resolve_target(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Payload with the entry's project and backlog section filled in"""
+        payload = dict(entry["payload"])
+        if entry["project"] and "project_id" not in payload:
+            project_id = resolve_project_id(entry["project"], self._project_map())
+            if project_id:
+                payload["project_id"] = project_id
+                section_id = self._backlog_section(project_id)
+                if section_id:
+                    payload["section_id"] = section_id
+        return payload
+
+    def _send(self, entry: Dict[str, Any]):
+        """POST one entry under its idempotency key and record the outcome"""
+        try:
+            payload = self._resolve_target(entry)
+            result = self.client._make_request('POST', 'tasks', payload,
+                                               extra_headers={"X-Request-Id": entry["request_id"]})
+        except Exception as e:
+            status_code = getattr(getattr(e, 'response', None), 'status_code', None)
+            # Client errors other than 408/429 will not succeed on retry
+            permanent = status_code is not None and 400 <= status_code < 500 and status_code not in (408, 429)
+            self._mark_failed(entry, str(e), permanent)
+            return
+
+        todoist_id = str(result.get('id', ''))
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'done', todoist_id = ?, lease_until = 0, updated_at = ? "
+                "WHERE request_id = ?", (todoist_id, time.time(), entry["request_id"])
+            )
+        if self.ledger is not None and todoist_id:
+            self.ledger.record_created(entry["content"], todoist_id, entry["source_hash"])
+        self.logger.info("Created task: %s (ID: %s)", entry["payload"].get("content"), todoist_id)
+
+    def _mark_failed(self, entry: Dict[str, Any], error: str, permanent: bool):
+        attempts = entry["attempts"] + 1
+        give_up = permanent or attempts >= self.max_attempts
+        delay = min(self.base_delay * (2 ** (attempts - 1)), self.max_delay)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt = ?, lease_until = 0, "
+                "last_error = ?, updated_at = ? WHERE request_id = ?",
+                ('failed' if give_up else 'pending', attempts, time.time() + delay, error, time.time(),
+                 entry["request_id"])
+            )
+        if give_up:
+            self.logger.error(f"Giving up on task '{entry['content']}' after {attempts} attempts: {error}")
+        else:
+            self.logger.warning(f"Todoist write failed (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+
+    def flush_once(self) -> int:
+        """Send one batch of due entries; returns how many were attempted"""
+        batch = self._claim_batch()
+        if not batch:
+            return 0
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="todoist-outbox")
+        list(self._pool.map(self._send, batch))
+        return len(batch)
+
+    def flush(self, timeout: Optional[float] = None) -> int:
+        """Send due entries until none are left (or the timeout passes)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        sent = 0
+        while deadline is None or time.monotonic() < deadline:
+            attempted = self.flush_once()
+            if not attempted:
+                break
+            sent += attempted
+        return sent
+
+    def _purge_if_due(self):
+        """Drop delivered rows past their retention, at most once per purge_interval"""
+        now = time.monotonic()
+        if self._last_purge and now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+        purged = self.purge_done(self.done_retention_days)
+        if purged:
+            self.logger.info("Purged %d delivered outbox entries", purged)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.clear()
+            try:
+                attempted = self.flush_once()
+                self._purge_if_due()
+            except Exception as e:
+                self.logger.error(f"Outbox flush failed: {e}")
+                attempted = 0
+            if not attempted:
+                self._wake.wait(self.poll_interval)
+
+    def start(self):
+        """Start the background flusher thread"""
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        self._stopping.clear()
+        self._flusher = threading.Thread(target=self._run, name="todoist-outbox-flusher", daemon=True)
+        self._flusher.start()
+
+    def stop(self, drain_timeout: float = 10.0):
+        """Stop the flusher, giving due entries up to ``drain_timeout`` seconds to go out"""
+        self._stopping.set()
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        if drain_timeout > 0:
+            try:
+                self.flush(timeout=drain_timeout)
+            except Exception as e:
+                self.logger.warning(f"Outbox drain failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Inspection
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def failed(self, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT request_id, content, attempts, last_error FROM outbox WHERE status = 'failed' "
+                "ORDER BY updated_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(zip(("request_id", "content", "attempts", "last_error"), row)) for row in rows]
+
+    def retry_failed(self) -> int:
+        """Put failed entries back in the queue"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt = ? WHERE status = 'failed'",
+                (time.time(),)
+            )
+        self._wake.set()
+        return cursor.rowcount
+
+    def purge_done(self, older_than_days: float = 30.0) -> int:
+        """Delete delivered entries last updated more than ``older_than_days`` ago"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM outbox WHERE status = 'done' AND updated_at < ?",
+                                        (time.time() - older_than_days * 86400,))
+        return cursor.rowcount
+
+    def close(self):
+        """Stop flushing (draining briefly) and close the database"""
+        self.stop()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        with self._lock:
+            self._conn.close()
+
+def get_todoist_outbox() -> Optional[TodoistOutbox]:
+    """Shared, running outbox from the engine registry, or None when todoist.outbox is disabled"""
+    from engine.config import settings
+    config = settings.get_section('todoist')
+    if not config.get('outbox', True):
+        return None
+    from engine.utils.registry import get_registry
+    registry = get_registry()
+
+    def create() -> TodoistOutbox:
+        ledger = None
+        if settings.get_section('ledger').get('enabled', True):
+            from engine.utils.extraction_ledger import ExtractionLedger
+            ledger = ExtractionLedger()
+            registry.add_close_hook(ledger.close)
+        outbox = TodoistOutbox(client=registry.get_todoist_client(), ledger=ledger,
+                               batch_size=int(config.get('outbox_batch_size', 20)),
+                               done_retention_days=float(config.get('outbox_retention_days', 30)))
+        outbox.start()
+        return outbox
+
+    return registry.get_client('todoist_outbox', create)
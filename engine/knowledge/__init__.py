@@ -0,0 +1 @@
+# Engine Knowledge Base
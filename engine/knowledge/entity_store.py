@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Knowledge-Base Entity Store
+
+Indexed view of the knowledge-base JSON files (configs/knowledge-base/*.json,
+either a list of entities or an object with an ``entities`` list). It keeps:
+
+- an exact index by entity name (case-insensitive)
+- an exact index by ``entityType``
+- an inverted index from observation tokens to entities, with term counts
+  for ranking
+
+An entity named in several files is merged, keeping each file's observations
+separately, so when one file changes only its contribution is removed and
+re-added. The store is saved as a marshal snapshot under
+data_root/cache/knowledge, stamped with the source files' mtimes and sizes;
+opening the store loads the snapshot (milliseconds) and then re-reads only
+the files that changed since.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import marshal
+import logging
+import threading
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Set, Iterable
+
+SNAPSHOT_VERSION = 1
+TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it', 'of', 'on',
+    'or', 'that', 'the', 'this', 'to', 'with',
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, without stopwords and single characters"""
+    return [t for t in TOKEN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+@dataclass
+class Entity:
+    """A knowledge-base entity merged across source files"""
+    name: str
+    entity_type: str
+    observations: List[str] = field(default_factory=list)
+    sources: List[str] = field(default_factory=list)
+
+class EntityStore:
+    """Name, type and observation-text indexes over the knowledge-base files"""
+
+    def __init__(self, source_dir: Optional[Path] = None, snapshot_path: Optional[Path] = None):
+        self.logger = logging.getLogger(__name__)
+        from engine.config import settings, REPO_ROOT
+        self.source_dir = Path(source_dir) if source_dir else REPO_ROOT / 'configs' / 'knowledge-base'
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else \
+            settings.data_root / 'cache' / 'knowledge' / 'entities.snapshot'
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        # key (lowercased name) -> [name, {source: [entityType, [observations]]}]
+        self._entities: Dict[str, list] = {}
+        # source file name -> [mtime_ns, size, [keys]]
+        self._sources: Dict[str, list] = {}
+        self._types: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def open(cls, source_dir: Optional[Path] = None, snapshot_path: Optional[Path] = None) -> 'EntityStore':
+        """Load the snapshot, merge in changed source files and save if anything changed"""
+        store = cls(source_dir, snapshot_path)
+        store.load_snapshot()
+        if any(store.refresh().values()):
+            store.save()
+        return store
+
+    # ------------------------------------------------------------------
+    # Indexing
+    # ------------------------------------------------------------------
+    def _entity_type(self, key: str) -> str:
+        parts = self._entities[key][1]
+        return parts[min(parts)][0]
+
+    def _index(self, key: str):
+        entry = self._entities[key]
+        self._types.setdefault(self._entity_type(key).lower(), set()).add(key)
+        counts: Dict[str, int] = {}
+        for token in tokenize(entry[0]):
+            counts[token] = counts.get(token, 0) + 1
+        for _, observations in entry[1].values():
+            for observation in observations:
+                for token in tokenize(observation):
+                    counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            self._postings.setdefault(token, {})[key] = count
+
+    def _unindex(self, key: str):
+        entry = self._entities[key]
+        type_key = self._entity_type(key).lower()
+        keys = self._types.get(type_key)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._types[type_key]
+        tokens = set(tokenize(entry[0]))
+        for _, observations in entry[1].values():
+            for observation in observations:
+                tokens.update(tokenize(observation))
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(key, None)
+                if not posting:
+                    del self._postings[token]
+
+    def _remove_source(self, source: str):
+        for key in self._sources.pop(source, [0, 0, []])[2]:
+            if key not in self._entities:
+                continue
+            self._unindex(key)
+            self._entities[key][1].pop(source, None)
+            if self._entities[key][1]:
+                self._index(key)
+            else:
+                del self._entities[key]
+
+    def _add_source(self, source: str, mtime_ns: int, size: int, entities: Iterable[Dict[str, Any]]):
+        keys: Dict[str, None] = {}
+        for raw in entities:
+            name = str(raw['name']).strip()
+            key = name.lower()
+            observations = [str(o) for o in raw.get('observations', [])]
+            if key in self._entities:
+                self._unindex(key)
+                parts = self._entities[key][1]
+                if source in parts:
+                    # Same name twice in one file: keep both sets of observations
+                    observations = parts[source][1] + observations
+            else:
+                self._entities[key] = [name, {}]
+            self._entities[key][1][source] = [str(raw.get('entityType', 'Unknown')), observations]
+            self._index(key)
+            keys[key] = None
+        self._sources[source] = [mtime_ns, size, list(keys)]
+
+    @staticmethod
+    def _read_entities(path: Path) -> List[Dict[str, Any]]:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get('entities', [])
+        if not isinstance(data, list):
+            raise ValueError(f"expected a list of entities, got {type(data).__name__}")
+        return [e for e in data if isinstance(e, dict) and e.get('name')]
+
+    def refresh(self) -> Dict[str, List[str]]:
+        """Merge source files added, changed or removed since the last refresh"""
+        changes = {"added": [], "updated": [], "removed": []}
+        files = {p.name: p for p in sorted(self.source_dir.glob('*.json'))}
+        with self._lock:
+            for source in [s for s in self._sources if s not in files]:
+                self._remove_source(source)
+                changes["removed"].append(source)
+            for source, path in files.items():
+                stat = path.stat()
+                known = self._sources.get(source)
+                if known is not None and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+                    continue
+                try:
+                    entities = self._read_entities(path)
+                except (OSError, ValueError) as e:
+                    self.logger.warning(f"Skipping knowledge-base file {path}: {e}")
+                    continue
+                self._remove_source(source)
+                self._add_source(source, stat.st_mtime_ns, stat.st_size, entities)
+                changes["updated" if known is not None else "added"].append(source)
+        if any(changes.values()):
+            self.logger.info("Entity store refreshed: %d added, %d updated, %d removed files",
+                             len(changes["added"]), len(changes["updated"]), len(changes["removed"]))
+        return changes
+
+    # ------------------------------------------------------------------
+    # Snapshot
+    # ------------------------------------------------------------------
+    def _snapshot_header(self) -> Dict[str, Any]:
+        return {"version": SNAPSHOT_VERSION, "python": sys.version_info[:2],
+                "source_dir": str(self.source_dir)}
+
+    def save(self):
+        """Write the snapshot atomically"""
+        with self._lock:
+            data = marshal.dumps((self._snapshot_header(), self._entities, self._sources,
+                                  self._types, self._postings))
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.snapshot_path.with_suffix('.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, self.snapshot_path)
+
+    def load_snapshot(self) -> bool:
+        """Load the snapshot if it exists and matches this store; returns whether it was used"""
+        if not self.snapshot_path.exists():
+            return False
+        started = time.perf_counter()
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                header, entities, sources, types, postings = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError) as e:
+            self.logger.warning(f"Ignoring unreadable entity snapshot {self.snapshot_path}: {e}")
+            return False
+        # marshal's format is tied to the Python version, so rebuild rather than trust a foreign one
+        if header != self._snapshot_header():
+            return False
+        with self._lock:
+            self._entities, self._sources, self._types, self._postings = entities, sources, types, postings
+        self.logger.debug("Loaded entity snapshot (%d entities) in %.1f ms",
+                          len(entities), (time.perf_counter() - started) * 1000)
+        return True
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def _to_entity(self, key: str) -> Entity:
+        name, parts = self._entities[key]
+        observations = []
+        seen = set()
+        for source in sorted(parts):
+            for observation in parts[source][1]:
+                if observation not in seen:
+                    seen.add(observation)
+                    observations.append(observation)
+        return Entity(name=name, entity_type=self._entity_type(key), observations=observations,
+                      sources=sorted(parts))
+
+    def get(self, name: str) -> Optional[Entity]:
+        """Entity by exact (case-insensitive) name"""
+        with self._lock:
+            key = name.strip().lower()
+            return self._to_entity(key) if key in self._entities else None
+
+    def by_type(self, entity_type: str) -> List[Entity]:
+        with self._lock:
+            return [self._to_entity(key) for key in sorted(self._types.get(entity_type.lower(), ()))]
+
+    def types(self) -> Dict[str, int]:
+        with self._lock:
+            return {self._entity_type(next(iter(keys))): len(keys) for keys in self._types.values()}
+
+    def search(self, query: str, entity_type: Optional[str] = None, match_all: bool = True,
+               limit: Optional[int] = 20) -> List[Entity]:
+        """
+        Entities whose name or observations contain the query tokens
+
+        Ranked by how often the tokens occur; with ``match_all`` an entity must
+        contain every token, otherwise any token is enough.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        with self._lock:
+            postings = [self._postings.get(token, {}) for token in tokens]
+            if match_all:
+                if not all(postings):
+                    return []
+                postings.sort(key=len)
+                candidates = set(postings[0])
+                for posting in postings[1:]:
+                    candidates &= posting.keys()
+            else:
+                candidates = set().union(*postings)
+            if entity_type is not None:
+                candidates &= self._types.get(entity_type.lower(), set())
+            ranked = sorted(candidates, key=lambda k: (-sum(p.get(k, 0) for p in postings), k))
+            if limit is not None:
+                ranked = ranked[:limit]
+            return [self._to_entity(key) for key in ranked]
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def __contains__(self, name: str) -> bool:
+        return name.strip().lower() in self._entities
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entities": len(self._entities), "sources": len(self._sources),
+                    "types": len(self._types), "tokens": len(self._postings)}
+
+def get_entity_store() -> EntityStore:
+    """Shared store from the engine registry, refreshed from the source files on first use"""
+    from engine.utils.registry import get_registry
+    return get_registry().get_client('entity_store', EntityStore.open)
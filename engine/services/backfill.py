@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Resumable Bulk Backfill
+
+Runs task extraction over a large archive of journal files. Reading,
+splitting and prompt building happen in a process pool; the resulting
+prompts feed a thread stage that makes the model calls, throttled by the
+shared provider rate limiter (plus an optional --rpm cap for this job).
+Progress is checkpointed per file under data_root/cache/backfill, so a
+killed run resumes where it stopped (and the extraction ledger makes any
+partially processed file free to redo).
+
+With --batch, chunks are instead submitted through the provider's offline
+batch API (about half price, results within 24h) in groups of --batch-size.
+Backfill is low-priority work for the budget governor: it moves to batch mode
+once spend passes budget.batch_at and is refused when the budget is exhausted.
+
+Usage:
+    python -m engine.services.backfill ~/journal --pattern "**/*.md"
+    python -m engine.services.backfill ~/journal --job journal-2019 --create --dry-run
+    python -m engine.services.backfill ~/journal --batch --batch-size 2000
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from engine.config import settings
+from engine.utils.logging_config import configure_logging
+from engine.utils.registry import get_registry
+
+DEFAULT_CHUNK_CHARS = 6000
+
+@dataclass
+class PreparedFile:
+    """A source file split into prompt-ready chunks"""
+    path: str
+    mtime_ns: int
+    # (text, user prompt); the prompt is None when the chunk holds only explicit tasks
+    chunks: List[Tuple[str, Optional[str]]] = field(default_factory=list)
+    skipped_blocks: int = 0
+    # Estimated prompt tokens before and after compression
+    original_tokens: int = 0
+    compressed_tokens: int = 0
+
+def prepare_file(path: str, chunk_chars: int = DEFAULT_CHUNK_CHARS,
+                 prefilter_threshold: Optional[float] = None,
+                 compression: Optional[Dict[str, Any]] = None) -> PreparedFile:
+    """
+    Read a file, group its paragraphs into chunks and build a prompt per chunk
+
+    Paragraphs scoring below ``prefilter_threshold`` for actionability are
+    dropped first, and each chunk's prompt text is compressed with the
+    ``compression`` settings when given. Runs in a worker process, so it only
+    uses module-level helpers.
+    """
+    from engine.agents.task_extractor import build_extraction_prompt
+    from engine.agents.actionability import score_paragraph
+    from engine.agents.explicit_tasks import split_explicit_tasks
+    from engine.agents.prompt_compression import PromptCompressor
+    from engine.services.vault_watcher import split_blocks
+
+    file_path = Path(path)
+    text = file_path.read_text(errors='replace')
+    prepared = PreparedFile(path=path, mtime_ns=file_path.stat().st_mtime_ns)
+    compressor = PromptCompressor(compression) if compression is not None else None
+
+    def chunk_prompt(chunk_text: str) -> Optional[str]:
+        # Explicit checkbox/TODO lines are parsed locally, not sent to the model
+        remainder = split_explicit_tasks(chunk_text)[1]
+        if remainder and compressor is not None:
+            result = compressor.compress(remainder)
+            prepared.original_tokens += result.original_tokens
+            prepared.compressed_tokens += result.compressed_tokens
+            remainder = result.text
+        return build_extraction_prompt(remainder, path) if remainder else None
+
+    current: List[str] = []
+    size = 0
+    for block in split_blocks(text):
+        if prefilter_threshold is not None and score_paragraph(block) < prefilter_threshold:
+            prepared.skipped_blocks += 1
+            continue
+        if current and size + len(block) > chunk_chars:
+            chunk_text = "\n\n".join(current)
+            prepared.chunks.append((chunk_text, chunk_prompt(chunk_text)))
+            current, size = [], 0
+        current.append(block)
+        size += len(block) + 2
+    if current:
+        chunk_text = "\n\n".join(current)
+        prepared.chunks.append((chunk_text, chunk_prompt(chunk_text)))
+    return prepared
+
+def _init_parse_worker(level: int):
+    """Parse pool initializer: give the worker its own console logging at the parent's level"""
+    configure_logging(level=logging.getLevelName(level), save_to_file=False)
+
+class BackfillCheckpoint:
+    """Per-job record of completed files, written atomically"""
+
+    def __init__(self, job_name: str):
+        self.path = settings.data_root / 'cache' / 'backfill' / f"{job_name}.json"
+        self.completed: Dict[str, Dict[str, Any]] = {}
+        self._last_save = 0.0
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                self.completed = json.load(f).get('completed', {})
+
+    def is_done(self, path: Path) -> bool:
+        entry = self.completed.get(str(path))
+        try:
+            return entry is not None and entry['mtime_ns'] == path.stat().st_mtime_ns
+        except OSError:
+            return False
+
+    def mark_done(self, path: str, mtime_ns: int, chunks: int, tasks: int):
+        self.completed[path] = {"mtime_ns": mtime_ns, "chunks": chunks, "tasks": tasks}
+
+    def save(self, force: bool = False):
+        if not force and time.monotonic() - self._last_save < 2.0:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.path.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump({"completed": self.completed, "updated_at": time.time()}, f)
+        os.replace(tmp_file, self.path)
+        self._last_save = time.monotonic()
+
+class RateGate:
+    """Spaces out model calls to at most ``per_minute`` starts per minute, across threads"""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class BackfillProgress:
+    """Live throughput and ETA line on stderr"""
+
+    def __init__(self, total_files: int, stream=sys.stderr):
+        self.total_files = total_files
+        self.stream = stream
+        self.files_done = 0
+        self.chunks_done = 0
+        self.chunks_cached = 0
+        self.chunks_failed = 0
+        self.chunks_seen = 0
+        self.paragraphs_skipped = 0
+        self.prompt_tokens_saved = 0
+        self.tasks = 0
+        self.started = time.monotonic()
+        self._last_render = 0.0
+        self._lock = threading.Lock()
+
+    def render(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_render < 1.0:
+            return
+        self._last_render = now
+        elapsed = max(now - self.started, 1e-6)
+        rate = self.chunks_done / elapsed
+        # Estimate remaining chunks from the average chunks per file seen so far
+        per_file = self.chunks_seen / self.files_done if self.files_done else 1.0
+        remaining = max(self.total_files * per_file - self.chunks_done, 0)
+        eta = remaining / rate if rate else float('inf')
+        eta_text = time.strftime('%H:%M:%S', time.gmtime(eta)) if eta != float('inf') else '--:--:--'
+        self.stream.write(
+            f"\r[backfill] files {self.files_done}/{self.total_files} | chunks {self.chunks_done} "
+            f"({self.chunks_cached} cached, {self.chunks_failed} failed) | tasks {self.tasks} | "
+            f"{rate:.2f} chunks/s | ETA {eta_text} "
+        )
+        self.stream.flush()
+
+class BackfillRunner:
+    """Coordinates the parse process pool and the rate-limited model call stage"""
+
+    def __init__(self, files: List[Path], job_name: str, agent=None, parse_workers: Optional[int] = None,
+                 io_workers: int = 4, requests_per_minute: float = 0.0, create: bool = False,
+                 dry_run: bool = False, chunk_chars: int = DEFAULT_CHUNK_CHARS):
+        self.logger = logging.getLogger(__name__)
+        if agent is None:
+            from engine.agents.task_extractor import TaskExtractorAgent
+            agent = get_registry().get_agent(TaskExtractorAgent)
+        self.agent = agent
+        self.checkpoint = BackfillCheckpoint(job_name)
+        self.files = [f for f in files if not self.checkpoint.is_done(f)]
+        self.skipped_files = len(files) - len(self.files)
+        self.parse_workers = parse_workers or os.cpu_count() or 2
+        self.io_workers = io_workers
+        self.rate_gate = RateGate(requests_per_minute)
+        self.create = create
+        self.dry_run = dry_run
+        self.chunk_chars = chunk_chars
+        prefilter = getattr(agent, 'prefilter', None)
+        self.prefilter_threshold = prefilter.threshold if prefilter is not None else None
+        compressor = getattr(agent, 'compressor', None)
+        self.compression = compressor.config if compressor is not None else None
+        self.progress = BackfillProgress(len(self.files))
+
+    def _parse_pool(self) -> ProcessPoolExecutor:
+        # Spawned rather than forked: a forked child would inherit the root queue
+        # handler without the listener thread that drains it, losing its logs
+        return ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_parse_worker,
+                                   initargs=(logging.getLogger().getEffectiveLevel(),))
+
+    def _extract_chunk(self, path: str, text: str, prompt: Optional[str]) -> int:
+        """Model call stage: the agent's block extraction, rate-limited only when it calls the model"""
+        called = []
+
+        def before_call():
+            called.append(True)
+            self.rate_gate.wait()
+
+        # Failed chunks raise ExtractionError and are retried on the next run rather than extracted offline
+        tasks = self.agent.extract_block(text, path, priority="low", prompt=prompt or "",
+                                         offline_fallback=False, before_call=before_call)
+        if self.create and tasks:
+            self.agent.create_todoist_tasks(tasks, dry_run=self.dry_run)
+        # Chunks with a prompt that never reached the model were served by the extraction ledger
+        with self.progress._lock:
+            self.progress.chunks_cached += int(prompt is not None and not called)
+        return len(tasks)
+
+    def run(self) -> Dict[str, Any]:
+        if self.skipped_files:
+            self.logger.info(f"Resuming: {self.skipped_files} files already completed")
+
+        pending_files: Dict[str, Dict[str, Any]] = {}
+        failed_files = set()
+        max_parsing = self.parse_workers * 2
+
+        with self._parse_pool() as parse_pool, \
+                ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="backfill-io") as io_pool:
+            queue_iter = iter(self.files)
+            parsing: Dict[Future, Path] = {}
+            calling: Dict[Future, str] = {}
+
+            def fill_parse_queue():
+                # Keep parsing bounded so prompts do not pile up ahead of the model stage
+                while len(parsing) < max_parsing and len(calling) < self.io_workers * 4:
+                    try:
+                        path = next(queue_iter)
+                    except StopIteration:
+                        return
+                    future = parse_pool.submit(prepare_file, str(path), self.chunk_chars,
+                                               self.prefilter_threshold, self.compression)
+                    parsing[future] = path
+
+            fill_parse_queue()
+            try:
+                while parsing or calling:
+                    done, _ = wait(list(parsing) + list(calling), timeout=1.0, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future in parsing:
+                            path = parsing.pop(future)
+                            try:
+                                prepared = future.result()
+                            except Exception as e:
+                                self.logger.error(f"Failed to read {path}: {e}")
+                                failed_files.add(str(path))
+                                continue
+                            self.progress.chunks_seen += len(prepared.chunks)
+                            self.progress.paragraphs_skipped += prepared.skipped_blocks
+                            self.progress.prompt_tokens_saved += prepared.original_tokens - prepared.compressed_tokens
+                            pending_files[prepared.path] = {"mtime_ns": prepared.mtime_ns,
+                                                            "remaining": len(prepared.chunks),
+                                                            "chunks": len(prepared.chunks), "tasks": 0}
+                            if not prepared.chunks:
+                                self._complete_file(prepared.path, pending_files, failed_files)
+                            for text, prompt in prepared.chunks:
+                                calling[io_pool.submit(self._extract_chunk, prepared.path, text, prompt)] = prepared.path
+                        else:
+                            path = calling.pop(future)
+                            try:
+                                pending_files[path]["tasks"] += future.result()
+                                self.progress.chunks_done += 1
+                            except Exception as e:
+                                self.logger.error(f"Extraction failed for a chunk of {path}: {e}")
+                                self.progress.chunks_failed += 1
+                                failed_files.add(path)
+                            pending_files[path]["remaining"] -= 1
+                            if pending_files[path]["remaining"] == 0:
+                                self._complete_file(path, pending_files, failed_files)
+                    fill_parse_queue()
+                    self.progress.render()
+            finally:
+                self.checkpoint.save(force=True)
+                self.progress.render(force=True)
+                self.progress.stream.write("\n")
+
+        elapsed = time.monotonic() - self.progress.started
+        return {
+            "files": self.progress.files_done,
+            "files_failed": len(failed_files),
+            "files_skipped": self.skipped_files,
+            "chunks": self.progress.chunks_done,
+            "chunks_cached": self.progress.chunks_cached,
+            "paragraphs_skipped": self.progress.paragraphs_skipped,
+            "prompt_tokens_saved": self.progress.prompt_tokens_saved,
+            "tasks": self.progress.tasks,
+            "elapsed_s": round(elapsed, 1)
+        }
+
+    def run_batch(self, batch_size: int = 1000, backend=None, poll_interval: float = 60.0) -> Dict[str, Any]:
+        """Parse in the process pool, then extract through the offline batch API in groups"""
+        with self._parse_pool() as parse_pool:
+            prepared_files = []
+            futures = [(p, parse_pool.submit(prepare_file, str(p), self.chunk_chars,
+                                             self.prefilter_threshold, self.compression))
+                       for p in self.files]
+            for path, future in futures:
+                try:
+                    prepared_files.append(future.result())
+                except Exception as e:
+                    self.logger.error(f"Failed to read {path}: {e}")
+
+        failed_files = set()
+        try:
+            group: List[PreparedFile] = []
+            group_chunks = 0
+            for prepared in prepared_files + [None]:
+                if prepared is not None:
+                    group.append(prepared)
+                    group_chunks += len(prepared.chunks)
+                    self.progress.chunks_seen += len(prepared.chunks)
+                    self.progress.paragraphs_skipped += prepared.skipped_blocks
+                    self.progress.prompt_tokens_saved += prepared.original_tokens - prepared.compressed_tokens
+                    if group_chunks < batch_size:
+                        continue
+                if not group:
+                    break
+
+                # Files are kept whole within a job so each can be checkpointed when it returns
+                items = [{"text": text, "source": p.path} for p in group for text, _ in p.chunks]
+                try:
+                    # Failed items come back as None, like failed chunks in run(), and are retried next run
+                    results = self.agent.extract_tasks_batch(items, backend=backend, poll_interval=poll_interval,
+                                                             priority="low", offline_fallback=False)
+                except Exception as e:
+                    self.logger.error(f"Batch of {len(items)} chunks failed: {e}")
+                    failed_files.update(p.path for p in group)
+                    results = None
+
+                offset = 0
+                for p in group:
+                    file_results = results[offset:offset + len(p.chunks)] if results else []
+                    offset += len(p.chunks)
+                    if results is None:
+                        continue
+                    failed_chunks = sum(1 for t in file_results if t is None)
+                    if failed_chunks:
+                        self.logger.error(f"{failed_chunks} of {len(p.chunks)} chunks of {p.path} failed; "
+                                          f"leaving it for the next run")
+                        self.progress.chunks_failed += failed_chunks
+                        failed_files.add(p.path)
+                        continue
+                    tasks = sum(len(t) for t in file_results)
+                    if self.create:
+                        for chunk_tasks in file_results:
+                            if chunk_tasks:
+                                self.agent.create_todoist_tasks(chunk_tasks, dry_run=self.dry_run)
+                    self.progress.chunks_done += len(p.chunks)
+                    self.progress.tasks += tasks
+                    self.progress.files_done += 1
+                    self.checkpoint.mark_done(p.path, p.mtime_ns, len(p.chunks), tasks)
+                self.checkpoint.save(force=True)
+                self.progress.render(force=True)
+                group, group_chunks = [], 0
+        finally:
+            self.checkpoint.save(force=True)
+            self.progress.stream.write("\n")
+
+        return {
+            "files": self.progress.files_done,
+            "files_failed": len(failed_files),
+            "files_skipped": self.skipped_files,
+            "chunks": self.progress.chunks_done,
+            "paragraphs_skipped": self.progress.paragraphs_skipped,
+            "prompt_tokens_saved": self.progress.prompt_tokens_saved,
+            "tasks": self.progress.tasks,
+            "elapsed_s": round(time.monotonic() - self.progress.started, 1)
+        }
+
+    def _complete_file(self, path: str, pending_files: Dict[str, Dict[str, Any]], failed_files: set):
+        entry = pending_files.pop(path)
+        self.progress.tasks += entry["tasks"]
+        if path in failed_files:
+            return
+        self.progress.files_done += 1
+        self.checkpoint.mark_done(path, entry["mtime_ns"], entry["chunks"], entry["tasks"])
+        self.checkpoint.save()
+
+def enumerate_sources(roots: List[Path], pattern: str) -> List[Path]:
+    """All files under the roots matching the glob pattern, in a stable order"""
+    files = set()
+    for root in roots:
+        root = root.expanduser().resolve()
+        if root.is_file():
+            files.add(root)
+        else:
+            files.update(p for p in root.glob(pattern) if p.is_file())
+    return sorted(files)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Backfill task extraction over a journal archive")
+    parser.add_argument("roots", nargs="+", type=Path, help="Files or directories to process")
+    parser.add_argument("--pattern", default="**/*.md", help="Glob pattern under each directory")
+    parser.add_argument("--job", default=None, help="Checkpoint name (default: derived from roots)")
+    parser.add_argument("--parse-workers", type=int, default=None, help="Processes for parsing (default: CPUs)")
+    parser.add_argument("--io-workers", type=int, default=4, help="Concurrent model calls")
+    parser.add_argument("--rpm", type=float, default=0.0,
+                        help="Extra cap on this job's model calls per minute (provider quotas are always enforced)")
+    parser.add_argument("--chunk-chars", type=int, default=DEFAULT_CHUNK_CHARS, help="Characters per prompt")
+    parser.add_argument("--create", action="store_true", help="Create extracted tasks in Todoist")
+    parser.add_argument("--dry-run", action="store_true", help="With --create, do not write to Todoist")
+    parser.add_argument("--batch", action="store_true", help="Use the provider's offline batch API")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Chunks per batch job")
+    parser.add_argument("--local-batch", action="store_true",
+                        help="With --batch, use the offline local stand-in instead of the provider")
+    args = parser.parse_args(argv)
+
+    configure_logging(level='WARNING')
+
+    files = enumerate_sources(args.roots, args.pattern)
+    job_name = args.job or "-".join(p.expanduser().resolve().name for p in args.roots)
+    runner = BackfillRunner(files, job_name, parse_workers=args.parse_workers, io_workers=args.io_workers,
+                            requests_per_minute=args.rpm, create=args.create, dry_run=args.dry_run,
+                            chunk_chars=args.chunk_chars)
+    try:
+        decision = runner.agent.budget_decision("low")
+        if decision is not None and decision.use_batch and not args.batch:
+            print(f"Budget at {decision.pressure:.0%}, switching to batch mode", file=sys.stderr)
+            args.batch = True
+        if args.batch:
+            backend = None
+            if args.local_batch:
+                from engine.integrations.batch_api import LocalBatchBackend, provider_for_model
+                backend = LocalBatchBackend(provider_for_model(runner.agent.primary_model()))
+            summary = runner.run_batch(args.batch_size, backend)
+        else:
+            summary = runner.run()
+    finally:
+        get_registry().close()
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["files_failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Resident Extraction Daemon
+
+Keeps warm TaskExtractorAgent instances in a long-running process and serves
+extract/create requests over a Unix domain socket, so each request skips the
+import, config, dependency and client setup of a fresh process.
+
+Protocol: one JSON object per line in each direction.
+    request:  {"id": 1, "op": "extract", "text": "...", "source": "...", "create": false,
+               "priority": "normal"}
+              {"id": 2, "op": "create", "tasks": [{...ExtractedTask fields...}], "dry_run": true,
+               "wait": false}
+              {"id": 3, "op": "ping" | "stats" | "shutdown"}
+              extract/create may name a "tenant" when tenancy is enabled
+    response: {"id": 1, "ok": true, "result": ...}
+              {"id": 1, "ok": false, "error": "...", "busy": true, "retry_after": 0.5}
+
+Requests are queued on a bounded queue served by a fixed worker pool; when the
+queue is full the daemon answers immediately with ``busy`` instead of piling
+up work. SIGTERM/SIGINT stop accepting connections, drain queued work and
+close the shared clients before exiting. Edits to settings.yaml are picked up
+while running: agents are rebuilt on their next request when the agents,
+memory or ledger sections change, keeping the warm shared clients.
+
+With ``tenancy.enabled``, requests carrying a ``tenant`` are run by a
+TenantHost (engine.services.tenancy) with that tenant's settings, credentials
+and agent, scheduled fairly between tenants instead of on the shared queue.
+
+Usage:
+    python -m engine.services.daemon --workers 4 --queue-size 64
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import socket
+import logging
+import argparse
+import threading
+import socketserver
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import asdict, fields
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from engine.config import settings
+from engine.utils.logging_config import configure_logging
+from engine.utils.registry import get_registry
+
+class DaemonRunningError(RuntimeError):
+    """Raised when another daemon is already listening on the socket"""
+
+def default_socket_path() -> Path:
+    """Default location of the daemon socket under data_root"""
+    return settings.data_root / 'run' / 'task_extractor.sock'
+
+class _Job:
+    """A queued request and the slot its worker fills in"""
+
+    __slots__ = ('request', 'response', 'done', 'cancelled')
+
+    def __init__(self, request: Dict[str, Any]):
+        self.request = request
+        self.response: Optional[Dict[str, Any]] = None
+        self.done = threading.Event()
+        # Set when the client stopped waiting; a worker that has not started it skips it
+        self.cancelled = False
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Reads newline-delimited JSON requests from one connection"""
+
+    def handle(self):
+        daemon = self.server.daemon_ref
+        for raw_line in self.rfile:
+            if not raw_line.strip():
+                continue
+            try:
+                request = json.loads(raw_line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as e:
+                self._send({"id": None, "ok": False, "error": f"Invalid request: {e}"})
+                continue
+            self._send(daemon.submit(request))
+
+    def _send(self, response: Dict[str, Any]):
+        self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+        self.wfile.flush()
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class ExtractionDaemon:
+    """Unix socket server hosting warm task extractor agents"""
+
+    INLINE_OPS = {'ping', 'stats', 'shutdown'}
+    QUEUED_OPS = {'extract', 'create'}
+    # Settings sections baked into an agent when it is constructed
+    AGENT_SECTIONS = {'agents', 'memory', 'ledger'}
+
+    def __init__(self, socket_path: Optional[Path] = None, workers: int = 4, queue_size: int = 64,
+                 agent_definition: Optional[Dict[str, Any]] = None, request_timeout: float = 300.0):
+        self.logger = logging.getLogger(__name__)
+        self.socket_path = Path(socket_path or default_socket_path())
+        self.workers = workers
+        self.agent_definition = agent_definition or {}
+        self.request_timeout = request_timeout
+
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue(maxsize=queue_size)
+        self._worker_threads = []
+        self._server: Optional[_UnixServer] = None
+        self._stopping = threading.Event()
+        self._stopped = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {"served": 0, "failed": 0, "rejected": 0, "cancelled": 0, "busy_ms": 0.0}
+        self._started_at = time.time()
+
+        from engine.services.tenancy import TenantHost
+        self.tenants = TenantHost.from_settings()
+
+    # ------------------------------------------------------------------
+    # Request handling
+    # ------------------------------------------------------------------
+    def _get_agent(self, agent_definition: Optional[Dict[str, Any]]):
+        from engine.agents.task_extractor import TaskExtractorAgent
+        return get_registry().get_agent(TaskExtractorAgent, agent_definition or self.agent_definition)
+
+    def submit(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer a request, queuing extract/create work on the worker pool"""
+        request_id = request.get('id')
+        op = request.get('op')
+
+        if op in self.INLINE_OPS:
+            return self._handle_inline(request_id, op)
+        if op not in self.QUEUED_OPS:
+            return {"id": request_id, "ok": False, "error": f"Unknown op: {op}"}
+        if self._stopping.is_set():
+            return {"id": request_id, "ok": False, "error": "Daemon is shutting down"}
+        if request.get('tenant') is not None:
+            return self._submit_tenant(request)
+
+        job = _Job(request)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["rejected"] += 1
+            return {"id": request_id, "ok": False, "busy": True, "retry_after": 0.5,
+                    "error": "Daemon queue is full"}
+
+        if not job.done.wait(self.request_timeout):
+            job.cancelled = True
+            return {"id": request_id, "ok": False, "error": "Request timed out"}
+        return job.response
+
+    def _submit_tenant(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a request for a tenant on the tenant host's fair scheduler"""
+        from engine.services.tenancy import TenantError, TenantBusyError
+        request_id = request.get('id')
+        if self.tenants is None:
+            return {"id": request_id, "ok": False, "error": "Tenancy is not enabled"}
+        try:
+            future = self.tenants.submit(str(request['tenant']), lambda tenant: self._execute(
+                request, tenant.get_agent(request.get('agent_definition'))))
+        except TenantBusyError as e:
+            return {"id": request_id, "ok": False, "busy": True, "retry_after": 0.5, "error": str(e)}
+        except TenantError as e:
+            return {"id": request_id, "ok": False, "error": str(e)}
+        try:
+            return {"id": request_id, "ok": True, "result": future.result(self.request_timeout)}
+        except FutureTimeoutError:
+            # A job that has not started yet is skipped by the tenant workers
+            future.cancel()
+            return {"id": request_id, "ok": False, "error": "Request timed out"}
+        except Exception as e:
+            return {"id": request_id, "ok": False, "error": str(e)}
+
+    def _handle_inline(self, request_id: Any, op: str) -> Dict[str, Any]:
+        if op == 'ping':
+            return {"id": request_id, "ok": True, "result": "pong"}
+        if op == 'stats':
+            with self._stats_lock:
+                stats = dict(self._stats)
+            stats.update(queued=self._queue.qsize(), workers=self.workers,
+                         uptime_s=round(time.time() - self._started_at, 1))
+            # Report only what already exists: stats must not build an agent or
+            # start the outbox flusher, and must keep working during shutdown
+            from engine.utils.budget_governor import get_budget_governor
+            governor = get_budget_governor(create=False)
+            if governor is not None:
+                stats["budget"] = governor.status()
+            from engine.agents.task_extractor import TaskExtractorAgent
+            registry = get_registry()
+            agent = registry.peek_agent(TaskExtractorAgent, self.agent_definition)
+            outbox = registry.peek_client('todoist_outbox')
+            if outbox is not None:
+                stats["outbox"] = outbox.stats()
+            prefilter = getattr(agent, 'prefilter', None)
+            if prefilter is not None:
+                stats["prefilter"] = dict(prefilter.stats)
+            compressor = getattr(agent, 'compressor', None)
+            if compressor is not None:
+                stats["compression"] = compressor.summary()
+            ai_client = registry.peek_client('ai')
+            if ai_client is not None:
+                stats["coalescing"] = ai_client.coalescing_stats
+            if self.tenants is not None:
+                stats["tenancy"] = self.tenants.stats()
+            return {"id": request_id, "ok": True, "result": stats}
+        threading.Thread(target=self.stop, name="daemon-shutdown", daemon=True).start()
+        return {"id": request_id, "ok": True, "result": "shutting down"}
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            if job.cancelled:
+                # The client already got a timeout; running it now would act on a request nobody awaits
+                with self._stats_lock:
+                    self._stats["cancelled"] += 1
+                job.done.set()
+                self._queue.task_done()
+                continue
+            started = time.perf_counter()
+            try:
+                result = self._execute(job.request)
+                job.response = {"id": job.request.get('id'), "ok": True, "result": result}
+                outcome = "served"
+            except Exception as e:
+                self.logger.error(f"Request {job.request.get('op')} failed: {e}")
+                job.response = {"id": job.request.get('id'), "ok": False, "error": str(e)}
+                outcome = "failed"
+            with self._stats_lock:
+                self._stats[outcome] += 1
+                self._stats["busy_ms"] += (time.perf_counter() - started) * 1000
+            job.done.set()
+            self._queue.task_done()
+
+    def _execute(self, request: Dict[str, Any], agent=None) -> Any:
+        from engine.agents.task_extractor import ExtractedTask
+
+        if agent is None:
+            agent = self._get_agent(request.get('agent_definition'))
+        dry_run = bool(request.get('dry_run', False))
+
+        if request['op'] == 'extract':
+            tasks = agent.extract_tasks_from_text_original(
+                text=request.get('text', ''),
+                source=request.get('source', 'daemon'),
+                priority=request.get('priority', 'normal')
+            )
+            result = {"tasks": [asdict(task) for task in tasks]}
+            if request.get('create'):
+                result["created"] = agent.create_todoist_tasks(tasks, dry_run=dry_run)
+            return result
+
+        task_fields = {f.name for f in fields(ExtractedTask)}
+        tasks = [ExtractedTask(**{k: v for k, v in task.items() if k in task_fields})
+                 for task in request.get('tasks', [])]
+        return {"created": agent.create_todoist_tasks(tasks, dry_run=dry_run, wait=bool(request.get('wait')))}
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def _on_settings_change(self, changed):
+        if changed & self.AGENT_SECTIONS:
+            retired = get_registry().retire_agents()
+            self.logger.info(f"Settings changed ({', '.join(sorted(changed))}), "
+                             f"rebuilding {retired} agent(s) on next use")
+
+    def _claim_socket_path(self):
+        """Remove a stale socket left by a dead daemon; refuse if a live one answers on it"""
+        if not self.socket_path.exists():
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.settimeout(1.0)
+            probe.connect(str(self.socket_path))
+        except ConnectionRefusedError:
+            self.logger.info(f"Removing stale socket {self.socket_path}")
+            self.socket_path.unlink()
+            return
+        except FileNotFoundError:
+            return
+        finally:
+            probe.close()
+        raise DaemonRunningError(f"Another daemon is already listening on {self.socket_path}")
+
+    def start(self):
+        """Warm up the default agent, start workers and bind the socket"""
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self._claim_socket_path()
+        self._get_agent(None)
+        settings.on_change(self._on_settings_change)
+        settings.start_watching()
+
+        if self.tenants is not None:
+            self.tenants.start()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"daemon-worker-{index}", daemon=True)
+            thread.start()
+            self._worker_threads.append(thread)
+
+        self._server = _UnixServer(str(self.socket_path), _RequestHandler)
+        self._server.daemon_ref = self
+        os.chmod(self.socket_path, 0o600)
+        self.logger.info(f"Extraction daemon listening on {self.socket_path} "
+                         f"({self.workers} workers, queue size {self._queue.maxsize})")
+
+    def serve_forever(self):
+        """Serve until stop() is called"""
+        self._server.serve_forever(poll_interval=0.5)
+
+    def stop(self):
+        """Stop accepting requests, drain queued work and release shared resources"""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        self.logger.info("Shutting down extraction daemon, draining queue")
+
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        for _ in self._worker_threads:
+            self._queue.put(None)
+        for thread in self._worker_threads:
+            thread.join()
+
+        # Answer anything that raced in behind the worker sentinels
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job.response = {"id": job.request.get('id'), "ok": False, "error": "Daemon is shutting down"}
+                job.done.set()
+
+        if self.tenants is not None:
+            self.tenants.stop()
+        settings.stop_watching()
+        settings.remove_listener(self._on_settings_change)
+        get_registry().close()
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        self.logger.info("Extraction daemon stopped")
+        self._stopped.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until stop() has finished"""
+        return self._stopped.wait(timeout)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the resident task extraction daemon")
+    parser.add_argument("--socket", type=Path, default=None, help="Unix socket path")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent extraction workers")
+    parser.add_argument("--queue-size", type=int, default=64, help="Pending requests before rejecting")
+    parser.add_argument("--agent-definition", type=Path, default=None, help="JSON agent definition file")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+
+    agent_definition = None
+    if args.agent_definition:
+        with open(args.agent_definition, 'r') as f:
+            agent_definition = json.load(f)
+
+    daemon = ExtractionDaemon(args.socket, args.workers, args.queue_size, agent_definition)
+    try:
+        daemon.start()
+    except DaemonRunningError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    def _handle_signal(signum, frame):
+        threading.Thread(target=daemon.stop, name="daemon-shutdown", daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+
+    daemon.serve_forever()
+    # serve_forever returns once shutdown starts; wait for the drain to finish
+    daemon.wait()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
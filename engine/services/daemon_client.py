@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Thin client for the resident extraction daemon
+
+Usage:
+    python -m engine.services.daemon_client ping
+    python -m engine.services.daemon_client extract --file today.md --create --dry-run
+    echo "call the dentist tomorrow" | python -m engine.services.daemon_client extract
+    python -m engine.services.daemon_client stats
+"""
+
+import sys
+import json
+import time
+import socket
+import argparse
+import itertools
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+class DaemonBusyError(RuntimeError):
+    """Raised when the daemon keeps rejecting a request because its queue is full"""
+
+class DaemonClient:
+    """Sends newline-delimited JSON requests to the extraction daemon"""
+
+    def __init__(self, socket_path: Optional[Path] = None, timeout: float = 300.0,
+                 busy_retries: int = 5):
+        if socket_path is None:
+            from engine.services.daemon import default_socket_path
+            socket_path = default_socket_path()
+        self.socket_path = Path(socket_path)
+        self.timeout = timeout
+        self.busy_retries = busy_retries
+        self._ids = itertools.count(1)
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+
+    def _connect(self):
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(self.timeout)
+            self._sock.connect(str(self.socket_path))
+            self._reader = self._sock.makefile('rb')
+
+    def close(self):
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+            self._sock = None
+            self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def request(self, op: str, **params) -> Dict[str, Any]:
+        """Send one request, backing off and retrying while the daemon reports busy"""
+        self._connect()
+        payload = dict(params, op=op, id=next(self._ids))
+
+        for attempt in range(self.busy_retries + 1):
+            self._sock.sendall(json.dumps(payload).encode('utf-8') + b"\n")
+            line = self._reader.readline()
+            if not line:
+                self.close()
+                raise ConnectionError("Daemon closed the connection")
+            response = json.loads(line)
+            if not response.get('busy'):
+                return response
+            time.sleep(response.get('retry_after', 0.5) * (2 ** attempt))
+
+        raise DaemonBusyError(f"Daemon still busy after {self.busy_retries} retries")
+
+    def extract(self, text: str, source: str = "cli", create: bool = False,
+                dry_run: bool = False) -> Dict[str, Any]:
+        return self.request('extract', text=text, source=source, create=create, dry_run=dry_run)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Talk to the resident extraction daemon")
+    parser.add_argument("--socket", type=Path, default=None, help="Unix socket path")
+    subparsers = parser.add_subparsers(dest="op", required=True)
+
+    extract_parser = subparsers.add_parser("extract", help="Extract tasks from text")
+    extract_parser.add_argument("--file", type=Path, help="Read text from a file (default: stdin)")
+    extract_parser.add_argument("--text", help="Text to extract from")
+    extract_parser.add_argument("--source", default=None, help="Source label")
+    extract_parser.add_argument("--create", action="store_true", help="Also create tasks in Todoist")
+    extract_parser.add_argument("--dry-run", action="store_true", help="Do not write to Todoist")
+
+    create_parser = subparsers.add_parser("create", help="Create tasks from a JSON list of extracted tasks")
+    create_parser.add_argument("tasks_file", type=Path, help="JSON file with a list of tasks")
+    create_parser.add_argument("--dry-run", action="store_true", help="Do not write to Todoist")
+
+    for op in ("ping", "stats", "shutdown"):
+        subparsers.add_parser(op)
+
+    args = parser.parse_args(argv)
+
+    with DaemonClient(args.socket) as client:
+        if args.op == "extract":
+            if args.text is not None:
+                text = args.text
+            elif args.file:
+                text = args.file.read_text()
+            else:
+                text = sys.stdin.read()
+            source = args.source or (str(args.file) if args.file else "cli")
+            response = client.extract(text, source, create=args.create, dry_run=args.dry_run)
+        elif args.op == "create":
+            tasks = json.loads(args.tasks_file.read_text())
+            response = client.request("create", tasks=tasks, dry_run=args.dry_run)
+        else:
+            response = client.request(args.op)
+
+    print(json.dumps(response.get('result') if response.get('ok') else response, indent=2))
+    return 0 if response.get('ok') else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Multi-Tenant Extraction Host
+
+Serves many users from one process. Each tenant is a directory under
+``tenancy.root`` (default data_root/tenants) holding a tenant.yaml:
+
+    credentials:
+      todoist_api_token: "..."
+      openai_api_key: "..."        # optional: without AI keys the host's keys are used
+      anthropic_api_key: "..."
+    settings:                      # merged over the host settings
+      budget: {daily_limit: 1.0}
+    agent: {...}                   # TaskExtractorAgent definition
+    weight: 1                      # share of worker time relative to other tenants
+
+``data_root`` defaults to <tenant dir>/data, so context files, ledgers,
+caches and memory are private to the tenant. Each tenant gets its own Config
+(the host settings file plus its overrides), its own EngineRegistry (agents,
+ledgers, outbox, budget governor) and clients built with its credentials.
+Work runs with the tenant's settings and registry active (``use_settings`` /
+``use_registry``), so agent code reads them through the usual ``settings``
+and ``get_registry()``.
+
+Shared by all tenants: one Todoist HTTPAdapter connection pool, one httpx
+client for the provider SDKs (when httpx is installed) and one rate limiter
+per distinct API key, so tenants on the same key draw from the same quota.
+
+Each tenant has its own queue. Workers take jobs from tenants in weighted
+round-robin order, running at most ``per_tenant_concurrency`` jobs of one
+tenant at a time, so a tenant with a large backlog cannot starve the others.
+At most ``max_active_tenants`` tenants stay loaded; idle ones, and ones whose
+settings or tenant.yaml changed, are closed and reloaded on their next job.
+"""
+
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+import contextvars
+import importlib.util
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable, List, Deque
+
+from engine.config import Config, current_settings, use_settings
+from engine.utils.registry import EngineRegistry, use_registry
+
+HTTPX_AVAILABLE = importlib.util.find_spec("httpx") is not None
+
+TENANT_ID = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]{0,127}")
+PROVIDERS = ('openai', 'anthropic')
+# Seconds between checks for idle or changed tenants
+SWEEP_INTERVAL = 5.0
+
+class TenantError(RuntimeError):
+    """Raised for unknown tenants and when the host cannot take a request"""
+
+class TenantBusyError(TenantError):
+    """Raised when a tenant already has ``max_queued_per_tenant`` requests waiting"""
+
+class _KeyedRateLimiter:
+    """RateLimiter interface that sends each provider to the limiter for the tenant's key"""
+
+    def __init__(self, limiters: Dict[str, Any]):
+        self._limiters = limiters
+
+    def acquire(self, provider: str, model: str, tokens: int = 0) -> float:
+        return self._limiters[provider].acquire(provider, model, tokens)
+
+    def record_usage(self, provider: str, model: str, estimated_tokens: int, actual_tokens: int):
+        self._limiters[provider].record_usage(provider, model, estimated_tokens, actual_tokens)
+
+    def penalize(self, provider: str, model: str, retry_after: Optional[float]):
+        self._limiters[provider].penalize(provider, model, retry_after)
+
+    def update_from_headers(self, provider: str, model: str, headers):
+        self._limiters[provider].update_from_headers(provider, model, headers)
+
+class SharedPools:
+    """HTTP connection pools and rate limiters shared by every tenant"""
+
+    def __init__(self, data_root: Path, rate_limits: Dict[str, Any], pool_size: int = 64):
+        self.logger = logging.getLogger(__name__)
+        self.state_dir = Path(data_root) / 'cache' / 'ratelimits'
+        self.rate_limits = rate_limits
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._adapter = None
+        self._http_client = None
+        self._limiters: Dict[str, Any] = {}
+
+    @property
+    def todoist_adapter(self):
+        """requests HTTPAdapter mounted into every tenant's Todoist session"""
+        if self._adapter is None:
+            with self._lock:
+                if self._adapter is None:
+                    import requests
+                    self._adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_size,
+                                                                  pool_maxsize=self.pool_size)
+        return self._adapter
+
+    @property
+    def http_client(self):
+        """httpx.Client for the provider SDKs, or None when httpx is not installed"""
+        if self._http_client is None and HTTPX_AVAILABLE:
+            with self._lock:
+                if self._http_client is None:
+                    import httpx
+                    self._http_client = httpx.Client(
+                        timeout=httpx.Timeout(600.0, connect=5.0),
+                        limits=httpx.Limits(max_connections=self.pool_size,
+                                            max_keepalive_connections=self.pool_size)
+                    )
+        return self._http_client
+
+    def _limiter(self, provider: str, api_key: Optional[str]):
+        from engine.utils.rate_limiter import RateLimiter
+        # The host's own key uses the default state dir, shared with get_rate_limiter() users
+        if not api_key or api_key == os.getenv(f'{provider.upper()}_API_KEY'):
+            name = ''
+        else:
+            name = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+        with self._lock:
+            if name not in self._limiters:
+                state_dir = self.state_dir / name if name else self.state_dir
+                self._limiters[name] = RateLimiter(state_dir=state_dir, limits=self.rate_limits)
+            return self._limiters[name]
+
+    def rate_limiter(self, api_keys: Optional[Dict[str, str]]):
+        """Limiter for a tenant's keys (False when rate limiting is disabled, as AIModelClient expects)"""
+        if not self.rate_limits.get('enabled', True):
+            return False
+        keys = api_keys or {}
+        return _KeyedRateLimiter({provider: self._limiter(provider, keys.get(provider))
+                                  for provider in PROVIDERS})
+
+    def close(self):
+        with self._lock:
+            if self._adapter is not None:
+                self._adapter.close()
+                self._adapter = None
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+
+class Tenant:
+    """One tenant's settings, credentials, registry and agent definition"""
+
+    def __init__(self, tenant_id: str, directory: Path, config: Config, credentials: Dict[str, str],
+                 agent_definition: Optional[Dict[str, Any]] = None, weight: int = 1):
+        self.tenant_id = tenant_id
+        self.directory = directory
+        self.config = config
+        self.credentials = credentials
+        self.agent_definition = agent_definition or {}
+        self.weight = max(1, weight)
+        self.registry = EngineRegistry()
+        self.stale = False
+        self._manifest_mtime = self._stat_manifest()
+        config.on_change(self._on_settings_change)
+
+    @classmethod
+    def load(cls, tenant_id: str, root: Path, settings_path: Optional[Path] = None,
+             reload_interval: float = 2.0) -> 'Tenant':
+        """Read <root>/<tenant_id>/tenant.yaml"""
+        if not TENANT_ID.fullmatch(tenant_id):
+            raise TenantError(f"Invalid tenant id: {tenant_id!r}")
+        directory = Path(root) / tenant_id
+        manifest = directory / 'tenant.yaml'
+        if not manifest.exists():
+            raise TenantError(f"Unknown tenant: {tenant_id}")
+        import yaml
+        try:
+            with open(manifest, 'r') as f:
+                data = yaml.safe_load(f) or {}
+        except (OSError, yaml.YAMLError) as e:
+            raise TenantError(f"Could not read {manifest}: {e}") from e
+
+        overrides = dict(data.get('settings') or {})
+        data_root = Path(overrides.get('data_root', 'data')).expanduser()
+        overrides['data_root'] = str(data_root if data_root.is_absolute() else directory / data_root)
+        config = Config(settings_path, reload_interval=reload_interval, overrides=overrides)
+        credentials = {key: str(value) for key, value in (data.get('credentials') or {}).items()
+                       if value is not None}
+        return cls(tenant_id, directory, config, credentials, data.get('agent'), int(data.get('weight', 1)))
+
+    def _stat_manifest(self) -> Optional[int]:
+        try:
+            return (self.directory / 'tenant.yaml').stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _on_settings_change(self, changed):
+        self.stale = True
+
+    def changed(self) -> bool:
+        """Whether settings or tenant.yaml changed since the tenant was loaded"""
+        return self.stale or self._stat_manifest() != self._manifest_mtime
+
+    @property
+    def api_keys(self) -> Optional[Dict[str, str]]:
+        """Provider keys from the tenant's credentials, or None to use the host's"""
+        keys = {provider: self.credentials[f'{provider}_api_key'] for provider in PROVIDERS
+                if self.credentials.get(f'{provider}_api_key')}
+        return keys or None
+
+    def attach(self, pools: SharedPools):
+        """Register the tenant's AI and Todoist clients, built on the shared pools"""
+        from engine.integrations.ai_models import AIModelClient
+        from engine.integrations.todoist_client import TodoistClient
+        api_keys = self.api_keys
+        self.registry.add_client('ai', AIModelClient(rate_limiter=pools.rate_limiter(api_keys),
+                                                     api_keys=api_keys, http_client=pools.http_client))
+        # Never fall back to the host's TODOIST_API_TOKEN: that is someone else's account
+        self.registry.add_client('todoist', TodoistClient(api_token=self.credentials.get('todoist_api_token', ''),
+                                                          adapter=pools.todoist_adapter))
+
+    @contextmanager
+    def activate(self):
+        """Make this tenant's settings and registry the ones engine code sees"""
+        with use_settings(self.config), use_registry(self.registry):
+            yield self
+
+    def get_agent(self, agent_definition: Optional[Dict[str, Any]] = None):
+        """The tenant's warm TaskExtractorAgent"""
+        from engine.agents.task_extractor import TaskExtractorAgent
+        with self.activate():
+            return self.registry.get_agent(TaskExtractorAgent, agent_definition or self.agent_definition)
+
+    def close(self):
+        with self.activate():
+            self.registry.close()
+        self.config.remove_listener(self._on_settings_change)
+
+class _TenantState:
+    """Scheduler bookkeeping for one loaded tenant"""
+
+    __slots__ = ('tenant', 'jobs', 'running', 'turn', 'queued', 'last_used', 'served', 'failed')
+
+    def __init__(self, tenant: Tenant):
+        self.tenant = tenant
+        self.jobs: Deque[tuple] = deque()
+        self.running = 0
+        self.turn = 0
+        self.queued = False
+        self.last_used = time.monotonic()
+        self.served = 0
+        self.failed = 0
+
+    @property
+    def idle(self) -> bool:
+        return not self.jobs and not self.running
+
+class TenantHost:
+    """Loads tenants on demand and runs their jobs on a shared, fairly scheduled worker pool"""
+
+    def __init__(self, root: Optional[Path] = None, workers: int = 16, per_tenant_concurrency: int = 2,
+                 max_queued_per_tenant: int = 100, max_active_tenants: int = 200,
+                 idle_seconds: float = 600.0, http_pool_size: int = 64):
+        self.logger = logging.getLogger(__name__)
+        host_settings = current_settings()
+        self.settings_path = host_settings.settings_path
+        self.reload_interval = host_settings.reload_interval
+        self.root = Path(root).expanduser() if root else host_settings.data_root / 'tenants'
+        self.workers = max(1, workers)
+        self.per_tenant_concurrency = max(1, per_tenant_concurrency)
+        self.max_queued_per_tenant = max_queued_per_tenant
+        self.max_active_tenants = max(1, max_active_tenants)
+        self.idle_seconds = idle_seconds
+        self.pools = SharedPools(host_settings.data_root, host_settings.get_section('rate_limits'),
+                                 pool_size=http_pool_size)
+
+        self._cond = threading.Condition()
+        self._states: Dict[str, _TenantState] = {}
+        # Tenants with queued jobs, in round-robin order
+        self._ready: Deque[_TenantState] = deque()
+        self._worker_threads: List[threading.Thread] = []
+        self._stopping = False
+        self._last_sweep = time.monotonic()
+        self._stats = {"served": 0, "failed": 0, "rejected": 0, "loaded": 0, "evicted": 0}
+
+    @classmethod
+    def from_settings(cls) -> Optional['TenantHost']:
+        """Host configured by the ``tenancy`` settings section, or None when it is disabled"""
+        config = current_settings().get_section('tenancy')
+        if not config.get('enabled', False):
+            return None
+        return cls(root=config.get('root'), workers=int(config.get('workers', 16)),
+                   per_tenant_concurrency=int(config.get('per_tenant_concurrency', 2)),
+                   max_queued_per_tenant=int(config.get('max_queued_per_tenant', 100)),
+                   max_active_tenants=int(config.get('max_active_tenants', 200)),
+                   idle_seconds=float(config.get('idle_seconds', 600)),
+                   http_pool_size=int(config.get('http_pool_size', 64)))
+
+    # ------------------------------------------------------------------
+    # Tenants
+    # ------------------------------------------------------------------
+    def _state(self, tenant_id: str) -> _TenantState:
+        """Loaded state for a tenant, reading its tenant.yaml outside the scheduler lock if needed"""
+        with self._cond:
+            state = self._states.get(tenant_id)
+        if state is not None:
+            return state
+        tenant = Tenant.load(tenant_id, self.root, self.settings_path, self.reload_interval)
+        tenant.attach(self.pools)
+        with self._cond:
+            state = self._states.get(tenant_id)
+            if state is not None:
+                # Another request loaded it first
+                self._close_tenants([tenant])
+                return state
+            state = self._states[tenant_id] = _TenantState(tenant)
+            self._stats["loaded"] += 1
+            self.logger.info("Loaded tenant %s (%d active)", tenant_id, len(self._states))
+            if len(self._states) > self.max_active_tenants:
+                idle = sorted((s for s in self._states.values() if s.idle and s is not state),
+                              key=lambda s: s.last_used)
+                self._evict(idle[:len(self._states) - self.max_active_tenants])
+            return state
+
+    def _evict(self, states: List[_TenantState]):
+        """Unload idle tenants; they are closed off the caller's thread (outboxes drain on close)"""
+        if not states:
+            return
+        for state in states:
+            del self._states[state.tenant.tenant_id]
+        self._stats["evicted"] += len(states)
+        threading.Thread(target=self._close_tenants, args=([s.tenant for s in states],),
+                         name="tenant-close", daemon=True).start()
+
+    def _close_tenants(self, tenants: List[Tenant]):
+        for tenant in tenants:
+            try:
+                tenant.close()
+                self.logger.debug("Closed tenant %s", tenant.tenant_id)
+            except Exception as e:
+                self.logger.warning(f"Failed to close tenant {tenant.tenant_id}: {e}")
+
+    def _sweep(self):
+        """Unload tenants that are idle too long or whose configuration changed; call with the condition held"""
+        now = time.monotonic()
+        if now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        self._evict([state for state in self._states.values()
+                     if state.idle and (now - state.last_used >= self.idle_seconds or state.tenant.changed())])
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+    def submit(self, tenant_id: str, fn: Callable[[Tenant], Any]) -> Future:
+        """Queue ``fn(tenant)`` to run with the tenant active; returns its Future"""
+        future: Future = Future()
+        while True:
+            if self._stopping:
+                raise TenantError("Tenant host is shutting down")
+            state = self._state(tenant_id)
+            with self._cond:
+                if self._stopping:
+                    raise TenantError("Tenant host is shutting down")
+                if self._states.get(tenant_id) is not state:
+                    continue  # evicted (and closing) between loading and queuing: load it again
+                if len(state.jobs) >= self.max_queued_per_tenant:
+                    self._stats["rejected"] += 1
+                    raise TenantBusyError(f"Tenant {tenant_id} has {len(state.jobs)} requests waiting")
+                state.jobs.append((fn, future))
+                state.last_used = time.monotonic()
+                if not state.queued:
+                    state.queued = True
+                    self._ready.append(state)
+                self._cond.notify()
+                return future
+
+    def _next_job(self) -> Optional[tuple]:
+        """Next (state, fn, future) in weighted round-robin order; call with the condition held"""
+        for _ in range(len(self._ready)):
+            state = self._ready[0]
+            if state.running >= self.per_tenant_concurrency:
+                self._ready.rotate(-1)
+                continue
+            fn, future = state.jobs.popleft()
+            state.running += 1
+            state.turn += 1
+            if not state.jobs:
+                self._ready.popleft()
+                state.queued = False
+                state.turn = 0
+            elif state.turn >= state.tenant.weight:
+                state.turn = 0
+                self._ready.rotate(-1)
+            return state, fn, future
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while True:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    if self._stopping and not self._ready:
+                        return
+                    self._cond.wait(1.0)
+                    self._sweep()
+            state, fn, future = job
+            outcome = None
+            if future.set_running_or_notify_cancel():
+                try:
+                    # A fresh context per job, so nothing set by one tenant's job leaks into the next
+                    future.set_result(contextvars.Context().run(self._run, state.tenant, fn))
+                    outcome = "served"
+                except Exception as e:
+                    self.logger.error(f"Tenant {state.tenant.tenant_id} job failed: {e}")
+                    future.set_exception(e)
+                    outcome = "failed"
+            with self._cond:
+                state.running -= 1
+                state.last_used = time.monotonic()
+                if outcome is not None:
+                    setattr(state, outcome, getattr(state, outcome) + 1)
+                    self._stats[outcome] += 1
+                self._cond.notify()
+
+    @staticmethod
+    def _run(tenant: Tenant, fn: Callable[[Tenant], Any]) -> Any:
+        with tenant.activate():
+            return fn(tenant)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"tenant-worker-{index}", daemon=True)
+            thread.start()
+            self._worker_threads.append(thread)
+        self.logger.info(f"Tenant host serving {self.root} ({self.workers} workers, "
+                         f"{self.per_tenant_concurrency} per tenant)")
+
+    def stop(self):
+        """Finish queued jobs, then close every tenant and the shared pools"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._worker_threads:
+            thread.join()
+        self._worker_threads = []
+        with self._cond:
+            tenants = [state.tenant for state in self._states.values()]
+            self._states.clear()
+        self._close_tenants(tenants)
+        self.pools.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(
+                active_tenants=len(self._states),
+                queued=sum(len(state.jobs) for state in self._states.values()),
+                running=sum(state.running for state in self._states.values()),
+                tenants={tenant_id: {"queued": len(state.jobs), "running": state.running,
+                                     "served": state.served, "failed": state.failed}
+                         for tenant_id, state in self._states.items()},
+            )
+        return stats
+
+    def __enter__(self) -> 'TenantHost':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
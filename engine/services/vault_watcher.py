@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Incremental Obsidian Vault Watcher
+
+Watches the vault's daily notes (inotify on Linux, mtime polling elsewhere),
+debounces edits, diffs each changed note at paragraph level and sends only
+new or modified paragraphs to TaskExtractorAgent. When a note is edited
+again while its previous extraction is still running, that work is
+cancelled and superseded, so latency and token usage scale with the size of
+the edit rather than the size of the note.
+
+Usage:
+    python -m engine.services.vault_watcher --dry-run
+    python -m engine.services.vault_watcher --polling --process-existing
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import errno
+import select
+import struct
+import hashlib
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from pathlib import Path
+from typing import Dict, List, Optional, Callable, Set, Tuple
+
+from engine.config import settings
+from engine.utils.logging_config import configure_logging
+from engine.utils.registry import get_registry
+
+PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+
+def split_blocks(text: str) -> List[str]:
+    """Split a note into non-empty paragraph blocks"""
+    return [block.strip() for block in PARAGRAPH_SPLIT.split(text) if block.strip()]
+
+def block_hash(block: str) -> str:
+    """Hash of a block with whitespace normalized, so reflowing text is not a change"""
+    normalized = " ".join(block.split())
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+# ----------------------------------------------------------------------
+# Change detection backends
+# ----------------------------------------------------------------------
+class PollingBackend:
+    """Detects changed markdown files by comparing mtimes on an interval"""
+
+    name = "polling"
+
+    def __init__(self, root: Path, on_change: Callable[[Path], None], interval: float = 5.0):
+        self.root = root
+        self.on_change = on_change
+        self.interval = interval
+        self._mtimes: Dict[Path, int] = {}
+
+    def _scan(self) -> Dict[Path, int]:
+        mtimes = {}
+        for path in self.root.rglob('*.md'):
+            try:
+                mtimes[path] = path.stat().st_mtime_ns
+            except OSError:
+                continue
+        return mtimes
+
+    def run(self, stop: threading.Event):
+        self._mtimes = self._scan()
+        while not stop.wait(self.interval):
+            current = self._scan()
+            for path, mtime in current.items():
+                if self._mtimes.get(path) != mtime:
+                    self.on_change(path)
+            self._mtimes = current
+
+class InotifyBackend:
+    """Linux inotify watcher over a directory tree, via libc through ctypes"""
+
+    name = "inotify"
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0x00000800
+    IN_CLOEXEC = 0x00080000
+    EVENT_HEADER = struct.Struct("iIII")
+    WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+
+    def __init__(self, root: Path, on_change: Callable[[Path], None]):
+        import ctypes
+        import ctypes.util
+
+        self.logger = logging.getLogger(__name__)
+        self.root = root
+        self.on_change = on_change
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches: Dict[int, Path] = {}
+        # The root itself must be watchable (otherwise the watcher falls back to polling)
+        self._add_watch(root)
+        self._add_tree(root)
+
+    @classmethod
+    def is_supported(cls) -> bool:
+        return sys.platform.startswith("linux")
+
+    def _add_watch(self, directory: Path):
+        import ctypes
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self._watches[wd] = directory
+
+    def _add_tree(self, directory: Path, report_notes: bool = False):
+        """
+        Watch a directory and everything below it
+
+        Directories that vanish before they are watched are skipped. With
+        ``report_notes`` (a folder created or moved into the vault), notes
+        already inside are reported, since no event will arrive for them.
+        """
+        if directory not in self._watches.values():
+            try:
+                self._add_watch(directory)
+            except OSError as e:
+                self.logger.debug("Not watching %s: %s", directory, e)
+                return
+        try:
+            children = list(directory.rglob('*'))
+        except OSError as e:
+            self.logger.debug("Could not scan %s: %s", directory, e)
+            return
+        for child in children:
+            if child.is_dir():
+                try:
+                    self._add_watch(child)
+                except OSError as e:
+                    self.logger.debug("Not watching %s: %s", child, e)
+            elif report_notes and child.suffix == '.md':
+                self.on_change(child)
+
+    def run(self, stop: threading.Event):
+        try:
+            while not stop.is_set():
+                readable, _, _ = select.select([self._fd], [], [], 0.5)
+                if not readable:
+                    continue
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except OSError as e:
+                    if e.errno == errno.EAGAIN:
+                        continue
+                    raise
+                self._dispatch(data)
+        finally:
+            os.close(self._fd)
+
+    def _dispatch(self, data: bytes):
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self._add_tree(path, report_notes=True)
+            elif path.suffix == '.md':
+                self.on_change(path)
+
+# ----------------------------------------------------------------------
+# Watcher
+# ----------------------------------------------------------------------
+class VaultWatcher:
+    """Debounced, paragraph-level incremental extraction over daily notes"""
+
+    def __init__(self, notes_dir: Optional[Path] = None, agent=None, dry_run: bool = False,
+                 debounce_seconds: Optional[float] = None, poll_interval: Optional[float] = None,
+                 force_polling: bool = False, process_existing: bool = False, max_workers: int = 2):
+        self.logger = logging.getLogger(__name__)
+        watcher_config = settings.get_section('watcher')
+
+        if notes_dir is None:
+            if settings.obsidian_vault is None:
+                raise ValueError("obsidian_vault is not configured in settings.yaml")
+            notes_dir = settings.obsidian_vault / watcher_config.get('daily_notes_dir', 'Daily Notes')
+        self.notes_dir = Path(notes_dir)
+        if not self.notes_dir.is_dir():
+            raise FileNotFoundError(f"Daily notes directory not found: {self.notes_dir}")
+
+        if agent is None:
+            from engine.agents.task_extractor import TaskExtractorAgent
+            agent = get_registry().get_agent(TaskExtractorAgent)
+        self.agent = agent
+        self.dry_run = dry_run
+        self.debounce_seconds = debounce_seconds if debounce_seconds is not None else watcher_config.get('debounce_seconds', 3.0)
+        self.poll_interval = poll_interval if poll_interval is not None else watcher_config.get('poll_interval', 5.0)
+        self.force_polling = force_polling
+        self.process_existing = process_existing
+
+        self.state_file = settings.data_root / 'cache' / 'vault_watcher' / 'state.json'
+        self._state: Dict[str, List[str]] = self._load_state()
+        self._state_lock = threading.Lock()
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vault-extract")
+        self._pending: Dict[Path, float] = {}
+        self._pending_lock = threading.Condition()
+        self._generations: Dict[Path, int] = {}
+        self._in_flight: Dict[Path, Future] = {}
+        self._stop = threading.Event()
+        self.stats = {"notes_processed": 0, "blocks_sent": 0, "blocks_unchanged": 0, "cancelled": 0}
+        self._stats_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+    def _load_state(self) -> Dict[str, List[str]]:
+        if self.state_file.exists():
+            try:
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Could not read watcher state, starting fresh: {e}")
+        return {}
+
+    def _save_state(self):
+        # A dry run tracks blocks for this session only, so a later real run still extracts them
+        if self.dry_run:
+            return
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.state_file.with_suffix('.tmp')
+        with self._state_lock:
+            with open(tmp_file, 'w') as f:
+                json.dump(self._state, f)
+        os.replace(tmp_file, self.state_file)
+
+    def _count(self, name: str, amount: int = 1):
+        # Updated from the debounce thread and the extraction pool
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def _note_key(self, path: Path) -> str:
+        return str(path.relative_to(self.notes_dir))
+
+    def _baseline_existing_notes(self):
+        """Record current blocks of notes never seen before, without extracting them"""
+        changed = False
+        for path in self.notes_dir.rglob('*.md'):
+            key = self._note_key(path)
+            if key in self._state:
+                continue
+            if self.process_existing:
+                self.schedule(path, delay=0)
+            else:
+                self._state[key] = [block_hash(b) for b in split_blocks(path.read_text(errors='replace'))]
+                changed = True
+        if changed:
+            self._save_state()
+
+    # ------------------------------------------------------------------
+    # Debounce and dispatch
+    # ------------------------------------------------------------------
+    def schedule(self, path: Path, delay: Optional[float] = None):
+        """Mark a note as changed; extraction starts once edits settle"""
+        with self._pending_lock:
+            self._pending[path] = time.monotonic() + (self.debounce_seconds if delay is None else delay)
+            self._pending_lock.notify()
+
+    def _debounce_loop(self):
+        while not self._stop.is_set():
+            with self._pending_lock:
+                now = time.monotonic()
+                due = [path for path, deadline in self._pending.items() if deadline <= now]
+                for path in due:
+                    del self._pending[path]
+                if not due:
+                    next_deadline = min(self._pending.values(), default=now + 0.5)
+                    self._pending_lock.wait(max(0.05, min(0.5, next_deadline - now)))
+                    continue
+            for path in due:
+                self._dispatch(path)
+
+    def _dispatch(self, path: Path):
+        """Supersede any in-flight work for the note and submit the new diff"""
+        generation = self._generations.get(path, 0) + 1
+        self._generations[path] = generation
+
+        previous = self._in_flight.get(path)
+        if previous is not None and previous.cancel():
+            self._count("cancelled")
+            self.logger.debug("Cancelled queued extraction for %s", path.name)
+
+        self._in_flight[path] = self._executor.submit(self._process_note, path, generation)
+
+    def _is_current(self, path: Path, generation: int) -> bool:
+        return self._generations.get(path) == generation and not self._stop.is_set()
+
+    # ------------------------------------------------------------------
+    # Extraction
+    # ------------------------------------------------------------------
+    def diff_note(self, path: Path) -> Tuple[List[str], List[str]]:
+        """Return (all block hashes, blocks that are new or modified since last processed)"""
+        try:
+            blocks = split_blocks(path.read_text(errors='replace'))
+        except FileNotFoundError:
+            return [], []
+        hashes = [block_hash(block) for block in blocks]
+        with self._state_lock:
+            seen: Set[str] = set(self._state.get(self._note_key(path), []))
+        new_blocks = [block for block, digest in zip(blocks, hashes) if digest not in seen]
+        self._count("blocks_unchanged", len(blocks) - len(new_blocks))
+        return hashes, new_blocks
+
+    def _process_note(self, path: Path, generation: int):
+        try:
+            hashes, new_blocks = self.diff_note(path)
+            if not new_blocks:
+                return
+
+            source = f"obsidian:{self._note_key(path)}"
+            self.logger.info("Extracting %d changed block(s) from %s", len(new_blocks), source)
+            # No offline fallback: on failure the blocks stay unrecorded and are retried with the next edit
+            tasks = self.agent.extract_tasks_from_text_original("\n\n".join(new_blocks), source=source,
+                                                                offline_fallback=False)
+
+            # A newer edit arrived while the model was running; its diff covers these blocks
+            if not self._is_current(path, generation):
+                self._count("cancelled")
+                return
+
+            if tasks:
+                self.agent.create_todoist_tasks(tasks, dry_run=self.dry_run)
+
+            with self._state_lock:
+                self._state[self._note_key(path)] = hashes
+            self._save_state()
+            self._count("notes_processed")
+            self._count("blocks_sent", len(new_blocks))
+        except Exception as e:
+            self.logger.error(f"Failed to process {path}: {e}")
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def _create_backend(self):
+        if not self.force_polling and InotifyBackend.is_supported():
+            try:
+                return InotifyBackend(self.notes_dir, self.schedule)
+            except OSError as e:
+                self.logger.warning(f"inotify unavailable ({e}), falling back to polling")
+        return PollingBackend(self.notes_dir, self.schedule, self.poll_interval)
+
+    def run(self):
+        """Watch until stop() is called"""
+        backend = self._create_backend()
+        self.logger.info(f"Watching {self.notes_dir} ({backend.name}, debounce {self.debounce_seconds}s)")
+        self._baseline_existing_notes()
+
+        debouncer = threading.Thread(target=self._debounce_loop, name="vault-debounce", daemon=True)
+        debouncer.start()
+        try:
+            backend.run(self._stop)
+        finally:
+            self._stop.set()
+            with self._pending_lock:
+                self._pending_lock.notify()
+            debouncer.join()
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self.logger.info(f"Vault watcher stopped: {self.stats}")
+
+    def stop(self):
+        self._stop.set()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Incrementally extract tasks from edited daily notes")
+    parser.add_argument("--notes-dir", type=Path, default=None, help="Daily notes directory (default from settings)")
+    parser.add_argument("--dry-run", action="store_true", help="Do not write to Todoist")
+    parser.add_argument("--polling", action="store_true", help="Force the polling backend")
+    parser.add_argument("--process-existing", action="store_true",
+                        help="Extract from notes the watcher has never seen instead of baselining them")
+    parser.add_argument("--debounce", type=float, default=None, help="Seconds to wait after the last edit")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+
+    watcher = VaultWatcher(args.notes_dir, dry_run=args.dry_run, debounce_seconds=args.debounce,
+                           force_polling=args.polling, process_existing=args.process_existing)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    finally:
+        get_registry().close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+import pytest
+
+from engine.config import Config, use_settings
+from engine.utils.registry import EngineRegistry, use_registry
+
+@pytest.fixture
+def engine_settings(tmp_path):
+    """Settings with data_root in a temporary directory, active for the test"""
+    config = Config(reload_interval=0, overrides={'data_root': str(tmp_path / 'data')})
+    with use_settings(config):
+        yield config
+
+@pytest.fixture
+def engine_registry(engine_settings):
+    """A registry of its own for the test, closed afterwards"""
+    registry = EngineRegistry()
+    with use_registry(registry):
+        yield registry
+    registry.close()
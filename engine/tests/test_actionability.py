@@ -0,0 +1,62 @@
+import pytest
+
+from engine.config import Config, use_settings
+from engine.agents.actionability import ActionabilityFilter, CALIBRATION_SAMPLES, score_paragraph
+
+# Tasks that follow a reflective sentence on the same line
+MID_LINE_TASKS = [
+    "I was thinking about the garden. Fix the fence.",
+    "Long day at work. Call the plumber about the leak.",
+    "The kids were loud at dinner. Book the vet for Saturday.",
+    "Not sure how I feel about the move; send the lease back to Tom.",
+    "TODO: fix the leaking kitchen tap",
+]
+
+# Short imperatives and noun-phrase tasks with no reflective context
+TERSE_TASKS = [
+    "Walk the dog",
+    "Need milk.",
+    "Groceries: milk, eggs.",
+    "Invoice for Acme is overdue, chase it.",
+    "Water the plants",
+    "Pay rent",
+]
+
+REFLECTIVE = [text for text, actionable in CALIBRATION_SAMPLES if not actionable]
+
+@pytest.fixture
+def prefilter():
+    return ActionabilityFilter(recall_target=0.95)
+
+@pytest.mark.parametrize("text", MID_LINE_TASKS)
+def test_imperative_sentences_mid_line_are_kept(prefilter, text):
+    assert prefilter.keep(text), f"{text!r} scored {score_paragraph(text):.3f} < {prefilter.threshold:.3f}"
+
+@pytest.mark.parametrize("text", TERSE_TASKS)
+def test_terse_tasks_are_kept(prefilter, text):
+    assert prefilter.keep(text), f"{text!r} scored {score_paragraph(text):.3f} < {prefilter.threshold:.3f}"
+
+def test_prefilter_is_opt_in(tmp_path):
+    path = tmp_path / "settings.yaml"
+    path.write_text(f"data_root: {tmp_path}\n")
+    with use_settings(Config(path, reload_interval=0)):
+        assert ActionabilityFilter.from_settings() is None
+    with use_settings(Config(path, reload_interval=0, overrides={'prefilter': {'enabled': True}})):
+        assert ActionabilityFilter.from_settings() is not None
+
+def test_recall_on_actionable_samples(prefilter):
+    actionable = [text for text, label in CALIBRATION_SAMPLES if label] + MID_LINE_TASKS + TERSE_TASKS
+    kept = sum(prefilter.keep(text) for text in actionable)
+    assert kept / len(actionable) >= prefilter.recall_target
+
+def test_most_reflective_writing_is_dropped(prefilter):
+    dropped = sum(not prefilter.keep(text) for text in REFLECTIVE)
+    assert dropped >= len(REFLECTIVE) - 1
+
+def test_filter_keeps_only_actionable_paragraphs(prefilter):
+    text = ("Feeling tired but happy after the long walk.\n\n"
+            "I was thinking about the garden. Fix the fence.\n\n"
+            "I noticed I was calmer after meditating.")
+    result = prefilter.filter(text)
+    assert result.text == "I was thinking about the garden. Fix the fence."
+    assert (result.kept, result.skipped) == (1, 2)
@@ -0,0 +1,66 @@
+from engine.agents.task_extractor import ExtractedTask
+from engine.services.backfill import BackfillRunner
+
+class BatchAgent:
+    """Batch extraction that fails every item from the sources in ``failing``"""
+
+    prefilter = None
+    compressor = None
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.created = []
+
+    def extract_tasks_batch(self, items, backend=None, poll_interval=30.0, priority="normal",
+                            offline_fallback=True):
+        assert not offline_fallback
+        return [None if item["source"] in self.failing else [ExtractedTask(content="Call the plumber")]
+                for item in items]
+
+    def create_todoist_tasks(self, tasks, dry_run=False):
+        self.created.extend(tasks)
+
+def test_batch_failures_are_not_checkpointed(engine_settings, tmp_path):
+    good, bad = tmp_path / "good.md", tmp_path / "bad.md"
+    good.write_text("Call the plumber about the boiler.")
+    bad.write_text("Call the plumber.\n\nBook the dentist.")
+    agent = BatchAgent(failing={str(bad)})
+
+    runner = BackfillRunner([good, bad], "test-job", agent=agent, parse_workers=1, create=True)
+    summary = runner.run_batch()
+
+    assert summary["files"] == 1
+    assert summary["files_failed"] == 1
+    assert set(runner.checkpoint.completed) == {str(good)}
+    assert len(agent.created) == 1
+
+    retry = BackfillRunner([good, bad], "test-job", agent=BatchAgent(), parse_workers=1)
+    assert retry.files == [bad]
+
+class BlockAgent(BatchAgent):
+    """Block extraction that answers from a 'ledger' for texts in ``cached``"""
+
+    def __init__(self, cached=()):
+        super().__init__()
+        self.cached = set(cached)
+        self.priorities = []
+
+    def extract_block(self, text, source="unknown", priority="normal", prompt=None, offline_fallback=True,
+                      before_call=None):
+        self.priorities.append(priority)
+        if text not in self.cached and prompt:
+            before_call()
+        return [ExtractedTask(content="Call the plumber")]
+
+def test_run_extracts_blocks_at_low_priority(engine_settings, tmp_path):
+    cached, fresh = tmp_path / "cached.md", tmp_path / "fresh.md"
+    cached.write_text("Call the plumber about the boiler.")
+    fresh.write_text("Book the dentist for Tuesday.")
+    agent = BlockAgent(cached={"Call the plumber about the boiler."})
+
+    runner = BackfillRunner([cached, fresh], "run-job", agent=agent, parse_workers=1)
+    summary = runner.run()
+
+    assert summary["files"] == 2 and summary["files_failed"] == 0
+    assert summary["chunks"] == 2 and summary["chunks_cached"] == 1
+    assert agent.priorities == ["low", "low"]
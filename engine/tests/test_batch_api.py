@@ -0,0 +1,57 @@
+import pytest
+
+from engine.integrations.batch_api import BatchJobRunner, BatchRequest, LocalBatchBackend
+
+class CountingBackend(LocalBatchBackend):
+    """Local backend that counts submissions and can report a job as failed"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.submitted = 0
+        self.fail = False
+
+    def submit(self, batch_file):
+        self.submitted += 1
+        return super().submit(batch_file)
+
+    def status(self, job_id):
+        return 'failed' if self.fail else super().status(job_id)
+
+def requests():
+    return [BatchRequest(f"item-{i}", "gpt-4o-mini", f"prompt {i}") for i in range(3)]
+
+def test_identical_input_resumes_the_submitted_job(engine_settings, tmp_path):
+    backend = CountingBackend(workdir=tmp_path / "local")
+    first = BatchJobRunner(backend, workdir=tmp_path / "batches").submit(requests())
+    # A new runner, as after the process was killed while polling
+    second = BatchJobRunner(backend, workdir=tmp_path / "batches").submit(requests())
+    assert first == second
+    assert backend.submitted == 1
+
+    responses = BatchJobRunner(backend, workdir=tmp_path / "batches", poll_interval=0).run(requests())
+    assert set(responses) == {"item-0", "item-1", "item-2"}
+    assert backend.submitted == 1
+
+def test_failed_job_is_submitted_again(engine_settings, tmp_path):
+    backend = CountingBackend(workdir=tmp_path / "local")
+    runner = BatchJobRunner(backend, workdir=tmp_path / "batches", poll_interval=0)
+    backend.fail = True
+    with pytest.raises(RuntimeError):
+        runner.run(requests())
+    backend.fail = False
+    runner.run(requests())
+    assert backend.submitted == 2
+
+def test_resumed_results_are_paid_for_once(engine_settings, tmp_path):
+    from engine.utils.spend_ledger import SpendLedger
+    ledger = SpendLedger(tmp_path / "spend.db")
+    backend = CountingBackend(workdir=tmp_path / "local", responder=lambda request: "[]" * 100)
+    try:
+        for _ in range(2):
+            runner = BatchJobRunner(backend, workdir=tmp_path / "batches", poll_interval=0)
+            runner.cost_client._spend_ledger = ledger
+            assert len(runner.run(requests())) == 3
+        assert backend.submitted == 1
+        assert ledger.breakdown(0)["gpt-4o-mini (batch)"]["calls"] == 3
+    finally:
+        ledger.close()
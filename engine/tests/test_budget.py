@@ -0,0 +1,42 @@
+import pytest
+
+from engine.agents.task_extractor import TaskExtractorAgent
+from engine.utils import budget_governor
+from engine.utils.budget_governor import BudgetExceededError, BudgetGovernor
+from engine.utils.spend_ledger import SpendLedger
+
+class FakeAIClient:
+    def __init__(self):
+        self.calls = []
+
+    def call_model(self, model, prompt, system_prompt=None, max_tokens=None):
+        self.calls.append(model)
+        raise AssertionError("refused work must not reach the model")
+
+@pytest.fixture
+def exhausted(engine_settings, tmp_path, monkeypatch):
+    """A governor whose daily budget is spent; low-priority work is refused"""
+    ledger = SpendLedger(tmp_path / "spend.db")
+    ledger.record("openai", "gpt-4o", 1000, 2.0)
+    governor = BudgetGovernor(ledger, config={"daily_limit": 1.0, "reject_below": "normal"},
+                              cost_conscious_model="gpt-4o-mini")
+    monkeypatch.setattr(budget_governor, "get_budget_governor", lambda: governor)
+    yield governor
+    ledger.close()
+
+@pytest.fixture
+def agent():
+    # Only the budget/model plumbing is exercised, so skip agent setup
+    agent = object.__new__(TaskExtractorAgent)
+    agent.agent_def = {}
+    agent.ai_client = FakeAIClient()
+    return agent
+
+def test_sync_extraction_raises_when_budget_refuses(exhausted, agent):
+    with pytest.raises(BudgetExceededError):
+        agent._request_extraction("prompt", priority="low")
+    assert agent.ai_client.calls == []
+
+def test_batch_extraction_raises_when_budget_refuses(exhausted, agent):
+    with pytest.raises(BudgetExceededError):
+        agent.extract_tasks_batch([{"text": "Call mom"}], priority="low")
@@ -0,0 +1,90 @@
+import contextvars
+import os
+import threading
+
+import pytest
+
+from engine.config import Config, current_settings, settings, use_settings
+
+@pytest.fixture
+def settings_file(tmp_path):
+    path = tmp_path / "settings.yaml"
+    path.write_text(f"data_root: {tmp_path / 'data'}\nledger:\n  enabled: true\n")
+    return path
+
+def rewrite(path, text):
+    """Write new contents with a distinct mtime so the reload check sees the change"""
+    stat = path.stat()
+    path.write_text(text)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+def test_reload_reports_changed_sections(settings_file, tmp_path):
+    config = Config(settings_file, reload_interval=0)
+    changes = []
+    config.on_change(changes.append)
+    assert config.get_section('ledger') == {'enabled': True}
+
+    rewrite(settings_file, f"data_root: {tmp_path / 'data'}\nledger:\n  enabled: false\n")
+    assert config.reload() == {'ledger'}
+    assert changes == [{'ledger'}]
+    assert config.get_section('ledger') == {'enabled': False}
+    assert config.reload() == set()
+
+def test_broken_file_keeps_the_last_good_settings(settings_file, tmp_path, caplog):
+    config = Config(settings_file, reload_interval=0)
+    changes = []
+    config.on_change(changes.append)
+    assert config.data_root == (tmp_path / 'data').resolve()
+
+    rewrite(settings_file, "data_root: [unclosed\n")
+    assert config.reload() == set()
+    assert config.reload() == set()
+    assert config.data_root == (tmp_path / 'data').resolve()
+    assert config.get_section('ledger') == {'enabled': True}
+    assert changes == []
+    assert len([r for r in caplog.records if "keeping the previous settings" in r.message]) == 1
+
+    # Once the file is fixed it is picked up again
+    rewrite(settings_file, f"data_root: {tmp_path / 'data'}\nledger:\n  enabled: false\n")
+    assert config.reload() == {'ledger'}
+
+def test_broken_file_on_first_load_uses_defaults(settings_file, caplog):
+    settings_file.write_text("ledger: {enabled: \n")
+    config = Config(settings_file, reload_interval=0)
+    assert config.get_section('ledger') == {}
+    assert "using defaults" in caplog.text
+
+def test_env_overrides_take_the_type_of_the_value_they_replace(tmp_path, monkeypatch):
+    path = tmp_path / "settings.yaml"
+    path.write_text("budget:\n  enabled: true\n  daily_limit: 5.0\n  retries: 3\n  name: ops\n")
+    monkeypatch.setenv("ENGINE_BUDGET__ENABLED", "off")
+    monkeypatch.setenv("ENGINE_BUDGET__DAILY_LIMIT", "7")
+    monkeypatch.setenv("ENGINE_BUDGET__RETRIES", "4")
+    monkeypatch.setenv("ENGINE_BUDGET__NAME", "42")
+    monkeypatch.setenv("ENGINE_BUDGET__MODELS", "[a, b]")
+    budget = Config(path, reload_interval=0).get_section('budget')
+    assert budget == {'enabled': False, 'daily_limit': 7.0, 'retries': 4, 'name': '42', 'models': ['a', 'b']}
+    assert isinstance(budget['daily_limit'], float)
+
+def test_invalid_env_override_is_ignored(tmp_path, monkeypatch):
+    path = tmp_path / "settings.yaml"
+    path.write_text("budget:\n  enabled: true\n")
+    monkeypatch.setenv("ENGINE_BUDGET__ENABLED", "maybe")
+    assert Config(path, reload_interval=0).get_section('budget') == {'enabled': True}
+
+def test_use_settings_is_scoped_to_its_context(tmp_path):
+    outer = current_settings()
+    tenant = Config(reload_interval=0, overrides={'data_root': str(tmp_path / 'tenant')})
+    seen = {}
+    with use_settings(tenant):
+        assert settings.data_root == (tmp_path / 'tenant').resolve()
+        # Threads started here do not inherit it unless run in a copied context
+        thread = threading.Thread(target=lambda: seen.setdefault('thread', current_settings()))
+        thread.start()
+        thread.join()
+        context = contextvars.copy_context()
+        copied = threading.Thread(target=context.run, args=(lambda: seen.setdefault('copied', current_settings()),))
+        copied.start()
+        copied.join()
+    assert current_settings() is outer
+    assert seen == {'thread': outer, 'copied': tenant}
@@ -0,0 +1,66 @@
+import socket
+
+import pytest
+
+from engine.services.daemon import DaemonRunningError, ExtractionDaemon
+
+@pytest.fixture
+def daemon(engine_registry, tmp_path):
+    return ExtractionDaemon(socket_path=tmp_path / "daemon.sock", workers=1, request_timeout=0.05)
+
+def test_stats_builds_nothing(daemon, engine_registry):
+    response = daemon._handle_inline(1, 'stats')
+    assert response["ok"]
+    assert "outbox" not in response["result"]
+    assert engine_registry._agents == {}
+    assert engine_registry.peek_client('todoist_outbox') is None
+
+def test_stats_during_shutdown(daemon, engine_registry):
+    engine_registry.close()
+    assert daemon._handle_inline(1, 'stats')["ok"]
+
+def test_timed_out_requests_are_not_run_later(daemon, monkeypatch):
+    executed = []
+    monkeypatch.setattr(daemon, "_execute", lambda request: executed.append(request))
+    # No worker is running, so the request waits in the queue until it times out
+    response = daemon.submit({"id": 7, "op": "extract", "text": "Call mom"})
+    assert response == {"id": 7, "ok": False, "error": "Request timed out"}
+
+    daemon._queue.put(None)
+    daemon._worker()
+    assert executed == []
+    assert daemon._stats["cancelled"] == 1
+
+def test_refuses_to_take_a_live_daemons_socket(daemon):
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(daemon.socket_path))
+    listener.listen(1)
+    try:
+        with pytest.raises(DaemonRunningError):
+            daemon._claim_socket_path()
+        assert daemon.socket_path.exists()
+    finally:
+        listener.close()
+
+def test_removes_a_stale_socket(daemon):
+    # Bound but no longer listening, as after a crash
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(daemon.socket_path))
+    stale.close()
+    daemon._claim_socket_path()
+    assert not daemon.socket_path.exists()
+
+def test_timed_out_tenant_requests_are_not_run_later(daemon, monkeypatch, tmp_path):
+    from engine.services.tenancy import TenantHost
+    (tmp_path / "tenants" / "alice").mkdir(parents=True)
+    (tmp_path / "tenants" / "alice" / "tenant.yaml").write_text("weight: 1\n")
+    executed = []
+    monkeypatch.setattr(daemon, "_execute", lambda request, agent: executed.append(request))
+    daemon.tenants = TenantHost(root=tmp_path / "tenants", workers=1)
+    # The tenant workers are not running, so the request waits until it times out
+    response = daemon.submit({"id": 8, "op": "extract", "tenant": "alice", "text": "Call mom"})
+    assert response == {"id": 8, "ok": False, "error": "Request timed out"}
+
+    daemon.tenants.start()
+    daemon.tenants.stop()
+    assert executed == []
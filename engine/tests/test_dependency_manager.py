@@ -0,0 +1,20 @@
+import sys
+import threading
+
+from engine.utils.dependency_manager import DependencyManager, environment_fingerprint
+
+def test_fingerprint_ignores_non_site_path_entries(monkeypatch, tmp_path):
+    before = environment_fingerprint()
+    monkeypatch.setattr(sys, "path", [str(tmp_path)] + sys.path)
+    assert environment_fingerprint() == before
+
+def test_concurrent_cache_writes_do_not_collide(tmp_path):
+    managers = [DependencyManager(f"agent-{i}", cache_dir=tmp_path) for i in range(8)]
+    threads = [threading.Thread(target=manager.save_cached_results, args=("key", {"requests": True}))
+               for manager in managers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert managers[0].load_cached_results("key") is not None
+    assert [p.name for p in tmp_path.iterdir()] == ["dependencies.json"]
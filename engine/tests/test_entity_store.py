@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+from engine.knowledge.entity_store import EntityStore
+
+def write_source(path, entities, bump=0):
+    path.write_text(json.dumps(entities))
+    if bump:
+        # Make the change visible even when the file is rewritten within the mtime granularity
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump))
+
+@pytest.fixture
+def sources(tmp_path):
+    directory = tmp_path / "kb"
+    directory.mkdir()
+    write_source(directory / "people.json", [
+        {"name": "Alice", "entityType": "Person", "observations": ["Runs the garden club"]},
+    ])
+    write_source(directory / "projects.json", {"entities": [
+        {"name": "alice", "entityType": "Person", "observations": ["Owns the boiler project"]},
+        {"name": "Boiler", "entityType": "Project", "observations": ["Needs a new valve"]},
+    ]})
+    return directory
+
+def open_store(sources, tmp_path):
+    return EntityStore.open(sources, tmp_path / "entities.snapshot")
+
+def test_entities_merge_and_unmerge_across_files(sources, tmp_path):
+    store = open_store(sources, tmp_path)
+    alice = store.get("ALICE")
+    assert alice.sources == ["people.json", "projects.json"]
+    assert alice.observations == ["Runs the garden club", "Owns the boiler project"]
+    assert sorted(e.name for e in store.search("boiler")) == ["Alice", "Boiler"]
+
+    write_source(sources / "projects.json", [
+        {"name": "Boiler", "entityType": "Project", "observations": ["Fixed in March"]},
+    ], bump=1_000_000)
+    assert store.refresh() == {"added": [], "updated": ["projects.json"], "removed": []}
+    assert store.get("alice").observations == ["Runs the garden club"]
+    assert store.search("valve") == []
+    assert [e.name for e in store.search("march")] == ["Boiler"]
+
+    (sources / "people.json").unlink()
+    assert store.refresh()["removed"] == ["people.json"]
+    assert "alice" not in store
+    assert store.search("garden") == []
+    assert store.types() == {"Project": 1}
+
+def test_snapshot_round_trip(sources, tmp_path):
+    store = open_store(sources, tmp_path)
+    reopened = EntityStore(sources, tmp_path / "entities.snapshot")
+    assert reopened.load_snapshot()
+    assert reopened.refresh() == {"added": [], "updated": [], "removed": []}
+    assert reopened.stats() == store.stats()
+    assert reopened.get("alice") == store.get("alice")
+
+def test_foreign_snapshots_are_rebuilt(sources, tmp_path):
+    open_store(sources, tmp_path)
+    other = tmp_path / "other-kb"
+    other.mkdir()
+    write_source(other / "places.json", [{"name": "Harbour", "entityType": "Place"}])
+    # The snapshot was built from another directory, so its header does not match
+    store = EntityStore(other, tmp_path / "entities.snapshot")
+    assert not store.load_snapshot()
+    store = open_store(other, tmp_path)
+    assert "harbour" in store and "alice" not in store
+
+def test_malformed_files_are_skipped(sources, tmp_path, caplog):
+    (sources / "scalar.json").write_text("42")
+    (sources / "broken.json").write_text("{not json")
+    store = open_store(sources, tmp_path)
+    assert "alice" in store
+    assert store.stats()["sources"] == 2
+    assert "scalar.json" in caplog.text and "broken.json" in caplog.text
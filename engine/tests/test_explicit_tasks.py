@@ -0,0 +1,67 @@
+import logging
+
+import pytest
+
+from engine.agents.explicit_tasks import extract_offline, split_explicit_tasks
+from engine.agents.task_extractor import ExtractionError, TaskExtractorAgent
+from engine.integrations.ai_models import ModelResponse
+from engine.utils import budget_governor
+from engine.utils.extraction_ledger import ExtractionLedger
+
+def test_checkboxes_and_labelled_lines_are_tasks():
+    tasks, remainder = split_explicit_tasks(
+        "- [ ] Call the dentist tomorrow ⏫\n"
+        "- [x] Paid rent\n"
+        "TODO: renew passport 📅 2024-05-01\n"
+        "* Action item: send the minutes p2\n"
+        "Lovely weather today."
+    )
+    assert [(t.content, t.priority, t.due_date) for t in tasks] == [
+        ("Call the dentist tomorrow", "P1", "tomorrow"),
+        ("renew passport", "P3", "2024-05-01"),
+        ("send the minutes", "P2", None),
+    ]
+    assert remainder == "Lovely weather today."
+
+@pytest.mark.parametrize("line", [
+    "TODO list for the week looks long",
+    "Task management is hard",
+    "ACTION movies are fun",
+    "- TODO - check later",
+])
+def test_prose_is_not_a_task(line):
+    assert split_explicit_tasks(line) == ([], line)
+
+def test_offline_extraction_flags_guesses_for_confirmation():
+    tasks = extract_offline("TODO: book flights\nCall the plumber tomorrow\nWhat a day.")
+    assert [t.content for t in tasks] == ["book flights", "Call the plumber tomorrow"]
+    assert not tasks[0].requires_confirmation
+    assert tasks[1].requires_confirmation
+
+class FailingAIClient:
+    def call_model(self, model, prompt, system_prompt=None, max_tokens=None):
+        return ModelResponse(content="", tokens_used=0, cost=0.0, model=model, success=False, error="offline")
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    monkeypatch.setattr(budget_governor, "get_budget_governor", lambda: None)
+    agent = object.__new__(TaskExtractorAgent)
+    agent.agent_def = {}
+    agent.logger = logging.getLogger("test")
+    agent.context = {}
+    agent.memory_system = None
+    agent.compressor = None
+    agent.prefilter = None
+    agent.ai_client = FailingAIClient()
+    agent.ledger = ExtractionLedger(tmp_path / "extraction.db")
+    yield agent
+    agent.ledger.close()
+
+def test_model_failures_fall_back_to_offline_extraction(agent):
+    text = "Call the plumber tomorrow"
+    tasks = agent.extract_tasks_from_text_original(text, "note.md")
+    assert [t.content for t in tasks] == [text]
+    # Offline guesses are not recorded, so the text is extracted properly once the model is back
+    assert agent.ledger.lookup(text) is None
+    with pytest.raises(ExtractionError):
+        agent.extract_tasks_from_text_original(text, "note.md", offline_fallback=False)
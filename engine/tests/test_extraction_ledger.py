@@ -0,0 +1,27 @@
+import pytest
+
+from engine.utils.extraction_ledger import ExtractionLedger, content_hash
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = ExtractionLedger(tmp_path / "extraction.db")
+    yield ledger
+    ledger.close()
+
+def test_created_tasks_are_keyed_by_their_source(ledger):
+    monday = content_hash("Monday: call mom about the trip")
+    ledger.record_created("Call mom", "111", monday)
+    assert ledger.lookup_created("  call MOM ", monday) == "111"
+    # The same wording in next week's note is a new task
+    assert ledger.lookup_created("Call mom", content_hash("Next Monday: call mom again")) is None
+
+def test_tasks_without_a_source_are_never_deduplicated(ledger):
+    ledger.record_created("Call mom", "111", None)
+    assert ledger.lookup_created("Call mom", None) is None
+    assert ledger.stats()["created_tasks"] == 0
+
+def test_created_ids_for_a_block(ledger):
+    text = "Call mom. Water the plants."
+    ledger.record_created("Call mom", "1", content_hash(text))
+    ledger.record_created("Water the plants", "2", content_hash(text))
+    assert sorted(ledger.created_ids_for(text)) == ["1", "2"]
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from engine.integrations.local_memory import HashingEmbedder, LocalMemorySystem
+
+DIMENSION = 64
+TOPICS = ["boiler", "dentist", "passport", "garden", "invoice", "school", "car", "roof"]
+
+def notes(count, offset=0):
+    return [(f"Note {i}: {TOPICS[i % len(TOPICS)]} {TOPICS[(i * 3) % len(TOPICS)]} item {i}", {"n": i}, None)
+            for i in range(offset, offset + count)]
+
+def open_store(path, **kwargs):
+    kwargs.setdefault("ivf_threshold", 0)
+    return LocalMemorySystem(path, embedder=HashingEmbedder(DIMENSION), **kwargs)
+
+def test_files_stay_consistent_across_appends(tmp_path):
+    store = open_store(tmp_path)
+    store.add_memories(notes(5))
+    store.add_memory("Call the plumber about the boiler", {"source": "journal"})
+    assert len(store) == 6
+
+    assert (tmp_path / "embeddings.f32").stat().st_size == 6 * DIMENSION * 4
+    assert (tmp_path / "offsets.i64").stat().st_size == 6 * 8
+    lines = (tmp_path / "entries.jsonl").read_bytes().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == list(range(6))
+    assert json.loads((tmp_path / "meta.json").read_text())["count"] == 6
+
+    reopened = open_store(tmp_path)
+    entry = reopened.get_entry(5)
+    assert entry.content == "Call the plumber about the boiler"
+    assert entry.metadata == {"source": "journal"}
+    assert reopened.search_memories("Call the plumber about the boiler", limit=1)[0].entry.id == 5
+
+def test_uncommitted_appends_are_discarded(tmp_path):
+    store = open_store(tmp_path)
+    store.add_memories(notes(3))
+    sizes = {name: (tmp_path / name).stat().st_size for name in ("embeddings.f32", "offsets.i64", "entries.jsonl")}
+    # A crash after writing the data files but before meta.json was replaced
+    with open(tmp_path / "entries.jsonl", "ab") as f:
+        f.write(b'{"id": 3, "content": "half written')
+    with open(tmp_path / "embeddings.f32", "ab") as f:
+        f.write(b"\0" * (DIMENSION * 4 + 7))
+    with open(tmp_path / "offsets.i64", "ab") as f:
+        f.write(b"\0" * 8)
+
+    recovered = open_store(tmp_path)
+    assert len(recovered) == 3
+    assert {name: (tmp_path / name).stat().st_size for name in sizes} == sizes
+    entry = recovered.add_memory("Renew the passport")
+    assert entry.id == 3
+    assert recovered.get_entry(3).content == "Renew the passport"
+    assert recovered.get_entry(2).content == notes(3)[2][0]
+
+def test_ivf_search_matches_brute_force(tmp_path):
+    store = open_store(tmp_path / "ivf")
+    store.add_memories(notes(400))
+    queries = ["boiler dentist", "passport item 17", "garden roof", "invoice school item 200"]
+    expected = {query: [(r.entry.id, round(r.score, 5)) for r in store.search_memories(query, limit=5)]
+                for query in queries}
+
+    store.build_index(nlist=8)
+    store.nprobe = 8
+    # Probing every cluster scans every row, so the answers are the same
+    for query in queries:
+        assert [(r.entry.id, round(r.score, 5)) for r in store.search_memories(query, limit=5)] == expected[query]
+
+    store.nprobe = 1
+    for content, _, _ in notes(400)[::50]:
+        assert store.search_memories(content, limit=1)[0].entry.content == content
+    # Rows added after the index was built are still searched
+    late = store.add_memory("Replace the garage door opener")
+    assert store.search_memories("Replace the garage door opener", limit=1)[0].entry.id == late.id
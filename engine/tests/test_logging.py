@@ -0,0 +1,14 @@
+import logging
+
+from engine.agents.task_extractor import TaskExtractorAgent
+
+def test_building_an_agent_leaves_root_logging_alone(engine_registry):
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+
+    agent = engine_registry.get_agent(TaskExtractorAgent)
+
+    assert root.handlers == handlers
+    assert root.level == level
+    assert agent.logger.name.startswith("Agent-")
+    assert not (agent.data_root / "logs").exists()
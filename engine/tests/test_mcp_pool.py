@@ -0,0 +1,120 @@
+import asyncio
+import json
+import sys
+import textwrap
+import time
+
+import pytest
+
+from engine.integrations.mcp_pool import MCPSessionPool
+from engine.integrations.mcp_stdio import MCPError
+
+# Answers each tools/call on its own thread after the requested delay, so
+# replies can come back out of order
+SERVER = textwrap.dedent("""
+    import json, os, sys, threading, time
+    lock = threading.Lock()
+
+    def reply(message_id, result):
+        with lock:
+            sys.stdout.write(json.dumps({"jsonrpc": "2.0", "id": message_id, "result": result}) + "\\n")
+            sys.stdout.flush()
+
+    def call(message):
+        arguments = message["params"]["arguments"]
+        time.sleep(arguments.get("delay", 0))
+        reply(message["id"], {"content": [{"type": "text", "text": arguments.get("text", "")}],
+                              "pid": os.getpid()})
+
+    for line in sys.stdin:
+        message = json.loads(line)
+        if "id" not in message:
+            continue
+        if message["method"] == "initialize":
+            reply(message["id"], {"serverInfo": {"name": "fake"}, "capabilities": {}})
+        elif message["method"] == "tools/list":
+            reply(message["id"], {"tools": [{"name": "echo"}, {"name": "crash"}]})
+        elif message["params"]["name"] == "crash":
+            os._exit(1)
+        else:
+            # Noise the client must skip: a batch-shaped line and a notification
+            with lock:
+                sys.stdout.write("[1, 2]\\n")
+                sys.stdout.write(json.dumps({"jsonrpc": "2.0", "method": "notifications/progress"}) + "\\n")
+                sys.stdout.flush()
+            threading.Thread(target=call, args=(message,)).start()
+""")
+
+@pytest.fixture
+def pool_factory(tmp_path):
+    script = tmp_path / "fake_server.py"
+    script.write_text(SERVER)
+    config = tmp_path / "mcp.json"
+    config.write_text(json.dumps({"mcpServers": {"fake": {"command": sys.executable, "args": [str(script)]}}}))
+    pools = []
+
+    def create(**kwargs):
+        pool = MCPSessionPool(config_path=config, timeout=5, start_timeout=10, **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield create
+    for pool in pools:
+        pool.close()
+
+def text(result):
+    return result["content"][0]["text"]
+
+def test_concurrent_calls_share_one_session(pool_factory):
+    pool = pool_factory()
+
+    async def run():
+        started = time.monotonic()
+        results = await asyncio.gather(*(pool.acall_tool("fake", "echo", {"text": str(i), "delay": 0.4 - i * 0.1})
+                                         for i in range(4)))
+        return results, time.monotonic() - started
+
+    results, elapsed = asyncio.run(run())
+    # Replies arrive in reverse order but are matched to their callers
+    assert [text(r) for r in results] == ["0", "1", "2", "3"]
+    assert len({r["pid"] for r in results}) == 1
+    assert elapsed < 1.0
+    assert pool.stats()["fake"]["starts"] == 1
+
+def test_cancelled_call_does_not_break_the_session(pool_factory):
+    pool = pool_factory()
+    client = pool.session("fake")
+
+    async def run():
+        task = asyncio.ensure_future(pool.acall_tool("fake", "echo", {"text": "late", "delay": 0.2}))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.3)  # the late reply arrives after the cancel
+        return await pool.acall_tool("fake", "echo", {"text": "next"})
+
+    assert text(asyncio.run(run())) == "next"
+    assert client._pending == {}
+    assert client.running
+    assert pool.session("fake") is client
+
+def test_exited_server_is_restarted(pool_factory):
+    pool = pool_factory()
+    first = pool.call_tool("fake", "echo", {"text": "a"})["pid"]
+    with pytest.raises(MCPError):
+        pool.call_tool("fake", "crash")
+    second = pool.call_tool("fake", "echo", {"text": "b"})["pid"]
+    assert first != second
+    assert pool.stats()["fake"]["starts"] == 2
+
+def test_restart_budget(pool_factory):
+    pool = pool_factory(max_restarts=1, restart_window=60)
+    with pytest.raises(MCPError):
+        pool.call_tool("fake", "crash")
+    # The one restart allowed in the window
+    with pytest.raises(MCPError):
+        pool.call_tool("fake", "crash")
+    with pytest.raises(MCPError, match="not restarting yet"):
+        pool.session("fake")
+    assert pool.stats()["fake"]["starts"] == 2
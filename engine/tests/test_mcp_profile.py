@@ -0,0 +1,10 @@
+import pytest
+
+from engine.bench.mcp_profile import main
+
+@pytest.mark.parametrize("option", ["--iterations", "--calls"])
+def test_counts_must_be_positive(option, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main([option, "0"])
+    assert exit_info.value.code == 2
+    assert "must be at least 1" in capsys.readouterr().err
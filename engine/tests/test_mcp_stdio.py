@@ -0,0 +1,51 @@
+import sys
+import textwrap
+
+import pytest
+
+from engine.integrations.mcp_stdio import MCPError, MCPStdioClient
+
+SERVER = textwrap.dedent("""
+    import json, sys, time
+    mode = sys.argv[1]
+    for line in sys.stdin:
+        message = json.loads(line)
+        if "id" not in message:
+            continue
+        if message["method"] == "initialize":
+            if mode == "silent":
+                continue
+            result = {"serverInfo": {"name": "fake"}, "capabilities": {}}
+        elif message["method"] == "slow":
+            time.sleep(0.5)
+            result = {}
+        else:
+            result = {"blob": "x" * 1_000_000}
+        sys.stdout.write(json.dumps({"jsonrpc": "2.0", "id": message["id"], "result": result}) + "\\n")
+        sys.stdout.flush()
+""")
+
+@pytest.fixture
+def server_script(tmp_path):
+    path = tmp_path / "fake_server.py"
+    path.write_text(SERVER)
+    return str(path)
+
+def test_large_responses_are_read_whole(server_script):
+    with MCPStdioClient(sys.executable, [server_script, "ok"], timeout=10) as client:
+        assert len(client.request("big")["blob"]) == 1_000_000
+
+def test_failed_handshake_does_not_leak_the_process(server_script):
+    client = MCPStdioClient(sys.executable, [server_script, "silent"], timeout=0.3)
+    with pytest.raises(MCPError):
+        client.start()
+    assert client._process is None
+    assert not client.running
+
+def test_timed_out_requests_are_forgotten(server_script):
+    with MCPStdioClient(sys.executable, [server_script, "ok"], timeout=10) as client:
+        with pytest.raises(MCPError):
+            client.request("slow", timeout=0.05)
+        assert client._pending == {}
+        # The late answer is dropped and the connection keeps working
+        assert len(client.request("big")["blob"]) == 1_000_000
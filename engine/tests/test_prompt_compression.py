@@ -0,0 +1,42 @@
+from engine.agents.prompt_compression import PromptCompressor
+
+NOTE = """---
+tags: [daily]
+---
+Morning.
+
+> [!todo] Renew passport before June
+> - [ ] Call the dentist
+> Patience is a kind of courage.
+
+Review https://github.com/acme/api/pull/42 today.
+See [the plan](https://example.com/plan) and [[Projects/Garden|garden notes]].
+"""
+
+def test_tasks_survive_default_compression():
+    text = PromptCompressor().compress(NOTE).text
+    assert "Renew passport before June" in text
+    assert "Call the dentist" in text
+    assert "https://github.com/acme/api/pull/42" in text
+    assert "tags:" not in text
+
+def test_link_syntax_collapses_to_text():
+    text = PromptCompressor().compress(NOTE).text
+    assert "See the plan and garden notes." in text
+
+def test_drop_quotes_keeps_quoted_tasks():
+    text = PromptCompressor({'drop_quotes': True}).compress(NOTE).text
+    assert "Renew passport before June" in text
+    assert "Call the dentist" in text
+    assert "Patience" not in text
+
+def test_boilerplate_sections_are_dropped():
+    note = "## Gratitude\nThe sun.\n\n## Plan\nEmail Sam the contract.\n"
+    text = PromptCompressor().compress(note).text
+    assert "The sun" not in text
+    assert "Email Sam the contract." in text
+
+def test_repeated_headings_keep_their_content_in_place():
+    note = "## Tasks\nCall mom\n## Tasks\nWater the plants\n## Done\nPaid rent\n## Tasks\nBook flights\n"
+    text = PromptCompressor().compress(note).text
+    assert text == "## Tasks\nCall mom\nWater the plants\n## Done\nPaid rent\n## Tasks\nBook flights"
@@ -0,0 +1,126 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from engine.config import Config, use_settings
+from engine.integrations.ai_models import AIModelClient
+from engine.utils import rate_limiter as rate_limiter_module
+from engine.utils.rate_limiter import RateLimiter, get_rate_limiter, parse_reset
+
+LIMITS = {'openai': {'rpm': 60, 'tpm': 1000}}
+
+class FakeClock:
+    """time.time/time.sleep stand-in: sleeping just moves the clock"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+        self.slept = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.slept += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter_module, "time", clock)
+    return clock
+
+@pytest.fixture
+def limiter(tmp_path):
+    return RateLimiter(state_dir=tmp_path / "ratelimits", limits=LIMITS)
+
+def test_buckets_are_debited_and_refill(limiter, clock):
+    for _ in range(60):
+        assert limiter.acquire("openai", "gpt-4o", 10) == 0.0
+    # 60 requests per minute refill one per second
+    assert limiter.acquire("openai", "gpt-4o") == pytest.approx(1.0)
+
+    clock.now += 60
+    assert limiter.acquire("openai", "gpt-4o", 600) == 0.0
+    # 200 tokens short at 1000 tokens per minute
+    assert limiter.acquire("openai", "gpt-4o", 600) == pytest.approx(12.0)
+
+def test_usage_corrects_the_estimate(limiter, clock):
+    limiter.acquire("openai", "gpt-4o", 100)
+    limiter.record_usage("openai", "gpt-4o", 100, 1000)
+    assert limiter.acquire("openai", "gpt-4o", 100) == pytest.approx(6.0)
+
+def test_limits_are_tuned_from_headers(limiter, clock):
+    limiter.update_from_headers("openai", "gpt-4o", {
+        "X-RateLimit-Limit-Requests": "10", "X-RateLimit-Remaining-Requests": "0",
+    })
+    # The provider says no requests are left, refilling at 10 a minute
+    assert limiter.acquire("openai", "gpt-4o") == pytest.approx(6.0)
+
+    limiter.update_from_headers("anthropic", "claude", {"anthropic-ratelimit-tokens-remaining": "0"})
+    assert limiter.acquire("anthropic", "claude", 40000) == pytest.approx(60.0)
+
+def test_reset_values():
+    assert parse_reset("6m0s") == 360.0
+    assert parse_reset("20ms") == pytest.approx(0.02)
+    assert parse_reset("1.5") == 1.5
+    assert parse_reset("soon") is None
+
+class RateLimitedError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("rate limited")
+        self.response = type("Response", (), {"headers": {"retry-after": retry_after}})()
+
+class FakeResource:
+    """SDK resource whose first ``failures`` calls answer 429"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+        self.with_raw_response = self
+
+    def create(self, **request):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RateLimitedError("2")
+        return type("Raw", (), {"headers": {}, "parse": lambda raw: "done"})()
+
+def test_429_pauses_the_bucket_and_retries(limiter, clock):
+    client = AIModelClient(rate_limiter=limiter)
+    resource = FakeResource(failures=1)
+    assert client._rate_limited_call("openai", "gpt-4o", 10, resource, lambda response: 10) == "done"
+    assert resource.calls == 2
+    assert clock.slept == pytest.approx(2.0)
+
+    resource = FakeResource(failures=AIModelClient.RATE_LIMIT_RETRIES + 1)
+    with pytest.raises(RateLimitedError):
+        client._rate_limited_call("openai", "gpt-4o", 10, resource, lambda response: 10)
+
+def test_processes_share_one_quota(tmp_path):
+    state_dir = tmp_path / "ratelimits"
+    limits = {'openai': {'rpm': 5, 'tpm': 100000}}
+    script = textwrap.dedent(f"""
+        from engine.utils.rate_limiter import RateLimiter
+        limiter = RateLimiter(state_dir={str(state_dir)!r}, limits={limits!r})
+        for _ in range(5):
+            assert limiter.acquire("openai", "gpt-4o") == 0.0
+    """)
+    subprocess.run([sys.executable, "-c", script], check=True, cwd=Path(__file__).resolve().parents[2])
+    limiter = RateLimiter(state_dir=state_dir, limits=limits, max_wait=1.0)
+    # The other process used the whole minute's requests
+    with pytest.raises(TimeoutError):
+        limiter.acquire("openai", "gpt-4o")
+
+def test_default_limiter_follows_the_data_root(tmp_path):
+    first = Config(reload_interval=0, overrides={'data_root': str(tmp_path / 'first')})
+    second = Config(reload_interval=0, overrides={'data_root': str(tmp_path / 'second')})
+    with use_settings(first):
+        limiter = get_rate_limiter()
+        assert get_rate_limiter() is limiter
+    with use_settings(second):
+        assert get_rate_limiter().state_dir == second.data_root / 'cache' / 'ratelimits'
+        assert get_rate_limiter() is not limiter
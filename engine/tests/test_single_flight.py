@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from engine.utils.single_flight import SingleFlight
+
+class SlowCall:
+    """A call that blocks until released, counting how often it runs"""
+
+    def __init__(self, result="answer", error=None):
+        self.result = result
+        self.error = error
+        self.runs = 0
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.runs += 1
+        assert self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+def wait_for_callers(flight, count):
+    deadline = time.monotonic() + 5
+    while flight.stats["calls"] < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+def start_threads(flight, call, count, outcomes):
+    def caller():
+        try:
+            outcomes.append(flight.do("key", call))
+        except Exception as e:
+            outcomes.append(e)
+    threads = [threading.Thread(target=caller) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+def test_concurrent_sync_and_async_callers_share_one_call():
+    flight = SingleFlight()
+    call = SlowCall()
+    outcomes = []
+    threads = start_threads(flight, call, 3, outcomes)
+
+    async def callers():
+        tasks = [asyncio.ensure_future(flight.ado("key", call)) for _ in range(3)]
+        await asyncio.get_running_loop().run_in_executor(None, wait_for_callers, flight, 6)
+        call.release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(callers()) == ["answer"] * 3
+    for thread in threads:
+        thread.join(5)
+    assert outcomes == ["answer"] * 3
+    assert call.runs == 1
+    assert flight.stats == {"calls": 6, "coalesced": 5}
+
+def test_exceptions_reach_every_waiter():
+    flight = SingleFlight()
+    error = ValueError("provider down")
+    call = SlowCall(error=error)
+    outcomes = []
+    threads = start_threads(flight, call, 4, outcomes)
+    wait_for_callers(flight, 4)
+    call.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert outcomes == [error] * 4
+    assert call.runs == 1
+
+    async def async_caller():
+        return await flight.ado("key", call)
+    with pytest.raises(ValueError):
+        asyncio.run(async_caller())
+
+def test_nothing_is_kept_after_a_call_finishes():
+    flight = SingleFlight()
+    call = SlowCall()
+    call.release.set()
+    assert flight.do("key", call) == "answer"
+    assert flight.in_flight() == 0
+    assert flight.do("key", call) == "answer"
+    assert call.runs == 2
+    assert flight.stats["coalesced"] == 0
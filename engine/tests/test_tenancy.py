@@ -0,0 +1,83 @@
+import pytest
+
+from engine.config import settings
+from engine.services.tenancy import TenantBusyError, TenantHost
+from engine.utils.registry import get_registry
+
+def write_tenant(root, tenant_id, weight=1, token="", openai_key=None):
+    directory = root / tenant_id
+    directory.mkdir(parents=True)
+    lines = ["credentials:", f"  todoist_api_token: \"{token}\""]
+    if openai_key:
+        lines.append(f"  openai_api_key: \"{openai_key}\"")
+    lines.append(f"weight: {weight}")
+    (directory / "tenant.yaml").write_text("\n".join(lines) + "\n")
+
+@pytest.fixture
+def root(engine_settings, tmp_path):
+    return tmp_path / "tenants"
+
+def make_host(root, **kwargs):
+    kwargs.setdefault("workers", 1)
+    kwargs.setdefault("per_tenant_concurrency", 1)
+    return TenantHost(root=root, **kwargs)
+
+def test_jobs_are_shared_by_weight(root):
+    write_tenant(root, "heavy", weight=2)
+    write_tenant(root, "light")
+    host = make_host(root)
+    order = []
+    # Queue everything before the worker starts, so the schedule alone decides the order
+    futures = [host.submit(tenant_id, lambda tenant: order.append(tenant.tenant_id))
+               for tenant_id in ["heavy"] * 4 + ["light"] * 4]
+    with host:
+        for future in futures:
+            future.result(5)
+    assert order == ["heavy", "heavy", "light", "heavy", "heavy", "light", "light", "light"]
+
+def test_tenants_see_their_own_data_root_and_credentials(root, monkeypatch):
+    monkeypatch.setenv("TODOIST_API_TOKEN", "host-token")
+    write_tenant(root, "alice", token="alice-token", openai_key="sk-alice")
+    write_tenant(root, "bob", openai_key="sk-bob")
+    host = make_host(root)
+
+    def snapshot(tenant):
+        ai = get_registry().peek_client("ai")
+        return settings.data_root, get_registry().peek_client("todoist").api_token, ai.rate_limiter
+
+    with host:
+        alice = host.submit("alice", snapshot).result(5)
+        bob = host.submit("bob", snapshot).result(5)
+    assert alice[0] == (root / "alice" / "data").resolve()
+    assert bob[0] == (root / "bob" / "data").resolve()
+    assert alice[1] == "alice-token"
+    # A tenant without a token never falls back to the host's account
+    assert bob[1] is None
+    assert alice[2]._limiters["openai"] is not bob[2]._limiters["openai"]
+
+def test_tenants_with_queued_jobs_are_not_evicted(root):
+    for tenant_id in ("a", "b", "c"):
+        write_tenant(root, tenant_id)
+    host = make_host(root, max_active_tenants=1)
+    queued = host.submit("a", lambda tenant: tenant.tenant_id)
+    host.submit("b", lambda tenant: tenant.tenant_id)
+    assert set(host.stats()["tenants"]) == {"a", "b"}
+
+    with host:
+        assert queued.result(5) == "a"
+        # Once idle, the least recently used tenants make room for new ones
+        host.submit("c", lambda tenant: tenant.tenant_id).result(5)
+        assert host.stats()["active_tenants"] == 1
+        assert host.stats()["evicted"] == 2
+
+def test_full_queues_are_refused(root):
+    write_tenant(root, "alice")
+    host = make_host(root, max_queued_per_tenant=2)
+    try:
+        host.submit("alice", lambda tenant: None)
+        host.submit("alice", lambda tenant: None)
+        with pytest.raises(TenantBusyError):
+            host.submit("alice", lambda tenant: None)
+        assert host.stats()["rejected"] == 1
+    finally:
+        host.stop()
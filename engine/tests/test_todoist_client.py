@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import subprocess
+import sys
+from pathlib import Path
+
+from engine.agents import task_extractor
+from engine.agents.task_extractor import ExtractedTask, TaskExtractorAgent
+from engine.integrations.todoist_client import AsyncTodoistClient, TodoistClient
+
+def test_empty_token_does_not_fall_back_to_the_host(monkeypatch):
+    monkeypatch.setenv('TODOIST_API_TOKEN', 'host-token')
+    assert TodoistClient(api_token='').api_token is None
+    assert AsyncTodoistClient(max_concurrency=1, api_token='').api_token == ''
+    assert AsyncTodoistClient(max_concurrency=1).api_token == 'host-token'
+
+class FakeAsyncClient:
+    """Stands in for AsyncTodoistClient and remembers the token it was given"""
+    tokens = []
+
+    def __init__(self, api_token=None):
+        self.tokens.append(api_token)
+
+    async def get_projects(self):
+        return []
+
+    async def create_multiple_tasks(self, tasks, dry_run=False):
+        return [{"success": True, "content": task.content} for task in tasks]
+
+    async def aclose(self):
+        pass
+
+def test_async_creation_uses_the_agents_credentials(monkeypatch):
+    monkeypatch.setenv('TODOIST_API_TOKEN', 'host-token')
+    monkeypatch.setattr(task_extractor, 'AsyncTodoistClient', FakeAsyncClient)
+    # Only the Todoist plumbing is exercised, so skip agent setup
+    agent = object.__new__(TaskExtractorAgent)
+    agent.logger = logging.getLogger(__name__)
+    agent.ledger = None
+    agent.todoist_client = TodoistClient(api_token='tenant-token')
+
+    results = asyncio.run(agent.acreate_todoist_tasks([ExtractedTask(content="Call mom")], dry_run=True))
+    assert [r["content"] for r in results] == ["Call mom"]
+    assert FakeAsyncClient.tokens == ['tenant-token']
+
+    # A tenant without a token must not pick up the host's
+    agent.todoist_client = TodoistClient(api_token='')
+    asyncio.run(agent.acreate_todoist_tasks([ExtractedTask(content="Call mom")], dry_run=True))
+    assert FakeAsyncClient.tokens[-1] == ''
+
+def test_requests_carry_a_timeout():
+    class Response:
+        content = b'[]'
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return []
+
+    class Session:
+        def __init__(self):
+            self.kwargs = []
+
+        def get(self, url, **kwargs):
+            self.kwargs.append(kwargs)
+            return Response()
+
+        post = get
+
+    client = TodoistClient(api_token='token', timeout=(1.0, 2.0))
+    client._session = Session()
+    client._make_request('GET', 'projects')
+    client._make_request('POST', 'tasks', {"content": "Call mom"})
+    assert [kwargs["timeout"] for kwargs in client._session.kwargs] == [(1.0, 2.0), (1.0, 2.0)]
+
+def test_importing_the_sync_client_does_not_load_asyncio():
+    script = "import sys, engine.integrations.todoist_client; print('asyncio' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                            cwd=Path(__file__).resolve().parents[2])
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+from engine.integrations.todoist_client import TodoistTask
+from engine.integrations.todoist_outbox import TodoistOutbox, idempotency_key
+from engine.utils.extraction_ledger import content_hash
+
+class FakeClient:
+    """Records requests instead of calling Todoist"""
+
+    def __init__(self):
+        self.posts = []
+        self.gets = []
+
+    def _make_request(self, method, endpoint, data=None, extra_headers=None):
+        if method == 'GET':
+            self.gets.append(endpoint)
+            if endpoint == 'projects':
+                return [{"id": 10, "name": "Home"}, {"id": 20, "name": "Work Projects"}]
+            return [{"id": 11, "name": "Backlog"}] if endpoint.endswith("=10") else []
+        self.posts.append((data, extra_headers))
+        return {"id": str(len(self.posts))}
+
+@pytest.fixture
+def outbox(tmp_path):
+    outbox = TodoistOutbox(client=FakeClient(), db_path=tmp_path / "outbox.db")
+    yield outbox
+    outbox.close()
+
+def test_keys_are_scoped_to_the_source_block():
+    monday, tuesday = content_hash("monday note"), content_hash("tuesday note")
+    assert idempotency_key("Call mom", monday) == idempotency_key("call  mom", monday)
+    assert idempotency_key("Call mom", monday) != idempotency_key("Call mom", tuesday)
+    assert idempotency_key("Call mom") != idempotency_key("Call mom")
+
+def test_same_task_from_the_same_source_is_queued_once(outbox):
+    source = content_hash("monday note")
+    first = outbox.enqueue(TodoistTask(content="Call mom"), source_hash=source)
+    second = outbox.enqueue(TodoistTask(content="Call mom"), source_hash=source)
+    assert first["request_id"] == second["request_id"]
+    assert outbox.stats() == {"pending": 1}
+
+def test_same_wording_elsewhere_is_a_new_task(outbox):
+    outbox.enqueue(TodoistTask(content="Call mom"), source_hash=content_hash("monday note"))
+    outbox.enqueue(TodoistTask(content="Call mom"), source_hash=content_hash("next monday note"))
+    outbox.enqueue(TodoistTask(content="Call mom"))
+    outbox.enqueue(TodoistTask(content="Call mom"))
+    assert outbox.flush() == 4
+    assert len({headers["X-Request-Id"] for _, headers in outbox.client.posts}) == 4
+
+def test_flusher_purges_old_delivered_entries(outbox):
+    outbox.done_retention_days = 0
+    outbox.enqueue(TodoistTask(content="Call mom"), source_hash=content_hash("note"))
+    outbox.flush()
+    assert outbox.stats() == {"done": 1}
+    time.sleep(0.01)
+    outbox._purge_if_due()
+    assert outbox.stats() == {}
+
+def test_projects_are_resolved_by_the_flusher(outbox):
+    source = content_hash("note")
+    outbox.enqueue(TodoistTask(content="Fix the fence"), source_hash=source, project="Home")
+    outbox.enqueue(TodoistTask(content="Send the report"), source_hash=source, project="work")
+    outbox.enqueue(TodoistTask(content="Call mom"), source_hash=source)
+    # Queuing alone never talks to Todoist
+    assert outbox.client.gets == [] and outbox.client.posts == []
+
+    outbox.flush()
+    payloads = {data["content"]: data for data, _ in outbox.client.posts}
+    assert payloads["Fix the fence"]["project_id"] == "10"
+    assert payloads["Fix the fence"]["section_id"] == "11"
+    assert payloads["Send the report"]["project_id"] == "20"
+    assert "section_id" not in payloads["Send the report"]
+    assert "project_id" not in payloads["Call mom"]
+    # One project listing and one section lookup per project, however many tasks
+    assert sorted(outbox.client.gets) == ["projects", "sections?project_id=10", "sections?project_id=20"]
+
+def test_existing_databases_gain_the_project_column(tmp_path):
+    import sqlite3
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute(TodoistOutbox.SCHEMA[0].replace("project TEXT,", ""))
+    conn.close()
+    outbox = TodoistOutbox(client=FakeClient(), db_path=path)
+    try:
+        outbox.enqueue(TodoistTask(content="Call mom"), project="Home")
+        assert outbox.stats() == {"pending": 1}
+    finally:
+        outbox.close()
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from engine.agents.task_extractor import ExtractedTask, ExtractionError
+from engine.services.vault_watcher import InotifyBackend, VaultWatcher
+
+class FakeAgent:
+    """Records extraction calls; fails while ``failing`` is set"""
+
+    def __init__(self):
+        self.failing = False
+        self.extracted = []
+        self.created = []
+
+    def extract_tasks_from_text_original(self, text, source="unknown", priority="normal", offline_fallback=True):
+        assert not offline_fallback
+        if self.failing:
+            raise ExtractionError("model unavailable")
+        self.extracted.append(text)
+        return [ExtractedTask(content=line) for line in text.splitlines() if line.startswith("Call")]
+
+    def create_todoist_tasks(self, tasks, dry_run=False):
+        self.created.append((tasks, dry_run))
+
+@pytest.fixture
+def notes(tmp_path):
+    directory = tmp_path / "notes"
+    directory.mkdir()
+    return directory
+
+def process(watcher, path):
+    watcher._generations[path] = watcher._generations.get(path, 0) + 1
+    watcher._process_note(path, watcher._generations[path])
+
+def make_watcher(notes, agent, dry_run=False):
+    watcher = VaultWatcher(notes, agent=agent, dry_run=dry_run, debounce_seconds=0)
+    watcher._executor.shutdown()
+    return watcher
+
+def test_processed_blocks_are_recorded(engine_settings, notes):
+    note = notes / "day.md"
+    note.write_text("Slept well.\n\nCall the plumber.")
+    agent = FakeAgent()
+    watcher = make_watcher(notes, agent)
+    process(watcher, note)
+    assert len(agent.created) == 1
+    assert watcher.state_file.exists()
+
+    note.write_text("Slept well.\n\nCall the plumber.\n\nCall Ana.")
+    process(watcher, note)
+    assert agent.extracted[-1] == "Call Ana."
+
+def test_failed_extraction_keeps_blocks_pending(engine_settings, notes):
+    note = notes / "day.md"
+    note.write_text("Call the plumber.")
+    agent = FakeAgent()
+    watcher = make_watcher(notes, agent)
+
+    agent.failing = True
+    process(watcher, note)
+    assert not watcher.state_file.exists()
+
+    agent.failing = False
+    process(watcher, note)
+    assert agent.extracted == ["Call the plumber."]
+    assert watcher.state_file.exists()
+
+def test_dry_run_does_not_persist_state(engine_settings, notes):
+    note = notes / "day.md"
+    note.write_text("Call the plumber.")
+    dry_agent = FakeAgent()
+    process(make_watcher(notes, dry_agent, dry_run=True), note)
+    assert dry_agent.created[0][1] is True
+
+    agent = FakeAgent()
+    watcher = make_watcher(notes, agent)
+    process(watcher, note)
+    assert agent.extracted == ["Call the plumber."]
+    assert agent.created[0][1] is False
+
+def test_stats_are_counted_across_threads(engine_settings, notes):
+    watcher = make_watcher(notes, FakeAgent())
+    threads = [threading.Thread(target=lambda: [watcher._count("blocks_sent") for _ in range(1000)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert watcher.stats["blocks_sent"] == 4000
+
+inotify = pytest.mark.skipif(not InotifyBackend.is_supported(), reason="inotify is Linux-only")
+
+@inotify
+def test_vanished_directory_is_skipped(notes):
+    backend = InotifyBackend(notes, lambda path: None)
+    backend._add_tree(notes / "created-and-removed", report_notes=True)
+    assert notes / "created-and-removed" not in backend._watches.values()
+
+@inotify
+def test_folder_moved_into_the_vault_reports_its_notes(notes, tmp_path):
+    changed = []
+    backend = InotifyBackend(notes, changed.append)
+    stop = threading.Event()
+    thread = threading.Thread(target=backend.run, args=(stop,))
+    thread.start()
+    try:
+        outside = tmp_path / "archive"
+        (outside / "2024").mkdir(parents=True)
+        (outside / "2024" / "old.md").write_text("Call the bank.")
+        (outside / "top.md").write_text("Pay rent.")
+        outside.rename(notes / "archive")
+
+        deadline = time.monotonic() + 5
+        while len(changed) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        thread.join()
+    assert sorted(changed) == [notes / "archive" / "2024" / "old.md", notes / "archive" / "top.md"]
+    assert notes / "archive" / "2024" in backend._watches.values()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Budget Governor
+
+Maps how full the spend budget is to how extraction should run:
+
+    normal     below downshift_at   preferred model
+    economy    from downshift_at    agents.cost_conscious_model
+    batch      from batch_at        cheap model; bulk callers should use the
+                                    offline batch API (half price)
+    exhausted  at the limit         cheap model, and work below reject_below
+                                    priority is refused
+
+Pressure is the larger of daily and monthly spend over their limits, read
+from the SpendLedger.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+
+from engine.utils.spend_ledger import SpendLedger, get_spend_ledger
+
+PRIORITIES = {'low': 0, 'normal': 1, 'high': 2}
+
+class BudgetExceededError(RuntimeError):
+    """Raised when work is refused because the spend budget is exhausted"""
+
+@dataclass
+class BudgetDecision:
+    """How a call should run under the current spend"""
+    mode: str
+    model: str
+    pressure: float
+    allowed: bool = True
+    reason: Optional[str] = None
+
+    @property
+    def use_batch(self) -> bool:
+        return self.mode in ('batch', 'exhausted')
+
+class BudgetGovernor:
+    """Chooses model and mode from spend pressure and rejects low-priority work when out of budget"""
+
+    def __init__(self, ledger: Optional[SpendLedger] = None, config: Optional[Dict[str, Any]] = None,
+                 cost_conscious_model: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        if config is None or cost_conscious_model is None:
+            from engine.config import settings
+            if config is None:
+                config = settings.get_section('budget')
+            if cost_conscious_model is None:
+                cost_conscious_model = settings.get_section('agents').get('cost_conscious_model', 'gpt-4o-mini')
+        self.ledger = ledger or get_spend_ledger()
+        self.daily_limit = float(config.get('daily_limit', 0) or 0)
+        self.monthly_limit = float(config.get('monthly_limit', 0) or 0)
+        self.downshift_at = float(config.get('downshift_at', 0.7))
+        self.batch_at = float(config.get('batch_at', 0.9))
+        self.reject_below = PRIORITIES.get(config.get('reject_below', 'normal'), 1)
+        self.cost_conscious_model = cost_conscious_model
+        self._last_mode = 'normal'
+        self._mode_lock = threading.Lock()
+
+    def pressure(self) -> float:
+        """Fraction of the tighter budget already spent (0 when no limits are set)"""
+        totals = self.ledger.totals()
+        pressure = 0.0
+        if self.daily_limit > 0:
+            pressure = max(pressure, totals['daily'] / self.daily_limit)
+        if self.monthly_limit > 0:
+            pressure = max(pressure, totals['monthly'] / self.monthly_limit)
+        return pressure
+
+    def decide(self, preferred_model: str, priority: str = 'normal') -> BudgetDecision:
+        """Pick the model and mode for one unit of work"""
+        pressure = self.pressure()
+        if pressure < self.downshift_at:
+            decision = BudgetDecision('normal', preferred_model, pressure)
+        elif pressure < self.batch_at:
+            decision = BudgetDecision('economy', self.cost_conscious_model, pressure)
+        elif pressure < 1.0:
+            decision = BudgetDecision('batch', self.cost_conscious_model, pressure)
+        else:
+            allowed = PRIORITIES.get(priority, 1) >= self.reject_below
+            decision = BudgetDecision('exhausted', self.cost_conscious_model, pressure, allowed=allowed,
+                                      reason=None if allowed else
+                                      f"Spend budget exhausted ({pressure:.0%}); {priority}-priority work refused")
+        self._note_mode(decision)
+        return decision
+
+    def check(self, preferred_model: str, priority: str = 'normal') -> BudgetDecision:
+        """Like decide(), but raises BudgetExceededError when the work is refused"""
+        decision = self.decide(preferred_model, priority)
+        if not decision.allowed:
+            raise BudgetExceededError(decision.reason)
+        return decision
+
+    def _note_mode(self, decision: BudgetDecision):
+        with self._mode_lock:
+            if decision.mode == self._last_mode:
+                return
+            self._last_mode = decision.mode
+        self.logger.warning(f"Budget at {decision.pressure:.0%}: switching to {decision.mode} mode "
+                            f"(model {decision.model})")
+
+    def status(self) -> Dict[str, Any]:
+        totals = self.ledger.totals()
+        return {
+            "daily_spent": round(totals['daily'], 4), "daily_limit": self.daily_limit,
+            "monthly_spent": round(totals['monthly'], 4), "monthly_limit": self.monthly_limit,
+            "pressure": round(self.pressure(), 4), "mode": self._last_mode
+        }
+
+_default_governor: Optional[BudgetGovernor] = None
+_default_lock = threading.Lock()
+_listening = False
+
+def get_budget_governor(create: bool = True) -> Optional[BudgetGovernor]:
+    """
+    Process-wide governor (a tenant's own inside its context), or None when budget.enabled is false
+
+    With ``create`` false only an existing governor is returned (e.g. for stats).
+    """
+    global _default_governor, _listening
+    from engine.config import settings
+    if not settings.get_section('budget').get('enabled', True):
+        return None
+    from engine.utils.registry import active_registry
+    registry = active_registry()
+    if not create:
+        return registry.peek_client('budget_governor') if registry is not None else _default_governor
+    if registry is not None:
+        # Tenants are rebuilt when their settings change, so no reset listener is needed
+        return registry.get_client('budget_governor', BudgetGovernor)
+    if _default_governor is None:
+        with _default_lock:
+            if _default_governor is None:
+                _default_governor = BudgetGovernor()
+                if not _listening:
+                    settings.on_change(_reset_on_change)
+                    _listening = True
+    return _default_governor
+
+def _reset_on_change(changed):
+    """Rebuild the governor with new limits after a settings reload"""
+    global _default_governor
+    if changed & {'budget', 'agents'}:
+        _default_governor = None
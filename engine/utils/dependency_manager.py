@@ -8,17 +8,78 @@ Each agent can specify its requirements and this module ensures they're availabl
 
 import subprocess
 import sys
+import os
+import site
+import re
+import json
+import hashlib
 import importlib
+import importlib.util
 import logging
+import tempfile
 from typing import List, Dict, Optional
 from pathlib import Path
 
+# Distribution names whose import name differs from the normalized package name
+DISTRIBUTION_MODULES = {
+    'pyyaml': 'yaml',
+    'python-dotenv': 'dotenv',
+    'beautifulsoup4': 'bs4',
+    'scikit-learn': 'sklearn',
+    'pillow': 'PIL',
+    'python-dateutil': 'dateutil',
+    'opencv-python': 'cv2',
+    'protobuf': 'google.protobuf',
+    'pymupdf': 'fitz',
+    'sentence-transformers': 'sentence_transformers',
+    'google-api-python-client': 'googleapiclient',
+}
+
+def module_name_for(requirement: str) -> str:
+    """Map a requirement (e.g. 'PyYAML>=6') to the module it installs (e.g. 'yaml')"""
+    distribution = re.split(r'[<>=!~\[;\s]', requirement.strip(), maxsplit=1)[0].lower()
+    return DISTRIBUTION_MODULES.get(distribution, distribution.replace('-', '_'))
+
+def is_module_available(module_name: str) -> bool:
+    """Check whether a module can be imported, without importing it"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+def site_packages_dirs() -> List[str]:
+    """The interpreter's site-packages directories (system, user and any on sys.path)"""
+    dirs = set(getattr(site, 'getsitepackages', list)())
+    if site.ENABLE_USER_SITE:
+        dirs.add(site.getusersitepackages())
+    dirs.update(entry for entry in sys.path if entry.endswith(('site-packages', 'dist-packages')))
+    return sorted(dirs)
+
+def environment_fingerprint() -> str:
+    """
+    Fingerprint of the running interpreter and its installed packages
+
+    Changes whenever the interpreter or the contents of a site-packages
+    directory change (installs and uninstalls touch the directory mtime),
+    which invalidates cached verification results. The rest of sys.path
+    (working directory, PYTHONPATH) is left out, so running from another
+    directory does not force a re-check.
+    """
+    parts = [sys.executable, sys.version, sys.prefix]
+    for entry in site_packages_dirs():
+        try:
+            parts.append(f"{entry}:{os.stat(entry).st_mtime_ns}")
+        except OSError:
+            continue
+    return hashlib.sha256("\0".join(parts).encode('utf-8')).hexdigest()
+
 class DependencyManager:
     """Manages dependencies for self-contained agents"""
     
-    def __init__(self, agent_name: str = "unknown"):
+    def __init__(self, agent_name: str = "unknown", cache_dir: Optional[Path] = None):
         self.agent_name = agent_name
         self.logger = logging.getLogger(f"DependencyManager-{agent_name}")
+        self.cache_file = Path(cache_dir) / 'dependencies.json' if cache_dir else None
         
     def check_and_install_requirements(self, requirements: List[str]) -> Dict[str, bool]:
         """
@@ -33,15 +94,16 @@ class DependencyManager:
         results = {}
         
         for requirement in requirements:
-            try:
-                # Try to import the package
-                importlib.import_module(requirement)
+            if is_module_available(module_name_for(requirement)):
                 results[requirement] = True
                 self.logger.debug(f"✅ {requirement} already available")
-            except ImportError:
+            else:
                 # Package not found, try to install it
                 self.logger.info(f"📦 Installing missing dependency: {requirement}")
                 success = self._install_package(requirement)
+                if success:
+                    importlib.invalidate_caches()
+                    success = is_module_available(module_name_for(requirement))
                 results[requirement] = success
                 
         return results
@@ -71,16 +133,58 @@ class DependencyManager:
         results = {}
         
         for package, feature_desc in optional_deps.items():
-            try:
-                importlib.import_module(package)
+            if is_module_available(module_name_for(package)):
                 results[package] = True
                 self.logger.debug(f"✅ Optional dependency {package} available ({feature_desc})")
-            except ImportError:
+            else:
                 results[package] = False
                 self.logger.info(f"⚠️  Optional dependency {package} not available - {feature_desc} will be disabled")
                 
         return results
     
+    def _cache_key(self, requirements: List[str], optional_deps: Dict[str, str]) -> str:
+        """Key verification results by interpreter, environment and declared dependencies"""
+        declared = json.dumps([self.agent_name, sorted(requirements), sorted(optional_deps)])
+        return hashlib.sha256(f"{environment_fingerprint()}:{declared}".encode('utf-8')).hexdigest()
+    
+    def load_cached_results(self, cache_key: str) -> Optional[Dict[str, bool]]:
+        """Return previously verified results for this environment, if any"""
+        if not self.cache_file or not self.cache_file.exists():
+            return None
+        try:
+            with open(self.cache_file, 'r') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry = cache.get(self.agent_name, {})
+        if entry.get('key') == cache_key:
+            return entry.get('results')
+        return None
+    
+    def save_cached_results(self, cache_key: str, results: Dict[str, bool]):
+        """Persist verified results so warm starts can skip the check"""
+        if not self.cache_file:
+            return
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            cache = {}
+            if self.cache_file.exists():
+                with open(self.cache_file, 'r') as f:
+                    cache = json.load(f)
+            cache[self.agent_name] = {'key': cache_key, 'interpreter': sys.executable, 'results': results}
+            # A temporary file of its own, so concurrent writers never share one
+            tmp_file = tempfile.NamedTemporaryFile('w', dir=self.cache_file.parent, prefix=self.cache_file.stem,
+                                                   suffix='.tmp', delete=False)
+            try:
+                with tmp_file:
+                    json.dump(cache, tmp_file, indent=2)
+                os.replace(tmp_file.name, self.cache_file)
+            except Exception:
+                os.unlink(tmp_file.name)
+                raise
+        except (OSError, ValueError) as e:
+            self.logger.debug(f"Could not write dependency cache: {e}")
+    
     def create_requirements_file(self, requirements: List[str], optional_deps: List[str] = None) -> Path:
         """Create a requirements.txt file for the agent"""
         agent_dir = Path(__file__).parent.parent / "agents"
@@ -102,7 +206,8 @@ class DependencyManager:
         return req_file
 
 def ensure_agent_dependencies(agent_name: str, core_requirements: List[str], 
-                            optional_requirements: Dict[str, str] = None) -> Dict[str, bool]:
+                            optional_requirements: Dict[str, str] = None,
+                            cache_dir: Optional[Path] = None) -> Dict[str, bool]:
     """
     Convenience function to ensure agent dependencies are available
     
@@ -110,11 +215,19 @@ def ensure_agent_dependencies(agent_name: str, core_requirements: List[str],
         agent_name: Name of the agent
         core_requirements: List of required packages
         optional_requirements: Dict of optional packages and their descriptions
+        cache_dir: Directory for the verification cache; when given, a warm
+            start in an unchanged environment skips the check entirely
         
     Returns:
         Combined status of all dependencies
     """
-    dm = DependencyManager(agent_name)
+    dm = DependencyManager(agent_name, cache_dir)
+    
+    cache_key = dm._cache_key(core_requirements, optional_requirements or {})
+    cached_results = dm.load_cached_results(cache_key)
+    if cached_results is not None:
+        dm.logger.debug("Dependencies verified from cache")
+        return cached_results
     
     # Install core requirements
     core_results = dm.check_and_install_requirements(core_requirements)
@@ -132,4 +245,8 @@ def ensure_agent_dependencies(agent_name: str, core_requirements: List[str],
         f"Dependencies ready: {sum(all_results.values())}/{len(all_results)} available"
     )
     
+    # Only cache once every core requirement is present so failures are retried
+    if all(core_results.values()):
+        dm.save_cached_results(cache_key, all_results)
+    
     return all_results
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Extraction Ledger
+
+Durable record of text blocks that have already been through task
+extraction, keyed by a hash of the normalized content. Each entry stores the
+extraction result and the model that produced it, plus the Todoist IDs of
+tasks created from it, so re-running over the same text costs neither tokens
+nor duplicate Todoist writes.
+
+Backed by SQLite in WAL mode under data_root/ledger. Both tables are
+WITHOUT ROWID tables keyed by the hash, so a lookup is a single primary-key
+B-tree probe (a handful of page reads even at millions of entries).
+"""
+
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+
+def normalize_text(text: str) -> str:
+    """Normalize text so formatting-only differences hash identically"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the normalized text"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+def task_hash(content: str, source_hash: str) -> str:
+    """Identity of a created task: its normalized content within its source block"""
+    return hashlib.sha256(f"{source_hash}\0{normalize_text(content).lower()}".encode("utf-8")).hexdigest()
+
+@dataclass
+class LedgerEntry:
+    """A previously processed text block"""
+    content_hash: str
+    model: str
+    tasks: List[Dict[str, Any]] = field(default_factory=list)
+    created_at: float = 0.0
+
+class ExtractionLedger:
+    """SQLite-backed ledger of processed blocks and the Todoist tasks created from them"""
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS blocks (
+            content_hash TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            result TEXT NOT NULL,
+            created_at REAL NOT NULL
+        ) WITHOUT ROWID""",
+        """CREATE TABLE IF NOT EXISTS created_tasks (
+            task_hash TEXT PRIMARY KEY,
+            content_hash TEXT,
+            todoist_id TEXT NOT NULL,
+            created_at REAL NOT NULL
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS idx_created_tasks_content ON created_tasks (content_hash)",
+    ]
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.logger = logging.getLogger(__name__)
+        if db_path is None:
+            from engine.config import settings
+            db_path = settings.data_root / 'ledger' / 'extraction.db'
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self._conn.execute(statement)
+
+    def lookup(self, text: str) -> Optional[LedgerEntry]:
+        """Return the stored extraction for this text, if it has been processed before"""
+        digest = content_hash(text)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT model, result, created_at FROM blocks WHERE content_hash = ?", (digest,)
+            ).fetchone()
+        if row is None:
+            return None
+        return LedgerEntry(content_hash=digest, model=row[0], tasks=json.loads(row[1]), created_at=row[2])
+
+    def record_extraction(self, text: str, model: str, tasks: List[Dict[str, Any]]) -> str:
+        """Store the extraction result for this text and return its content hash"""
+        digest = content_hash(text)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO blocks (content_hash, model, result, created_at) VALUES (?, ?, ?, ?)",
+                (digest, model, json.dumps(tasks), time.time())
+            )
+        return digest
+
+    def lookup_created(self, content: str, source_hash: Optional[str]) -> Optional[str]:
+        """Return the Todoist ID if this task was already created from this source"""
+        if not source_hash:
+            return None  # Unknown source: the same wording elsewhere is a new task
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT todoist_id FROM created_tasks WHERE task_hash = ?", (task_hash(content, source_hash),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_created(self, content: str, todoist_id: str, source_hash: Optional[str]):
+        """Remember that a task was created in Todoist (nothing is recorded without a source hash)"""
+        if not source_hash:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO created_tasks (task_hash, content_hash, todoist_id, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (task_hash(content, source_hash), source_hash, str(todoist_id), time.time())
+            )
+
+    def created_ids_for(self, text: str) -> List[str]:
+        """Todoist IDs of all tasks created from this text block"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT todoist_id FROM created_tasks WHERE content_hash = ?", (content_hash(text),)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            blocks = self._conn.execute("SELECT COUNT(*) FROM blocks").fetchone()[0]
+            created = self._conn.execute("SELECT COUNT(*) FROM created_tasks").fetchone()[0]
+        return {"blocks": blocks, "created_tasks": created}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
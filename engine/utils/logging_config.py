@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Queued Logging
+
+One process-wide logging setup, installed by the service entry points
+(daemon, backfill, vault watcher); library code such as the agents only gets
+loggers, so an application embedding the engine keeps its own logging
+configuration. Loggers hand records to a QueueHandler on the root logger,
+which only enqueues them; a
+QueueListener thread does the formatting and the console/file I/O, so a
+request thread never blocks on a slow terminal or disk. Records are enqueued
+unformatted, which keeps %-style calls (``logger.debug("x %s", y)``) nearly
+free when nobody is listening at that level and moves the string work off
+the hot path when someone is.
+
+High-volume debug lines can be thinned with RateLimitFilter (per message
+token bucket) or SamplingFilter (keep one in N); both only touch records
+below WARNING.
+
+Settings (``logging`` section):
+    level: INFO
+    save_to_file: true            # rotating files under data_root/logs
+    max_bytes: 10485760
+    backup_count: 5
+    debug_rate_limit: 20          # per-message records/second below WARNING (0 = off)
+    debug_sample_rate: 1          # keep one in N records below WARNING (1 = all)
+"""
+
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple, List
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per (logger, message template) for records below WARNING
+
+    Keyed on the unformatted message, so ``logger.debug("chunk %s", i)`` is
+    one stream however many distinct values it logs. Dropped records are
+    counted in ``suppressed``.
+    """
+
+    def __init__(self, rate: float = 20.0, burst: Optional[float] = None, max_level: int = logging.WARNING):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.max_level = max_level
+        self.suppressed = 0
+        self._buckets: Dict[Tuple[str, Any], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.max_level or self.rate <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) > 10000:
+                    self._buckets.clear()
+                bucket = self._buckets[key] = [self.burst, now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1.0:
+                bucket[0] = tokens
+                self.suppressed += 1
+                return False
+            bucket[0] = tokens - 1.0
+            return True
+
+class SamplingFilter(logging.Filter):
+    """Keep one in ``every`` records below WARNING, per logger"""
+
+    def __init__(self, every: int = 10, max_level: int = logging.WARNING):
+        super().__init__()
+        self.every = max(int(every), 1)
+        self.max_level = max_level
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.max_level or self.every == 1:
+            return True
+        with self._lock:
+            count = self._counts.get(record.name, 0)
+            self._counts[record.name] = count + 1
+        return count % self.every == 0
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues the record as-is
+
+    The stock handler formats in prepare() on the calling thread; within one
+    process the listener can do that instead.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+class _LoggingState:
+    listener: Optional[logging.handlers.QueueListener] = None
+    queue_handler: Optional[logging.Handler] = None
+    handlers: List[logging.Handler] = []
+    lock = threading.Lock()
+
+def configure_logging(level: Optional[str] = None, save_to_file: Optional[bool] = None,
+                      log_dir: Optional[Path] = None, force: bool = False) -> logging.Logger:
+    """
+    Install the queued root handler once per process and return the root logger
+
+    For entry points only: it replaces the root logger's handlers and level.
+    Arguments override the ``logging`` settings section. Later calls are
+    no-ops unless ``force`` is set.
+    """
+    with _LoggingState.lock:
+        root = logging.getLogger()
+        if _LoggingState.listener is not None and not force:
+            return root
+        if _LoggingState.listener is not None:
+            _shutdown_locked()
+
+        from engine.config import settings
+        config = settings.get_section('logging')
+        level = (level or config.get('level', 'INFO')).upper()
+        if save_to_file is None:
+            save_to_file = config.get('save_to_file', True)
+
+        formatter = logging.Formatter(LOG_FORMAT)
+        handlers: List[logging.Handler] = [logging.StreamHandler()]
+        if save_to_file:
+            log_dir = Path(log_dir) if log_dir else settings.data_root / 'logs'
+            try:
+                log_dir.mkdir(parents=True, exist_ok=True)
+                handlers.append(logging.handlers.RotatingFileHandler(
+                    log_dir / 'engine.log',
+                    maxBytes=int(config.get('max_bytes', 10 * 1024 * 1024)),
+                    backupCount=int(config.get('backup_count', 5)),
+                    encoding='utf-8'
+                ))
+            except OSError as e:
+                print(f"Warning: file logging disabled, cannot write to {log_dir}: {e}")
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        queue_handler = _DeferredQueueHandler(queue.SimpleQueue())
+        rate = float(config.get('debug_rate_limit', 20))
+        if rate > 0:
+            queue_handler.addFilter(RateLimitFilter(rate))
+        sample_every = int(config.get('debug_sample_rate', 1))
+        if sample_every > 1:
+            queue_handler.addFilter(SamplingFilter(sample_every))
+
+        # Replace direct handlers (basicConfig, earlier setups) so nothing is written twice
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(getattr(logging, level, logging.INFO))
+
+        listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        listener.start()
+        _LoggingState.listener = listener
+        _LoggingState.queue_handler = queue_handler
+        _LoggingState.handlers = handlers
+        return root
+
+def _shutdown_locked():
+    listener = _LoggingState.listener
+    if listener is None:
+        return
+    listener.stop()  # flushes what is already queued
+    root = logging.getLogger()
+    if _LoggingState.queue_handler in root.handlers:
+        root.removeHandler(_LoggingState.queue_handler)
+    for handler in _LoggingState.handlers:
+        handler.close()
+    _LoggingState.listener = None
+    _LoggingState.queue_handler = None
+    _LoggingState.handlers = []
+
+def shutdown_logging():
+    """Drain the queue and close log files"""
+    with _LoggingState.lock:
+        _shutdown_locked()
+
+atexit.register(shutdown_logging)
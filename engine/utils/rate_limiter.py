@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Shared Token-Bucket Rate Limiter
+
+Tracks requests-per-minute and tokens-per-minute budgets for each provider
+and model. Bucket state lives in a small JSON file guarded by an exclusive
+file lock, so every thread and every process using the same data_root draws
+from the same quota. Limits start from settings and are corrected from the
+providers' rate-limit response headers; callers block just long enough for
+capacity to refill instead of failing with 429s.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Optional, Mapping
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# Conservative defaults used until the provider tells us the real limits
+DEFAULT_LIMITS = {
+    'openai': {'rpm': 500, 'tpm': 200000},
+    'anthropic': {'rpm': 50, 'tpm': 40000},
+}
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+
+def parse_reset(value: str) -> Optional[float]:
+    """Parse a reset header into seconds from now ('6m0s', '20ms', '1.5', or an RFC 3339 time)"""
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    parts = DURATION_PART.findall(value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        scale = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+        return sum(float(number) * scale[unit] for number, unit in parts)
+    try:
+        reset_at = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return max((reset_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except ValueError:
+        return None
+
+class RateLimiter:
+    """Cross-thread, cross-process RPM/TPM token buckets keyed by provider and model"""
+
+    def __init__(self, state_dir: Optional[Path] = None, limits: Optional[Dict[str, Any]] = None,
+                 max_wait: float = 300.0):
+        self.logger = logging.getLogger(__name__)
+        if state_dir is None or limits is None:
+            from engine.config import settings
+            if state_dir is None:
+                state_dir = settings.data_root / 'cache' / 'ratelimits'
+            if limits is None:
+                limits = settings.get_section('rate_limits')
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.state_file = self.state_dir / 'buckets.json'
+        self.lock_file = self.state_dir / 'buckets.lock'
+        self.limits = limits or {}
+        self.max_wait = max_wait
+        self._thread_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Shared state
+    # ------------------------------------------------------------------
+    @contextmanager
+    def _locked_state(self):
+        """Exclusive access to the bucket state across threads and processes"""
+        with self._thread_lock:
+            with open(self.lock_file, 'a') as lock:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    try:
+                        with open(self.state_file, 'r') as f:
+                            state = json.load(f)
+                    except (OSError, ValueError):
+                        state = {}
+                    yield state
+                    tmp_file = self.state_file.with_suffix(f'.{os.getpid()}.tmp')
+                    with open(tmp_file, 'w') as f:
+                        json.dump(state, f)
+                    os.replace(tmp_file, self.state_file)
+                finally:
+                    if FCNTL_AVAILABLE:
+                        fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _configured_limits(self, provider: str, model: str) -> Dict[str, float]:
+        provider_limits = self.limits.get(provider, {}) or {}
+        limits = dict(DEFAULT_LIMITS.get(provider, {'rpm': 60, 'tpm': 100000}))
+        limits.update({k: v for k, v in provider_limits.items() if k in ('rpm', 'tpm')})
+        limits.update(provider_limits.get(model, {}) or {})
+        return limits
+
+    def _bucket(self, state: Dict[str, Any], provider: str, model: str, now: float) -> Dict[str, Any]:
+        """Fetch a bucket, creating it full, and refill it for the time elapsed"""
+        key = f"{provider}:{model}"
+        bucket = state.get(key)
+        if bucket is None:
+            limits = self._configured_limits(provider, model)
+            bucket = state[key] = {
+                "rpm": limits['rpm'], "tpm": limits['tpm'],
+                "requests": float(limits['rpm']), "tokens": float(limits['tpm']),
+                "updated_at": now, "blocked_until": 0.0
+            }
+        elapsed = max(now - bucket["updated_at"], 0.0)
+        bucket["requests"] = min(bucket["rpm"], bucket["requests"] + elapsed * bucket["rpm"] / 60.0)
+        bucket["tokens"] = min(bucket["tpm"], bucket["tokens"] + elapsed * bucket["tpm"] / 60.0)
+        bucket["updated_at"] = now
+        return bucket
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def acquire(self, provider: str, model: str, tokens: int = 0) -> float:
+        """
+        Block until one request and ``tokens`` tokens are available, then take them
+
+        Returns the number of seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._locked_state() as state:
+                now = time.time()
+                bucket = self._bucket(state, provider, model, now)
+                # A single call larger than the whole budget can only ever wait for a full bucket
+                needed_tokens = min(float(tokens), float(bucket["tpm"]))
+                delay = max(bucket["blocked_until"] - now, 0.0)
+                if bucket["requests"] < 1.0:
+                    delay = max(delay, (1.0 - bucket["requests"]) * 60.0 / bucket["rpm"])
+                if bucket["tokens"] < needed_tokens:
+                    delay = max(delay, (needed_tokens - bucket["tokens"]) * 60.0 / bucket["tpm"])
+                if delay <= 0:
+                    bucket["requests"] -= 1.0
+                    bucket["tokens"] -= needed_tokens
+                    return waited
+
+            if waited + delay > self.max_wait:
+                raise TimeoutError(f"Rate limit wait for {provider}:{model} would exceed {self.max_wait}s")
+            self.logger.debug("Rate limited on %s:%s, waiting %.2fs", provider, model, delay)
+            time.sleep(delay)
+            waited += delay
+
+    def record_usage(self, provider: str, model: str, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the real usage of a call is known"""
+        with self._locked_state() as state:
+            bucket = self._bucket(state, provider, model, time.time())
+            bucket["tokens"] -= actual_tokens - min(estimated_tokens, bucket["tpm"])
+
+    def penalize(self, provider: str, model: str, retry_after: Optional[float]):
+        """Pause a bucket after a 429, honouring the provider's retry-after if given"""
+        with self._locked_state() as state:
+            now = time.time()
+            bucket = self._bucket(state, provider, model, now)
+            bucket["blocked_until"] = max(bucket["blocked_until"], now + (retry_after or 1.0))
+            bucket["requests"] = min(bucket["requests"], 0.0)
+
+    def update_from_headers(self, provider: str, model: str, headers: Mapping[str, str]):
+        """Tune limits and remaining capacity from OpenAI/Anthropic rate-limit headers"""
+        headers = {k.lower(): v for k, v in dict(headers).items()}
+        if provider == 'anthropic':
+            names = {
+                "rpm": "anthropic-ratelimit-requests-limit",
+                "tpm": "anthropic-ratelimit-tokens-limit",
+                "requests": "anthropic-ratelimit-requests-remaining",
+                "tokens": "anthropic-ratelimit-tokens-remaining",
+            }
+        else:
+            names = {
+                "rpm": "x-ratelimit-limit-requests",
+                "tpm": "x-ratelimit-limit-tokens",
+                "requests": "x-ratelimit-remaining-requests",
+                "tokens": "x-ratelimit-remaining-tokens",
+            }
+        values = {}
+        for field_name, header in names.items():
+            if header in headers:
+                values[field_name] = headers[header]
+        if not values and 'retry-after' not in headers:
+            return
+
+        with self._locked_state() as state:
+            now = time.time()
+            bucket = self._bucket(state, provider, model, now)
+            for limit_field in ("rpm", "tpm"):
+                try:
+                    limit = float(values[limit_field])
+                except (KeyError, ValueError):
+                    continue
+                if limit > 0:
+                    bucket[limit_field] = limit
+            for remaining_field in ("requests", "tokens"):
+                try:
+                    remaining = float(values[remaining_field])
+                except (KeyError, ValueError):
+                    continue
+                # The provider's view is authoritative when it is stricter than ours
+                bucket[remaining_field] = min(bucket[remaining_field], remaining)
+            if "retry-after" in headers:
+                retry_after = parse_reset(headers["retry-after"])
+                if retry_after:
+                    bucket["blocked_until"] = max(bucket["blocked_until"], now + retry_after)
+
+_limiters: Dict[Path, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Limiter for the active data_root, shared with other processes via its state file
+
+    One instance per state directory, so settings activated later with
+    another data_root (tenants, tests) get their own buckets.
+    """
+    from engine.config import settings
+    state_dir = settings.data_root / 'cache' / 'ratelimits'
+    limiter = _limiters.get(state_dir)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(state_dir)
+            if limiter is None:
+                limiter = _limiters[state_dir] = RateLimiter(state_dir=state_dir)
+    return limiter
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Process-wide Registry for Shared Clients and Agents
+
+Hands out shared, thread-safe provider and Todoist clients and reuses
+initialized agents, so code that needs an agent per request pays the
+construction cost (logging, config directory, dependency check, clients)
+only once per process.
+
+Usage:
+    from engine.utils.registry import get_registry
+    from engine.agents.task_extractor import TaskExtractorAgent
+
+    agent = get_registry().get_agent(TaskExtractorAgent, agent_definition)
+
+A tenant gets its own registry, made active with ``use_registry`` (see
+engine.services.tenancy); get_registry() then returns it in that context.
+"""
+
+import json
+import atexit
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Callable, List, Tuple, Type
+
+class RegistryClosedError(RuntimeError):
+    """Raised when a closed registry is asked for a client or agent"""
+
+def definition_hash(agent_definition: Optional[Dict[str, Any]]) -> str:
+    """Stable hash of an agent definition, used to decide whether an agent can be reused"""
+    canonical = json.dumps(agent_definition or {}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class EngineRegistry:
+    """Owns shared clients and agent instances for the lifetime of a process"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._clients: Dict[str, Any] = {}
+        self._agents: Dict[Tuple[str, str, str], Any] = {}
+        self._retired_agents: List[Any] = []
+        self._close_hooks: List[Callable[[], None]] = []
+        self._closed = False
+
+    def _check_open(self):
+        if self._closed:
+            raise RegistryClosedError("Registry has been closed")
+
+    # ------------------------------------------------------------------
+    # Clients
+    # ------------------------------------------------------------------
+    def get_client(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Return the shared client registered under ``name``, creating it once"""
+        client = self._clients.get(name)
+        if client is not None:
+            return client
+        with self._lock:
+            self._check_open()
+            if name not in self._clients:
+                self._clients[name] = factory()
+                self.logger.debug(f"Created shared client: {name}")
+            return self._clients[name]
+
+    def peek_client(self, name: str) -> Optional[Any]:
+        """The client registered under ``name`` if it already exists; never creates one"""
+        return self._clients.get(name)
+
+    def add_client(self, name: str, client: Any):
+        """Register a client built elsewhere (e.g. with a tenant's credentials) under ``name``"""
+        with self._lock:
+            self._check_open()
+            if name in self._clients:
+                raise ValueError(f"Client already registered: {name}")
+            self._clients[name] = client
+
+    def get_ai_client(self):
+        """Shared AIModelClient; provider SDK clients inside it are created lazily"""
+        from engine.integrations.ai_models import AIModelClient
+        return self.get_client('ai', AIModelClient)
+
+    def get_todoist_client(self):
+        """Shared TodoistClient with a pooled HTTP session"""
+        from engine.integrations.todoist_client import TodoistClient
+        return self.get_client('todoist', TodoistClient)
+
+    # ------------------------------------------------------------------
+    # Agents
+    # ------------------------------------------------------------------
+    def get_agent(self, agent_cls: Type, agent_definition: Optional[Dict[str, Any]] = None,
+                  name: Optional[str] = None) -> Any:
+        """
+        Return an initialized agent for this class and definition
+
+        Agents are keyed by class, name and definition hash; a changed
+        definition yields a new agent while the old one stays available to
+        callers still holding it until the registry is closed.
+        """
+        key = self._agent_key(agent_cls, agent_definition, name)
+        agent = self._agents.get(key)
+        if agent is not None:
+            return agent
+
+        with self._lock:
+            self._check_open()
+            if key not in self._agents:
+                self._agents[key] = self._create_agent(agent_cls, agent_definition)
+                self.logger.debug(f"Created shared agent: {key[1]} ({key[2][:12]})")
+            return self._agents[key]
+
+    def peek_agent(self, agent_cls: Type, agent_definition: Optional[Dict[str, Any]] = None,
+                   name: Optional[str] = None) -> Optional[Any]:
+        """The current agent for this class and definition if one was built; never creates one"""
+        return self._agents.get(self._agent_key(agent_cls, agent_definition, name))
+
+    @staticmethod
+    def _agent_key(agent_cls: Type, agent_definition: Optional[Dict[str, Any]],
+                   name: Optional[str]) -> Tuple[str, str, str]:
+        return (f"{agent_cls.__module__}.{agent_cls.__qualname__}",
+                name or agent_cls.__name__, definition_hash(agent_definition))
+
+    def _create_agent(self, agent_cls: Type, agent_definition: Optional[Dict[str, Any]]) -> Any:
+        """Build an agent, injecting shared clients when it accepts them"""
+        from engine.agents.task_extractor import TaskExtractorAgent
+        if issubclass(agent_cls, TaskExtractorAgent):
+            return agent_cls(agent_definition,
+                             ai_client=self.get_ai_client(),
+                             todoist_client=self.get_todoist_client())
+        return agent_cls(agent_definition)
+
+    def release_agent(self, agent: Any):
+        """Remove an agent from the registry and close it"""
+        with self._lock:
+            for key, registered in list(self._agents.items()):
+                if registered is agent:
+                    del self._agents[key]
+        agent.close()
+
+    def retire_agents(self) -> int:
+        """
+        Stop handing out the current agents so the next get_agent builds fresh ones
+
+        Used after a settings reload. Retired agents are not closed until the
+        registry is, since in-flight callers may still hold them; shared
+        clients are kept.
+        """
+        with self._lock:
+            retired = list(self._agents.values())
+            self._retired_agents.extend(retired)
+            self._agents.clear()
+        return len(retired)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def add_close_hook(self, hook: Callable[[], None]):
+        """Register a callable to run when the registry is closed"""
+        with self._lock:
+            self._close_hooks.append(hook)
+
+    def close(self):
+        """Close all agents, then shared clients and close hooks, each newest first"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            agents = list(self._agents.values()) + self._retired_agents
+            # Later clients may depend on earlier ones (e.g. the outbox on the Todoist client)
+            clients = list(reversed(list(self._clients.items())))
+            hooks = list(reversed(self._close_hooks))
+            self._agents.clear()
+            self._retired_agents = []
+            self._clients.clear()
+            self._close_hooks.clear()
+
+        for agent in agents:
+            try:
+                agent.close()
+            except Exception as e:
+                self.logger.warning(f"Failed to close agent {getattr(agent, 'agent_name', agent)}: {e}")
+        for name, client in clients:
+            try:
+                if hasattr(client, 'close'):
+                    client.close()
+            except Exception as e:
+                self.logger.warning(f"Failed to close client {name}: {e}")
+        for hook in hooks:
+            try:
+                hook()
+            except Exception as e:
+                self.logger.warning(f"Close hook failed: {e}")
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+_registry: Optional[EngineRegistry] = None
+_registry_lock = threading.Lock()
+_active_registry: ContextVar[Optional[EngineRegistry]] = ContextVar("engine_registry", default=None)
+
+def active_registry() -> Optional[EngineRegistry]:
+    """The registry set by use_registry in this context, if any"""
+    return _active_registry.get()
+
+@contextmanager
+def use_registry(registry: EngineRegistry):
+    """Make get_registry() return ``registry`` in this context (used for tenants)"""
+    token = _active_registry.set(registry)
+    try:
+        yield registry
+    finally:
+        _active_registry.reset(token)
+
+def get_registry() -> EngineRegistry:
+    """Return the active tenant's registry, else the process-wide one (recreated if closed)"""
+    registry = _active_registry.get()
+    if registry is not None:
+        return registry
+    global _registry
+    if _registry is None or _registry.closed:
+        with _registry_lock:
+            if _registry is None or _registry.closed:
+                _registry = EngineRegistry()
+                atexit.register(_registry.close)
+    return _registry
@@ -79,19 +79,13 @@ class SelfContainedAgent(ABC):
         self.logger.info(f"✅ Agent {agent_name} initialized successfully")
     
     def _setup_logging(self) -> logging.Logger:
-        """Setup logging for the agent"""
-        logger = logging.getLogger(f"Agent-{self.agent_name}")
-        
-        if not logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter(
-                f'%(asctime)s - {self.agent_name} - %(levelname)s - %(message)s'
-            )
-            handler.setFormatter(formatter)
-            logger.addHandler(handler)
-            logger.setLevel(logging.INFO)
-            
-        return logger
+        """
+        Logger for the agent
+
+        Handlers are left to the application: the engine's services install
+        them with engine.utils.logging_config.configure_logging().
+        """
+        return logging.getLogger(f"Agent-{self.agent_name}")
     
     def _ensure_config_directory(self) -> Path:
         """Ensure agent configuration directory exists in DATA root"""
@@ -139,7 +133,8 @@ class SelfContainedAgent(ABC):
             return ensure_agent_dependencies(
                 self.agent_name,
                 core_deps,
-                optional_deps
+                optional_deps,
+                cache_dir=self.data_root / 'cache'
             )
         except Exception as e:
             self.logger.error(f"Dependency management failed: {e}")
@@ -195,6 +190,10 @@ class SelfContainedAgent(ABC):
 
         return True
         
+    def close(self) -> None:
+        """Release resources held by the agent; called by the registry on shutdown"""
+        self.logger.debug(f"Agent {self.agent_name} closed")
+
     # Proxy methods for ContextManager
     def track_context(self, content: str, entry_type: str = "data", **kwargs) -> None:
         if self.context_manager:
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Call Coalescing
+
+While a call for a key is running, further calls for the same key wait for
+it and receive its result (or its exception) instead of starting their own.
+Sync and async callers share the same in-flight calls: every call is tracked
+as a ``concurrent.futures.Future``, which threads wait on directly and
+coroutines await through ``asyncio.wrap_future``. Nothing is kept once a
+call finishes, so this is not a cache: a later identical call runs again.
+"""
+
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+
+class SingleFlight:
+    """Runs at most one call per key at a time and shares its outcome with concurrent callers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Any, Future] = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def _join(self, key: Any) -> Tuple[Future, bool]:
+        """The in-flight future for a key, and whether the caller must run the call"""
+        with self._lock:
+            self.stats["calls"] += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            return future, True
+
+    def _run(self, key: Any, future: Future, fn: Callable[[], Any]):
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future)
+            future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            self._finish(key, future)
+            future.set_result(result)
+
+    def _finish(self, key: Any, future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def do(self, key: Any, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` unless a call for ``key`` is already running, then return the shared result"""
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn)
+        return future.result()
+
+    async def ado(self, key: Any, fn: Callable[[], Any]) -> Any:
+        """Async ``do``: the call runs in a worker thread and waiting does not block the loop"""
+        future, leader = self._join(key)
+        if leader:
+            # Not awaited directly: if this caller is cancelled, the call still
+            # completes for everyone else waiting on it. Run in a copy of this
+            # context so the call sees the caller's settings (e.g. a tenant's)
+            context = contextvars.copy_context()
+            asyncio.get_running_loop().run_in_executor(None, context.run, self._run, key, future, fn)
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
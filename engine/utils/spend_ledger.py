@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Spend Ledger
+
+Durable record of what every model call cost, so spend can be checked
+against rolling daily (24h) and monthly (30 day) windows. Backed by SQLite in
+WAL mode under data_root/ledger, shared by every engine process using the
+same data_root. Window totals are cached for a few seconds per process and
+topped up with this process's own calls in between, so checking the budget
+before each call does not cost a query.
+"""
+
+import time
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+DAY_SECONDS = 24 * 3600
+MONTH_SECONDS = 30 * DAY_SECONDS
+
+class SpendLedger:
+    """SQLite-backed log of model call costs with rolling window totals"""
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS spend (
+            id INTEGER PRIMARY KEY,
+            ts REAL NOT NULL,
+            provider TEXT NOT NULL,
+            model TEXT NOT NULL,
+            tokens INTEGER NOT NULL,
+            cost REAL NOT NULL,
+            mode TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_spend_ts ON spend (ts)",
+    ]
+
+    def __init__(self, db_path: Optional[Path] = None, cache_ttl: float = 5.0, retention_days: int = 40):
+        self.logger = logging.getLogger(__name__)
+        if db_path is None:
+            from engine.config import settings
+            db_path = settings.data_root / 'ledger' / 'spend.db'
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_ttl = cache_ttl
+        self.retention_days = retention_days
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self._conn.execute(statement)
+        self._cached_totals: Optional[Dict[str, float]] = None
+        self._cached_at = 0.0
+
+    def record(self, provider: str, model: str, tokens: int, cost: float, mode: str = 'sync'):
+        """Log the cost of one call ('sync' or 'batch')"""
+        if cost <= 0 and tokens <= 0:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO spend (ts, provider, model, tokens, cost, mode) VALUES (?, ?, ?, ?, ?, ?)",
+                (time.time(), provider, model, int(tokens), float(cost), mode)
+            )
+            if self._cached_totals is not None:
+                for window in self._cached_totals:
+                    self._cached_totals[window] += cost
+
+    def spent_since(self, since: float) -> float:
+        with self._lock:
+            row = self._conn.execute("SELECT COALESCE(SUM(cost), 0) FROM spend WHERE ts >= ?", (since,)).fetchone()
+        return float(row[0])
+
+    def totals(self, max_age: Optional[float] = None) -> Dict[str, float]:
+        """Spend in the rolling 'daily' and 'monthly' windows, at most ``max_age`` seconds stale"""
+        max_age = self.cache_ttl if max_age is None else max_age
+        now = time.time()
+        if self._cached_totals is not None and time.monotonic() - self._cached_at < max_age:
+            return dict(self._cached_totals)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(CASE WHEN ts >= ? THEN cost END), 0), COALESCE(SUM(cost), 0) "
+                "FROM spend WHERE ts >= ?",
+                (now - DAY_SECONDS, now - MONTH_SECONDS)
+            ).fetchone()
+            self._cached_totals = {"daily": float(row[0]), "monthly": float(row[1])}
+            self._cached_at = time.monotonic()
+            return dict(self._cached_totals)
+
+    def breakdown(self, since: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """Cost and tokens per model since a timestamp (default: last 24h)"""
+        since = time.time() - DAY_SECONDS if since is None else since
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT model, mode, COUNT(*), SUM(tokens), SUM(cost) FROM spend WHERE ts >= ? "
+                "GROUP BY model, mode ORDER BY SUM(cost) DESC", (since,)
+            ).fetchall()
+        return {f"{model} ({mode})": {"calls": calls, "tokens": tokens, "cost": round(cost, 6)}
+                for model, mode, calls, tokens, cost in rows}
+
+    def prune(self) -> int:
+        """Drop entries older than the retention period"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM spend WHERE ts < ?",
+                                        (time.time() - self.retention_days * DAY_SECONDS,))
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_default_ledger: Optional[SpendLedger] = None
+_default_lock = threading.Lock()
+
+def _create_ledger() -> SpendLedger:
+    ledger = SpendLedger()
+    ledger.prune()
+    return ledger
+
+def get_spend_ledger() -> SpendLedger:
+    """Process-wide spend ledger backed by data_root (a tenant's own inside its context)"""
+    from engine.utils.registry import active_registry
+    registry = active_registry()
+    if registry is not None:
+        return registry.get_client('spend_ledger', _create_ledger)
+    global _default_ledger
+    if _default_ledger is None:
+        with _default_lock:
+            if _default_ledger is None:
+                _default_ledger = _create_ledger()
+    return _default_ledger